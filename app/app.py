@@ -7,20 +7,99 @@
 #
 # license: GPLv2
 #
+import atexit
+import collections
 import datetime
 import flask
 import hmac
 import json
 import os
 import pprint
+import queue
 import subprocess
 import sys
+import threading
+import time
+import uuid
 from flask import Flask
 from github import Github
 
 
 DEBUG = False  # True
 SHA1 = 'sha1'
+SHA256 = 'sha256'
+
+# fields to include in summary of events: name + path to field in event payload;
+# see also https://docs.github.com/en/webhooks/webhook-events-and-payloads
+EVENT_SUMMARY_FIELDS = {
+    'check_run': [
+        ('action', 'action'),
+        ('app_name', 'check_run.app.name'),
+        ('app_slug', 'check_run.app.slug'),
+        ('conclusion', 'check_run.conclusion'),
+        ('html_url', 'check_run.html_url'),
+        ('name', 'check_run.name'),
+        ('repo', 'repository.full_name'),
+        ('status', 'check_run.status'),
+    ],
+    'check_suite': [
+        ('action', 'action'),
+        ('app_name', 'check_suite.app.name'),
+        ('app_slug', 'check_suite.app.slug'),
+        ('conclusion', 'check_suite.conclusion'),
+        ('repo', 'repository.full_name'),
+        ('status', 'check_suite.status'),
+    ],
+    'workflow_run': [
+        ('action', 'action'),
+        ('conclusion', 'workflow_run.conclusion'),
+        ('html_url', 'workflow_run.html_url'),
+        ('repo', 'repository.full_name'),
+        ('status', 'workflow_run.status'),
+        ('workflow_name', 'workflow.name'),
+        ('workflow_path', 'workflow.path'),
+    ],
+}
+# paths to fields are split only once
+EVENT_SUMMARY_PATHS = dict((event_type, [(name, tuple(path.split('.'))) for (name, path) in fields])
+                           for (event_type, fields) in EVENT_SUMMARY_FIELDS.items())
+
+# log records are written as JSON lines to app.log (in batches, by a dedicated thread);
+# log file is rotated when it becomes larger than 10MB
+LOG_FILE = 'app.log'
+LOG_BACKUP_COUNT = 5
+LOG_BATCH_SIZE = 1000
+LOG_MAX_BYTES = 10 * 1024 * 1024
+
+# logger, see get_logger
+LOGGER = None
+LOGGER_LOCK = threading.Lock()
+
+# IDs of webhook deliveries that were handled (value of X-GitHub-Delivery header) are recorded in deliveries.log,
+# so redeliveries (also across restarts of the app) are not handled again;
+# GitHub allows redelivering webhook deliveries of the past 3 days
+DELIVERIES_FILE = 'deliveries.log'
+DELIVERIES_MAX_SIZE = 10000
+DELIVERIES_TTL = 3 * 24 * 3600
+
+# (lazy) handles for GitHub repositories and issues are cached for 1 hour (up to 100 handles)
+GITHUB_HANDLES_MAX_SIZE = 100
+GITHUB_HANDLES_TTL = 3600
+
+# file in which jobs are stored, so queued jobs survive a restart of the app
+JOBS_FILE = 'jobs.json'
+# maximum number of finished jobs to keep track of
+JOBS_MAX_FINISHED = 100
+# maximum number of jobs that are run at the same time
+JOBS_MAX_WORKERS = int(os.getenv('BOEGELBOT_APP_MAX_JOBS', '1'))
+
+JOB_STATUS_QUEUED = 'queued'
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_DONE = 'done'
+JOB_STATUS_FAILED = 'failed'
+
+# job executor, see get_job_executor
+JOB_EXECUTOR = None
 
 
 class PullRequest(object):
@@ -39,98 +118,500 @@ class PullRequest(object):
         return ', '.join(x + '=' + str(getattr(self, x)) for x in fields)
 
 
-def debug_log(msg):
-    """Log event data to app.log"""
-    if DEBUG:
-        with open('app.log', 'a') as fh:
-            timestamp = datetime.datetime.now().strftime("%Y%m%d-T%H:%M:%S")
-            fh.write('DEBUG [' + timestamp + '] ' + msg + '\n')
+class DeliveryCache(object):
+    """
+    Bounded cache of IDs of webhook deliveries that were handled, to detect redeliveries.
 
+    Deliveries are evicted when they are older than the TTL, or when the cache is full (oldest first).
+    If a file is specified, deliveries are appended to it (one '<timestamp> <delivery ID>' line per delivery),
+    so the cache survives a restart of the app; the file is compacted when it becomes too large.
+    """
 
-def error(msg):
-    """Print error message and exit."""
-    sys.stderr.write("ERROR: %s\n" % msg)
-    sys.exit(1)
+    def __init__(self, path=DELIVERIES_FILE, ttl=DELIVERIES_TTL, max_size=DELIVERIES_MAX_SIZE):
+        """Constructor."""
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        # delivery ID -> timestamp, oldest delivery first
+        self.deliveries = collections.OrderedDict()
+        self.fh = None
+        self.file_lines = 0
+        self.lock = threading.Lock()
+
+        if self.path:
+            if os.path.exists(self.path):
+                with open(self.path) as fh:
+                    for line in fh:
+                        # skip malformed lines (for example a truncated last line due to a crash),
+                        # file is rewritten without them when it is compacted below
+                        try:
+                            timestamp, delivery_id = line.split()
+                            if timestamp != '-':
+                                timestamp = float(timestamp)
+                        except ValueError:
+                            sys.stderr.write("WARNING: Ignoring malformed line in %s: %r\n" % (self.path, line))
+                            continue
+                        self.deliveries.pop(delivery_id, None)
+                        # '-' marks a delivery that was discarded
+                        if timestamp != '-':
+                            self.deliveries[delivery_id] = timestamp
+            self._evict(time.time(), self.max_size)
+            self._compact()
+
+    def _compact(self):
+        """Rewrite file with deliveries that are currently in the cache (lock must be held)."""
+        if self.fh:
+            self.fh.close()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            fh.writelines('%.3f %s\n' % (timestamp, delivery_id) for delivery_id, timestamp in self.deliveries.items())
+        os.replace(tmp_path, self.path)
+        self.fh = open(self.path, 'a')
+        self.file_lines = len(self.deliveries)
+
+    def _evict(self, now, max_size):
+        """Evict deliveries that are too old, and oldest deliveries beyond specified size (lock must be held)."""
+        while self.deliveries:
+            delivery_id, timestamp = next(iter(self.deliveries.items()))
+            if timestamp > now - self.ttl and len(self.deliveries) <= max_size:
+                break
+            del self.deliveries[delivery_id]
+
+    def _write(self, line):
+        """Append line to file (lock must be held)."""
+        if self.fh:
+            self.fh.write(line)
+            self.fh.flush()
+            self.file_lines += 1
+            if self.file_lines > 2 * self.max_size:
+                self._compact()
+
+    def add(self, delivery_id):
+        """Add delivery with specified ID; returns False if it was already added before (i.e. for a redelivery)."""
+        with self.lock:
+            now = time.time()
+            self._evict(now, self.max_size)
+            if delivery_id in self.deliveries:
+                return False
+
+            # make room for new delivery
+            self._evict(now, self.max_size - 1)
+            self.deliveries[delivery_id] = now
+            self._write('%.3f %s\n' % (now, delivery_id))
+            return True
+
+    def discard(self, delivery_id):
+        """Discard delivery with specified ID (for example because handling it failed, so a redelivery is OK)."""
+        with self.lock:
+            if self.deliveries.pop(delivery_id, None) is not None:
+                self._write('- %s\n' % delivery_id)
+
+
+class GitHubHandles(object):
+    """
+    TTL/LRU cache of handles for GitHub repositories and issues.
 
+    Handles are lazy where possible, so no GitHub API request is done until data is actually needed
+    (for example, creating a comment on an issue only requires a single API request).
+    """
 
-def log(msg):
-    """Log event data to app.log"""
-    with open('app.log', 'a') as fh:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d-T%H:%M:%S")
-        fh.write('[' + timestamp + '] ' + msg + '\n')
+    def __init__(self, gh, ttl=GITHUB_HANDLES_TTL, max_size=GITHUB_HANDLES_MAX_SIZE):
+        """Constructor."""
+        self.gh = gh
+        self.ttl = ttl
+        self.max_size = max_size
+        # (repo,) or (repo, issue number) -> (timestamp, handle), least recently used first
+        self.handles = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+        # lazy Github instance (PyGithub >= 2.0): repositories/issues are only fetched when needed
+        if hasattr(gh, 'withLazy'):
+            self.lazy_gh = gh.withLazy(True)
+        else:
+            self.lazy_gh = None
+
+    def _get(self, key, create):
+        """Get handle for specified key, create it (outside of lock) if it's not cached (anymore)."""
+        now = time.time()
+        with self.lock:
+            entry = self.handles.get(key)
+            if entry and entry[0] > now - self.ttl:
+                self.handles.move_to_end(key)
+                return entry[1]
+
+        handle = create()
+
+        with self.lock:
+            self.handles[key] = (now, handle)
+            self.handles.move_to_end(key)
+            while len(self.handles) > self.max_size:
+                self.handles.popitem(last=False)
+
+        return handle
+
+    def get_issue(self, repo, number):
+        """Get handle for issue (or pull request) with specified number in specified repository."""
+        return self._get((repo, number), lambda: self.get_repo(repo).get_issue(number))
+
+    def get_repo(self, repo):
+        """Get handle for specified repository."""
+        if self.lazy_gh:
+            return self._get((repo,), lambda: self.lazy_gh.get_repo(repo))
+        else:
+            return self._get((repo,), lambda: self.gh.get_repo(repo, lazy=True))
+
+    def invalidate(self, repo, number=None):
+        """
+        Invalidate cached handle for issue with specified number in specified repository;
+        if no issue number is specified, all cached handles for specified repository are invalidated.
+        """
+        with self.lock:
+            if number is None:
+                for key in [key for key in self.handles if key[0] == repo]:
+                    del self.handles[key]
+            else:
+                self.handles.pop((repo, number), None)
 
 
-def verify_request(request):
+class JobExecutor(object):
     """
-    Verify request by checking webhook secret in request header.
-    Webhook secret must also be available in $GITHUB_APP_SECRET_TOKEN environment variable.
+    Executor for (long-running) jobs, which are run in the background by a bounded pool of worker threads.
+    Jobs are stored in a file, so jobs that were queued (or running) when the app was stopped are run again.
     """
-    # see https://docs.github.com/en/developers/webhooks-and-events/securing-your-webhooks
 
-    webhook_secret_from_env = os.getenv('GITHUB_APP_SECRET_TOKEN')
-    if webhook_secret_from_env is None:
-        error("Webhook secret is not available via $GITHUB_APP_SECRET_TOKEN!")
+    def __init__(self, jobs_file=JOBS_FILE, max_workers=JOBS_MAX_WORKERS):
+        """Constructor."""
+        self.jobs_file = jobs_file
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+
+        if self.jobs_file and os.path.exists(self.jobs_file):
+            with open(self.jobs_file) as fh:
+                self.jobs = json.load(fh)
+
+        # (re)queue jobs that did not finish yet, in the order in which they were submitted
+        for job in sorted(self.jobs.values(), key=lambda job: job['submitted']):
+            if job['status'] in [JOB_STATUS_QUEUED, JOB_STATUS_RUNNING]:
+                log("Requeueing job %s: %s" % (job['id'], ' '.join(job['cmd'])))
+                job['status'] = JOB_STATUS_QUEUED
+                self.queue.put(job['id'])
+
+        for _ in range(max_workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def _save(self):
+        """Save jobs to file (lock must be held)."""
+        if self.jobs_file:
+            tmp_jobs_file = self.jobs_file + '.tmp'
+            with open(tmp_jobs_file, 'w') as fh:
+                json.dump(self.jobs, fh, indent=2, sort_keys=True)
+            os.replace(tmp_jobs_file, self.jobs_file)
+
+    def _update(self, job_id, **kwargs):
+        """Update job with specified ID."""
+        with self.lock:
+            self.jobs[job_id].update(kwargs)
+
+            # only keep track of most recently finished jobs
+            finished = [job for job in self.jobs.values() if job['status'] in [JOB_STATUS_DONE, JOB_STATUS_FAILED]]
+            finished.sort(key=lambda job: job['finished'])
+            for job in finished[:-JOBS_MAX_FINISHED]:
+                del self.jobs[job['id']]
+
+            self._save()
+
+    def _worker(self):
+        """Worker: run queued jobs, one at a time."""
+        while True:
+            job_id = self.queue.get()
+            try:
+                self._run(job_id)
+            except Exception as err:
+                # make sure job doesn't linger in 'running' state, and that worker keeps running
+                log("Failed to run job %s: %s" % (job_id, err))
+                try:
+                    self._update(job_id, status=JOB_STATUS_FAILED, exit_code=None, finished=current_time())
+                except Exception as err:
+                    log("Failed to update status of job %s: %s" % (job_id, err))
+            finally:
+                self.queue.task_done()
+
+    def _run(self, job_id):
+        """Run job with specified ID."""
+        with self.lock:
+            cmd = self.jobs[job_id]['cmd']
+        self._update(job_id, status=JOB_STATUS_RUNNING, started=current_time())
+
+        log("Running job %s: %s" % (job_id, ' '.join(cmd)))
+        try:
+            process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     universal_newlines=True)
+            stderr, stdout, exit_code = process.stderr, process.stdout, process.returncode
+        except OSError as err:
+            stderr, stdout, exit_code = str(err), '', None
 
-    header_signature = request.headers.get('X-Hub-Signature')
-    # if no signature is found, the request is forbidden
-    if header_signature is None:
-        log("Missing signature in request header => 403")
-        flask.abort(403)
-    else:
-        signature_type, signature = header_signature.split('=')
-        if signature_type == SHA1:
-            # see https://docs.python.org/3/library/hmac.html
-            mac = hmac.new(webhook_secret_from_env.encode(), msg=request.data, digestmod=SHA1)
-            if hmac.compare_digest(str(mac.hexdigest()), str(signature)):
-                log("Request verified: signature OK!")
-            else:
-                log("Faulty signature in request header => 403")
-                flask.abort(403)
+        log("Command '%s' completed, exit code %s" % (' '.join(cmd), exit_code))
+        log("Stdout:\n" + stdout)
+        log("Stderr:\n" + stderr)
+
+        status = JOB_STATUS_DONE if exit_code == 0 else JOB_STATUS_FAILED
+        self._update(job_id, status=status, exit_code=exit_code, finished=current_time())
+
+    def get_job(self, job_id):
+        """Return (copy of) data for job with specified ID (or None if no such job is known)."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def submit(self, cmd, **info):
+        """Submit job to run specified command (with additional information on the job), and return job ID."""
+        job_id = uuid.uuid4().hex
+        job = dict(info, cmd=cmd, exit_code=None, finished=None, id=job_id, started=None,
+                   status=JOB_STATUS_QUEUED, submitted=current_time())
+        with self.lock:
+            self.jobs[job_id] = job
+            self._save()
+
+        self.queue.put(job_id)
+        log("Job %s queued: %s" % (job_id, ' '.join(cmd)))
+
+        return job_id
+
+
+class Logger(object):
+    """
+    Logger that writes log records as JSON lines to a log file.
+
+    Log records are put in a queue and written in batches by a dedicated writer thread,
+    so logging never blocks on disk I/O; the log file is rotated when it becomes too large.
+    """
+
+    def __init__(self, log_file=LOG_FILE, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+        """Constructor."""
+        self.log_file = os.path.abspath(log_file)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.fh = None
+        self.queue = queue.Queue()
+
+        threading.Thread(target=self._writer, daemon=True).start()
+        # writer thread is a daemon thread, so make sure queued log records are written before exiting
+        atexit.register(self.flush)
+
+    def _rotate(self):
+        """Rotate log files: app.log -> app.log.1 -> app.log.2 -> ..."""
+        self.fh.close()
+        for idx in range(self.backup_count - 1, 0, -1):
+            if os.path.exists('%s.%d' % (self.log_file, idx)):
+                os.replace('%s.%d' % (self.log_file, idx), '%s.%d' % (self.log_file, idx + 1))
+        if self.backup_count > 0:
+            os.replace(self.log_file, self.log_file + '.1')
         else:
-            # we only know how to verify a SHA1 signature
+            os.remove(self.log_file)
+        self.fh = open(self.log_file, 'a')
+
+    def _write(self, record):
+        """Write log record to log file (writes are buffered)."""
+        if self.fh is None:
+            self.fh = open(self.log_file, 'a')
+        # arguments for log message are only formatted here, not in the thread that logged the message
+        msg, args = record['msg']
+        if args:
+            try:
+                msg = msg % tuple(pprint.pformat(arg) for arg in args)
+            except Exception as err:
+                # don't lose log message if it can't be formatted (for example due to wrong number of arguments)
+                msg = "%s [failed to format arguments (%s): %s]" % (msg, err, ', '.join(repr(arg) for arg in args))
+        line = json.dumps(dict(record, msg=msg)) + '\n'
+        if self.fh.tell() > 0 and self.fh.tell() + len(line) > self.max_bytes:
+            self._rotate()
+        self.fh.write(line)
+
+    def _writer(self):
+        """Writer: write queued log records to log file, in batches."""
+        while True:
+            records = [self.queue.get()]
+            # also include all other records that are already queued in this batch
+            while len(records) < LOG_BATCH_SIZE:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                # a record that can't be written must not stop the writer thread,
+                # since then nothing would be logged anymore (and flush would hang)
+                for record in records:
+                    try:
+                        self._write(record)
+                    except Exception as err:
+                        sys.stderr.write("ERROR: Failed to write to %s: %s\n" % (self.log_file, err))
+                        # reopen log file for next record if it was left closed (for example by failed rotation)
+                        if self.fh is not None and self.fh.closed:
+                            self.fh = None
+                # log file is only flushed once per batch
+                if self.fh is not None:
+                    self.fh.flush()
+            except Exception as err:
+                sys.stderr.write("ERROR: Failed to write to %s: %s\n" % (self.log_file, err))
+            finally:
+                for _ in records:
+                    self.queue.task_done()
+
+    def flush(self):
+        """Wait until all queued log records are written."""
+        self.queue.join()
+
+    def log(self, level, msg, *args):
+        """
+        Queue log record with specified level and message;
+        arguments for message are formatted with pprint.pformat by writer thread (so they should not be modified).
+        """
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-T%H:%M:%S")
+        self.queue.put({'time': timestamp, 'level': level, 'msg': (msg, args)})
+
+
+class WebhookVerifier(object):
+    """
+    Verifier for webhook requests, which checks the signature in the request header
+    (see https://docs.github.com/en/webhooks/using-webhooks/validating-webhook-deliveries).
+
+    HMAC objects that are already keyed with the webhook secret(s) are created only once,
+    and copied for each request. A second secret can be specified while rotating the webhook secret.
+    """
+
+    def __init__(self, secrets):
+        """Constructor."""
+        self.macs = {}
+        for digestmod in [SHA1, SHA256]:
+            self.macs[digestmod] = [hmac.new(secret.encode(), digestmod=digestmod) for secret in secrets]
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create verifier for webhook secret in $GITHUB_APP_SECRET_TOKEN environment variable
+        (and optional new webhook secret in $GITHUB_APP_SECRET_TOKEN_NEXT, while rotating the webhook secret).
+        """
+        webhook_secret_from_env = os.getenv('GITHUB_APP_SECRET_TOKEN')
+        if webhook_secret_from_env is None:
+            error("Webhook secret is not available via $GITHUB_APP_SECRET_TOKEN!")
+
+        secrets = [webhook_secret_from_env]
+        next_webhook_secret_from_env = os.getenv('GITHUB_APP_SECRET_TOKEN_NEXT')
+        if next_webhook_secret_from_env:
+            secrets.append(next_webhook_secret_from_env)
+
+        return cls(secrets)
+
+    def check(self, signature_type, signature, data):
+        """Check whether signature of specified type is valid for specified data, for any of the webhook secrets."""
+        for keyed_mac in self.macs[signature_type]:
+            mac = keyed_mac.copy()
+            mac.update(data)
+            if hmac.compare_digest(mac.hexdigest(), signature):
+                return True
+        return False
+
+    def verify(self, request):
+        """
+        Verify request by checking signature in request header;
+        SHA256 signature (X-Hub-Signature-256 header) is preferred over SHA1 signature (X-Hub-Signature header).
+        """
+        header_signature = request.headers.get('X-Hub-Signature-256') or request.headers.get('X-Hub-Signature')
+        # if no signature is found, the request is forbidden
+        if header_signature is None:
+            log("Missing signature in request header => 403")
+            flask.abort(403)
+
+        signature_type, _, signature = header_signature.partition('=')
+        if signature_type not in self.macs:
+            # we only know how to verify a SHA1 or SHA256 signature
             log("Uknown type of signature (%s) => 501" % signature_type)
             flask.abort(501)
 
+        # check signature of raw request body (which is cached by Flask, so it's not copied)
+        if self.check(signature_type, signature, request.get_data(cache=True)):
+            log("Request verified: signature OK!")
+        else:
+            log("Faulty signature in request header => 403")
+            flask.abort(403)
+
+
+def current_time():
+    """Return current time as a string."""
+    return datetime.datetime.now().strftime("%Y%m%d-T%H:%M:%S.%f")
+
+
+def debug_log(msg, *args):
+    """Log event data to app.log (only if debug logging is enabled, arguments are formatted lazily)"""
+    if DEBUG:
+        get_logger().log('DEBUG', msg, *args)
+
+
+def error(msg):
+    """Print error message and exit."""
+    sys.stderr.write("ERROR: %s\n" % msg)
+    sys.exit(1)
+
+
+def event_summary(event_type, payload):
+    """
+    Return summary of event of specified type, with relevant fields extracted from the event payload
+    (using paths for fields that were determined only once).
+    """
+    summary = {}
+    for name, keys in EVENT_SUMMARY_PATHS[event_type]:
+        value = payload
+        for key in keys:
+            value = value[key]
+        summary[name] = value
+
+    pull_requests = payload[event_type].get('pull_requests')
+    if pull_requests:
+        summary['pr_id'] = pull_requests[0]['number']
+
+    return summary
+
+
+def get_job_executor():
+    """Get job executor, create it if needed."""
+    global JOB_EXECUTOR
+    if JOB_EXECUTOR is None:
+        JOB_EXECUTOR = JobExecutor()
+    return JOB_EXECUTOR
+
+
+def get_logger():
+    """Get logger, create it if needed."""
+    global LOGGER
+    with LOGGER_LOCK:
+        if LOGGER is None:
+            LOGGER = Logger()
+    return LOGGER
+
+
+def log(msg, *args):
+    """Log event data to app.log (arguments are formatted lazily)"""
+    get_logger().log('INFO', msg, *args)
+
 
 def handle_check_run_event(gh, request):
     """
     Handle 'check_run' event
     """
-    debug_log("Request body: %s" % pprint.pformat(request.json))
-    check_run_data = {
-        'action': request.json['action'],
-        'app_name': request.json['check_run']['app']['name'],
-        'app_slug': request.json['check_run']['app']['slug'],
-        'conclusion': request.json['check_run']['conclusion'],
-        'html_url': request.json['check_run']['html_url'],
-        'name': request.json['check_run']['name'],
-        'repo': request.json['repository']['full_name'],
-        'status': request.json['check_run']['status'],
-    }
-    pull_requests = request.json['check_run'].get('pull_requests', [])
-    if pull_requests:
-        check_run_data['pr_id'] = pull_requests[0]['number']
-    log("Check run event handled: %s" % pprint.pformat(check_run_data))
+    payload = request.json
+    debug_log("Request body: %s", payload)
+    log("Check run event handled: %s", event_summary('check_run', payload))
 
 
 def handle_check_suite_event(gh, request):
     """
     Handle 'check_suite' event
     """
-    debug_log("Request body: %s" % pprint.pformat(request.json))
-    check_suite_data = {
-        'action': request.json['action'],
-        'app_name': request.json['check_suite']['app']['name'],
-        'app_slug': request.json['check_suite']['app']['slug'],
-        'conclusion': request.json['check_suite']['conclusion'],
-        'repo': request.json['repository']['full_name'],
-        'status': request.json['check_suite']['status'],
-    }
-    pull_requests = request.json['check_suite'].get('pull_requests', [])
-    if pull_requests:
-        check_suite_data['pr_id'] = pull_requests[0]['number']
-
-    log("Check suite event handled: %s" % pprint.pformat(check_suite_data))
+    payload = request.json
+    debug_log("Request body: %s", payload)
+    log("Check suite event handled: %s", event_summary('check_suite', payload))
 
 
 def handle_ping_event(gh, request):
@@ -145,7 +626,7 @@ def handle_pr_label_event(gh, request, pr):
     """
     Handle adding of a label to a pull request.
     """
-    debug_log("Request body: %s" % pprint.pformat(request.json))
+    debug_log("Request body: %s", request.json)
 
     action = request.json['action']
     label_name = request.json['label']['name']
@@ -164,8 +645,8 @@ def handle_pr_label_event(gh, request, pr):
     # only react if label was added by @boegel, is a 'test:*' label, and matches current host
     if action == 'labeled' and user == 'boegel' and label_name.startswith('test:' + hostname):
 
-        repo = gh.get_repo(pr.repo)
-        issue = repo.get_issue(pr.id)
+        # lazy handle, so only creating the comment results in a GitHub API request
+        issue = gh.get_issue(pr.repo, pr.id)
 
         pr_target_account = request.json['repository']['owner']['login']
 
@@ -186,20 +667,23 @@ def handle_pr_label_event(gh, request, pr):
 
         log("Testing %s PR #%d by request of %s by running: %s" % (pr.repo, pr.id, user, ' '.join(cmd)))
 
+        job_id = get_job_executor().submit(cmd, pr=pr.id, repo=pr.repo, user=user)
+
         msg_lines = [
             "Fine, fine, I'm on it.",
-            "Started command: `%s`" % ' '.join(cmd),
+            "Queued command: `%s` (job ID: %s)" % (' '.join(cmd), job_id),
         ]
 
-        issue.create_comment('\n'.join(msg_lines))
+        try:
+            issue.create_comment('\n'.join(msg_lines))
+        except Exception as err:
+            # job was already queued, so handling of delivery should not fail,
+            # since that would allow a redelivery to queue another job for the same request
+            log("Failed to post comment for job %s in %s PR #%d: %s" % (job_id, pr.repo, pr.id, err))
 
-        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-        process
-        stderr, stdout, exit_code = process.stderr, process.stdout, process.returncode
-
-        log("Command '%s' completed, exit code %s" % (' '.join(cmd), exit_code))
-        log("Stdout:\n" + stdout)
-        log("Stderr:\n" + stderr)
+        # command is run in the background, don't keep the webhook request waiting
+        response_data = {'job_id': job_id}
+        return flask.Response(json.dumps(response_data), status=202, mimetype='application/json')
 
 
 def handle_pr_opened_event(gh, request, pr):
@@ -218,6 +702,10 @@ def handle_pr_event(gh, request):
     log("PR action: %s" % action)
     log("PR data: %s" % pr)
 
+    # pull request data changed, so cached handle for it should not be used anymore
+    if action in ['closed', 'edited', 'reopened', 'synchronize']:
+        gh.invalidate(pr.repo, pr.id)
+
     handlers = {
         'labeled': handle_pr_label_event,
         'opened': handle_pr_opened_event,
@@ -226,32 +714,42 @@ def handle_pr_event(gh, request):
     handler = handlers.get(action)
     if handler:
         log("Handling PR action '%s' for %s PR #%d..." % (action, pr.repo, pr.id))
-        handler(gh, request, pr)
+        response = handler(gh, request, pr)
+        if response is not None:
+            return response
     else:
         log("No handler for PR action '%s'" % action)
 
     return flask.Response(status=200)
 
 
+def handle_repository_event(gh, request):
+    """
+    Handle 'repository' event
+    """
+    action = request.json['action']
+    repo = request.json['repository']['full_name']
+    log("Repository event handled: %s %s" % (repo, action))
+
+    # cached handles for repository (and its issues) should not be used anymore if repository was renamed, etc.
+    if action in ['archived', 'deleted', 'renamed', 'transferred']:
+        gh.invalidate(repo)
+        changes = request.json.get('changes', {})
+        old_name = changes.get('repository', {}).get('name', {}).get('from')
+        if old_name:
+            gh.invalidate(repo.split('/')[0] + '/' + old_name)
+        old_owner = changes.get('owner', {}).get('from', {}).get('user', {}).get('login')
+        if old_owner:
+            gh.invalidate(old_owner + '/' + repo.split('/')[1])
+
+
 def handle_workflow_run_event(gh, request):
     """
     Handle 'workflow_run' event
     """
-    debug_log("Request body: %s" % pprint.pformat(request.json))
-    workflow_run_data = {
-        'action': request.json['action'],
-        'conclusion': request.json['workflow_run']['conclusion'],
-        'html_url': request.json['workflow_run']['html_url'],
-        'repo': request.json['repository']['full_name'],
-        'status': request.json['workflow_run']['status'],
-        'workflow_name': request.json['workflow']['name'],
-        'workflow_path': request.json['workflow']['path'],
-    }
-    pull_requests = request.json['workflow_run'].get('pull_requests', [])
-    if pull_requests:
-        workflow_run_data['pr_id'] = pull_requests[0]['number']
-
-    log("Workflow run event handled: %s" % pprint.pformat(workflow_run_data))
+    payload = request.json
+    debug_log("Request body: %s", payload)
+    log("Workflow run event handled: %s", event_summary('workflow_run', payload))
 
 
 def handle_event(gh, request):
@@ -263,6 +761,7 @@ def handle_event(gh, request):
         'check_suite': handle_check_suite_event,
         'ping': handle_ping_event,
         'pull_request': handle_pr_event,
+        'repository': handle_repository_event,
         'workflow_run': handle_workflow_run_event,
     }
     event_type = request.headers["X-GitHub-Event"]
@@ -272,7 +771,7 @@ def handle_event(gh, request):
         log("Event type: %s" % event_type)
         # log("Request headers: %s" % pprint.pformat(request.headers))
         # log("Request body: %s" % pprint.pformat(request.json))
-        event_handler(gh, request)
+        return event_handler(gh, request)
     else:
         log("Unsupported event type: %s" % event_type)
         response_data = {'Unsupported event type': event_type}
@@ -280,19 +779,53 @@ def handle_event(gh, request):
         return flask.Response(response_object, status=400, mimetype='application/json')
 
 
-def create_app(gh):
+def create_app(gh, deliveries_file=DELIVERIES_FILE):
     """
     Create Flask app.
+    IDs of handled webhook deliveries are recorded in specified file (only in memory if None is specified).
     """
 
     app = Flask(__name__)
 
+    # event handlers use (cached) handles for GitHub repositories and issues
+    github_handles = GitHubHandles(gh)
+
+    deliveries = DeliveryCache(path=deliveries_file)
+    verifier = WebhookVerifier.from_env()
+
     @app.route('/', methods=['POST'])
     def main():
         log("%s request received!" % flask.request.method)
-        verify_request(flask.request)
-        handle_event(gh, flask.request)
-        return ''
+        verifier.verify(flask.request)
+
+        # don't handle redeliveries (for example because handling original delivery timed out)
+        delivery_id = flask.request.headers.get('X-GitHub-Delivery')
+        if delivery_id:
+            if not deliveries.add(delivery_id):
+                log("Delivery %s was already handled, ignoring it" % delivery_id)
+                response_data = {'duplicate delivery': delivery_id}
+                return flask.Response(json.dumps(response_data), status=200, mimetype='application/json')
+
+        try:
+            response = handle_event(github_handles, flask.request)
+        except Exception:
+            # handling delivery failed, so allow it to be redelivered
+            if delivery_id:
+                deliveries.discard(delivery_id)
+            raise
+        if response is None:
+            response = ''
+        return response
+
+    @app.route('/jobs/<job_id>', methods=['GET'])
+    def job_status(job_id):
+        job = get_job_executor().get_job(job_id)
+        if job is None:
+            flask.abort(404)
+        return flask.jsonify(job)
+
+    # start running jobs that were still queued when app was stopped
+    get_job_executor()
 
     return app
 
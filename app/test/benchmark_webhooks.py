@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+#
+# Benchmark for GitHub App: replay (signed) webhook deliveries,
+# and report latency + throughput per event type
+#
+# usage (from directory where app.py is located):
+#   PYTHONPATH=$PWD python test/benchmark_webhooks.py [--corpus <dir>] [--count 1000] [--rate 0] [--server waitress]
+#
+# author: Kenneth Hoste (@boegel)
+#
+# license: GPLv2
+#
+import argparse
+import glob
+import hmac
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import app
+
+
+BENCHMARK_SECRET = 'benchmark-secret'
+
+# default corpus of webhook deliveries: (event type, payload)
+DEFAULT_CORPUS = [
+    ('check_run', {
+        'action': 'completed',
+        'check_run': {
+            'app': {'name': 'GitHub Actions', 'slug': 'github-actions'},
+            'conclusion': 'failure',
+            'html_url': 'https://github.com/easybuilders/easybuild-easyconfigs/runs/1138537767',
+            'name': 'test-suite (3.9, Lmod-8.1.14, Lua)',
+            'pull_requests': [{'number': 12345}],
+            'status': 'completed',
+        },
+        'repository': {'full_name': 'easybuilders/easybuild-easyconfigs'},
+    }),
+    ('check_suite', {
+        'action': 'completed',
+        'check_suite': {
+            'app': {'name': 'GitHub Actions', 'slug': 'github-actions'},
+            'conclusion': 'failure',
+            'pull_requests': [{'number': 12345}],
+            'status': 'completed',
+        },
+        'repository': {'full_name': 'easybuilders/easybuild-easyconfigs'},
+    }),
+    ('ping', {}),
+    ('pull_request', {
+        'action': 'opened',
+        'pull_request': {
+            'head': {'sha': '662e87628812fdcf77caffbeb723b3f840ea54a5'},
+            'number': 12345,
+            'user': {'login': 'boegel'},
+        },
+        'repository': {'full_name': 'easybuilders/easybuild-easyconfigs', 'owner': {'login': 'easybuilders'}},
+        'sender': {'login': 'boegel'},
+    }),
+    ('workflow_run', {
+        'action': 'completed',
+        'workflow': {'name': 'Static Analysis', 'path': '.github/workflows/linting.yml'},
+        'workflow_run': {
+            'conclusion': 'success',
+            'html_url': 'https://github.com/easybuilders/easybuild-easyconfigs/actions/runs/262903191',
+            'pull_requests': [{'number': 12345}],
+            'status': 'completed',
+        },
+        'repository': {'full_name': 'easybuilders/easybuild-easyconfigs'},
+    }),
+]
+
+
+class FakeIssue(object):
+    """Stub for PyGithub Issue object."""
+
+    def create_comment(self, msg):
+        pass
+
+
+class FakeRepo(object):
+    """Stub for PyGithub Repository object."""
+
+    def get_issue(self, pr_id):
+        return FakeIssue()
+
+
+class FakeGithub(object):
+    """Stub for PyGithub Github object, so no GitHub API requests are done."""
+
+    def get_repo(self, repo, lazy=False):
+        return FakeRepo()
+
+
+def load_corpus(corpus_dir):
+    """
+    Load corpus of recorded webhook deliveries from specified directory:
+    one JSON file per delivery, with 'event' (value of X-GitHub-Event header) and 'payload' fields.
+    """
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, '*.json'))):
+        with open(path) as fh:
+            delivery = json.load(fh)
+        corpus.append((delivery['event'], delivery['payload']))
+    return corpus
+
+
+def sign_deliveries(corpus, secret):
+    """Compose (signed) requests for corpus of webhook deliveries: (event type, headers, body)."""
+    deliveries = []
+    for idx, (event_type, payload) in enumerate(corpus):
+        body = json.dumps(payload).encode()
+        # like GitHub, include both SHA1 and SHA256 signature
+        headers = {
+            'Content-Type': 'application/json',
+            'X-GitHub-Delivery': 'benchmark-%d' % idx,
+            'X-GitHub-Event': event_type,
+            'X-Hub-Signature': 'sha1=' + hmac.new(secret.encode(), msg=body, digestmod='sha1').hexdigest(),
+            'X-Hub-Signature-256': 'sha256=' + hmac.new(secret.encode(), msg=body, digestmod='sha256').hexdigest(),
+        }
+        deliveries.append((event_type, headers, body))
+    return deliveries
+
+
+def flask_sender(flask_app):
+    """Return function to send request to Flask app (in-process, via test client)."""
+    client = flask_app.test_client()
+
+    def send(headers, body):
+        return client.post('/', data=body, headers=headers).status_code
+
+    return send
+
+
+def waitress_sender(flask_app, threads):
+    """Return function to send request to Flask app that is served by waitress (via local HTTP port)."""
+    import waitress
+
+    # don't warn about queued requests
+    logging.getLogger('waitress.queue').setLevel(logging.ERROR)
+
+    server = waitress.create_server(flask_app, host='127.0.0.1', port=0, threads=threads)
+    threading.Thread(target=server.run, daemon=True).start()
+    url = 'http://127.0.0.1:%s/' % server.effective_port
+
+    def send(headers, body):
+        req = urllib.request.Request(url, data=body, headers=headers, method='POST')
+        with urllib.request.urlopen(req) as res:
+            res.read()
+            return res.status
+
+    return send
+
+
+def replay(send, deliveries, count, rate=0, concurrency=1):
+    """
+    Replay webhook deliveries (count times each), at specified rate (requests per second, 0 means no limit),
+    using specified number of concurrent clients; returns dict with latencies and total time per event type.
+    """
+    results = {}
+    for event_type, headers, body in deliveries:
+        latencies, errors = [], []
+        lock = threading.Lock()
+        start = time.time()
+
+        def send_requests(client_idx):
+            for idx in range(client_idx, count, concurrency):
+                if rate:
+                    # wait until it's time to send this request
+                    delay = start + float(idx) / rate - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                # each request is a separate delivery, redeliveries are not handled by the app
+                req_headers = dict(headers)
+                req_headers['X-GitHub-Delivery'] = '%s-%d' % (headers['X-GitHub-Delivery'], idx)
+                req_start = time.time()
+                status = send(req_headers, body)
+                latency = time.time() - req_start
+                if status >= 300:
+                    raise RuntimeError("Unexpected status code for %s event: %s" % (event_type, status))
+                with lock:
+                    latencies.append(latency)
+
+        def client(client_idx):
+            # exceptions raised in a client thread are re-raised once all clients are done
+            try:
+                send_requests(client_idx)
+            except Exception as err:
+                with lock:
+                    errors.append(err)
+
+        clients = [threading.Thread(target=client, args=(idx,)) for idx in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        res = results.setdefault(event_type, {'latencies': [], 'time': 0})
+        res['latencies'].extend(latencies)
+        res['time'] += time.time() - start
+
+    return results
+
+
+def percentile(values, pct):
+    """Return specified percentile of list of values."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100. * (len(values) - 1))))]
+
+
+def report(results):
+    """Report p50/p99 latency and throughput per event type."""
+    lines = ["%-15s %8s %10s %10s %10s" % ('event type', 'requests', 'p50 (ms)', 'p99 (ms)', 'req/s')]
+    for event_type in sorted(results):
+        latencies, total_time = results[event_type]['latencies'], results[event_type]['time']
+        lines.append("%-15s %8d %10.3f %10.3f %10.1f" % (event_type, len(latencies),
+                                                          percentile(latencies, 50) * 1000,
+                                                          percentile(latencies, 99) * 1000,
+                                                          len(latencies) / total_time))
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Replay signed webhook deliveries against GitHub App")
+    parser.add_argument('--corpus', help="Directory with recorded webhook deliveries (JSON files)")
+    parser.add_argument('--count', type=int, default=1000, help="Number of times to replay each delivery")
+    parser.add_argument('--rate', type=float, default=0, help="Requests per second (0 means no limit)")
+    parser.add_argument('--concurrency', type=int, default=1, help="Number of concurrent clients")
+    parser.add_argument('--server', choices=['flask', 'waitress'], default='flask',
+                        help="Send requests to Flask app directly, or via waitress")
+    opts = parser.parse_args(args)
+
+    corpus = load_corpus(opts.corpus) if opts.corpus else DEFAULT_CORPUS
+    deliveries = sign_deliveries(corpus, BENCHMARK_SECRET)
+
+    os.environ['GITHUB_APP_SECRET_TOKEN'] = BENCHMARK_SECRET
+
+    # don't write app.log (or jobs.json) to current directory
+    os.chdir(tempfile.mkdtemp(prefix='benchmark_webhooks_'))
+
+    flask_app = app.create_app(FakeGithub())
+    if opts.server == 'waitress':
+        send = waitress_sender(flask_app, opts.concurrency)
+    else:
+        send = flask_sender(flask_app)
+
+    results = replay(send, deliveries, opts.count, rate=opts.rate, concurrency=opts.concurrency)
+    print(report(results))
+
+    return results
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
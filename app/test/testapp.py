@@ -1,10 +1,19 @@
 import copy
 import flask
 import github
+import hmac
+import json
 import os
+import pprint
+import pytest
+import threading
+import time
 
-from app import PullRequest, handle_check_run_event, handle_check_suite_event
-from app import handle_event, handle_workflow_run_event
+import app
+import benchmark_webhooks
+from app import JOB_STATUS_DONE, JOB_STATUS_FAILED, JOB_STATUS_QUEUED, DeliveryCache, GitHubHandles, JobExecutor, Logger
+from app import PullRequest, WebhookVerifier
+from app import event_summary, handle_check_run_event, handle_check_suite_event, handle_event, handle_workflow_run_event
 
 
 CHECK_RUN_EVENT = {
@@ -134,9 +143,10 @@ def test_handle_event(monkeypatch):
     def fake_create_comment(_, msg):
         comments.append(msg)
 
+    comments = []
     monkeypatch.setattr(github.Issue.Issue, 'create_comment', fake_create_comment)
 
-    gh = github.Github(os.getenv('GITHUB_TOKEN'))
+    gh = GitHubHandles(github.Github(os.getenv('GITHUB_TOKEN')))
     events = {
         'check_run': CHECK_RUN_EVENT,
         'check_suite': CHECK_SUITE_EVENT,
@@ -154,9 +164,492 @@ def test_handle_event(monkeypatch):
     request = FakeRequest('pull_request', PULL_REQUEST_LABELED_EVENT)
     handle_event(gh, request)
 
+    # cached handle for PR is invalidated when PR is updated
+    issue = gh.get_issue('boegel/easybuild-easyconfigs', 75)
+    assert gh.get_issue('boegel/easybuild-easyconfigs', 75) is issue
+    event = copy.deepcopy(PULL_REQUEST_OPENED_EVENT)
+    event['action'] = 'synchronize'
+    handle_event(gh, FakeRequest('pull_request', event))
+    assert ('boegel/easybuild-easyconfigs', 75) not in gh.handles
+    assert gh.get_issue('boegel/easybuild-easyconfigs', 75) is not issue
+    assert comments == []
+
     # check handling of unsupported events
     request = FakeRequest('unknown_event_type', {})
     res = handle_event(gh, request)
     assert isinstance(res, flask.Response)
     assert res.status_code == 400
     assert res.data == b'{"Unsupported event type": "unknown_event_type"}'
+
+
+def wait_for_job(job_executor, job_id, timeout=10):
+    """Wait until job with specified ID is finished."""
+    start = time.time()
+    while time.time() - start < timeout:
+        job = job_executor.get_job(job_id)
+        if job['status'] in [JOB_STATUS_DONE, JOB_STATUS_FAILED]:
+            return job
+        time.sleep(0.01)
+    raise AssertionError("Job %s did not finish within %s seconds" % (job_id, timeout))
+
+
+def test_job_executor(monkeypatch, tmp_path):
+
+    class FakeIssue(object):
+        def create_comment(self, msg):
+            comments.append(msg)
+
+    class FakeRepo(object):
+        def get_issue(self, pr_id):
+            return FakeIssue()
+
+    comments = []
+    monkeypatch.setattr(github.Github, 'get_repo', lambda self, repo: FakeRepo())
+    monkeypatch.chdir(tmp_path)
+
+    # fake 'eb' command which records the arguments it was run with
+    fake_eb = tmp_path / 'bin' / 'eb'
+    fake_eb.parent.mkdir()
+    fake_eb.write_text('#!/bin/bash\necho "$@" >> %s\nexit ${FAKE_EB_EXIT_CODE:-0}\n' % (tmp_path / 'eb.out'))
+    fake_eb.chmod(0o755)
+    monkeypatch.setenv('PATH', str(fake_eb.parent) + os.pathsep + os.environ['PATH'])
+    monkeypatch.setenv('HOSTNAME', 'testhost')
+
+    job_executor = JobExecutor(jobs_file=str(tmp_path / 'jobs.json'))
+    monkeypatch.setattr(app, 'JOB_EXECUTOR', job_executor)
+
+    gh = github.Github()
+    event = copy.deepcopy(PULL_REQUEST_LABELED_EVENT)
+    event['label']['name'] = 'test:testhost'
+    event['repository']['owner'] = {'login': 'easybuilders'}
+    res = handle_event(GitHubHandles(gh), FakeRequest('pull_request', event))
+
+    # job is run in the background, request is handled right away
+    assert isinstance(res, flask.Response)
+    assert res.status_code == 202
+    job_id = first_job_id = json.loads(res.data)['job_id']
+    assert len(comments) == 1
+    assert comments[0].startswith("Fine, fine, I'm on it.")
+    assert job_id in comments[0]
+
+    job = wait_for_job(job_executor, job_id)
+    assert job['status'] == JOB_STATUS_DONE
+    assert job['exit_code'] == 0
+    assert job['pr'] == 75
+    assert (tmp_path / 'eb.out').read_text() == '--from-pr 75 --robot --force --upload-test-report\n'
+
+    # job is marked as failed if running it fails unexpectedly, and worker keeps running jobs
+    broken_job_id = job_executor.submit(['eb', 'embedded\0null byte'])
+    job = wait_for_job(job_executor, broken_job_id)
+    assert job['status'] == JOB_STATUS_FAILED
+    assert job['exit_code'] is None
+    job_executor.queue.join()
+
+    monkeypatch.setenv('FAKE_EB_EXIT_CODE', '1')
+    job_id = job_executor.submit(['eb', '--version'])
+    job = wait_for_job(job_executor, job_id)
+    assert job['status'] == JOB_STATUS_FAILED
+    assert job['exit_code'] == 1
+
+    # status of jobs can be queried
+    monkeypatch.setenv('GITHUB_APP_SECRET_TOKEN', 'secret')
+    client = app.create_app(gh).test_client()
+    res = client.get('/jobs/' + job_id)
+    assert res.status_code == 200
+    assert res.json['status'] == JOB_STATUS_FAILED
+    assert client.get('/jobs/no_such_job').status_code == 404
+
+    # jobs that were still queued are run again when a new job executor is created
+    jobs = json.loads((tmp_path / 'jobs.json').read_text())
+    assert sorted(jobs) == sorted([first_job_id, broken_job_id, job_id])
+    jobs[job_id]['status'] = JOB_STATUS_QUEUED
+    (tmp_path / 'jobs.json').write_text(json.dumps(jobs))
+    job_executor = JobExecutor(jobs_file=str(tmp_path / 'jobs.json'))
+    job = wait_for_job(job_executor, job_id)
+    assert job['status'] == JOB_STATUS_FAILED
+    assert (tmp_path / 'eb.out').read_text().count('--version') == 2
+
+
+def test_delivery_cache(tmp_path):
+
+    deliveries_file = str(tmp_path / 'deliveries.log')
+    cache = DeliveryCache(path=deliveries_file, max_size=5)
+
+    assert cache.add('delivery-1')
+    assert not cache.add('delivery-1')
+    assert cache.add('delivery-2')
+
+    # delivery can be discarded, so a redelivery is handled
+    cache.discard('delivery-2')
+    assert cache.add('delivery-2')
+    cache.discard('delivery-2')
+
+    # oldest deliveries are evicted when cache is full
+    for idx in range(3, 9):
+        assert cache.add('delivery-%d' % idx)
+    assert list(cache.deliveries) == ['delivery-%d' % idx for idx in range(4, 9)]
+    assert cache.add('delivery-1')
+
+    # file is compacted when it becomes too large
+    with open(deliveries_file) as fh:
+        assert len(fh.readlines()) <= 10
+
+    # deliveries survive a restart
+    cache = DeliveryCache(path=deliveries_file, max_size=5)
+    assert list(cache.deliveries) == ['delivery-%d' % idx for idx in range(5, 9)] + ['delivery-1']
+    assert not cache.add('delivery-8')
+
+    # deliveries that are too old are evicted
+    cache = DeliveryCache(path=deliveries_file, ttl=0.1)
+    assert not cache.add('delivery-1')
+    time.sleep(0.2)
+    assert cache.add('delivery-1')
+    assert list(cache.deliveries) == ['delivery-1']
+    assert list(DeliveryCache(path=deliveries_file, ttl=0.1).deliveries) == ['delivery-1']
+
+    # malformed lines (for example a truncated last line) are skipped, and removed when file is compacted
+    with open(deliveries_file, 'a') as fh:
+        fh.write('123.456\nfoo delivery-2\n- delivery-1\n%.3f delivery-3 ex' % time.time())
+    cache = DeliveryCache(path=deliveries_file)
+    assert list(cache.deliveries) == []
+    assert cache.add('delivery-3')
+    with open(deliveries_file) as fh:
+        assert [line.split()[1] for line in fh] == ['delivery-3']
+
+    # only in memory if no file is specified
+    cache = DeliveryCache(path=None)
+    assert cache.add('delivery-1')
+    assert not cache.add('delivery-1')
+
+
+def test_redelivery(monkeypatch, tmp_path):
+
+    class FakeIssue(object):
+        def create_comment(self, msg):
+            comments.append(msg)
+
+    class FakeRepo(object):
+        def get_issue(self, pr_id):
+            return FakeIssue()
+
+    comments = []
+    monkeypatch.setattr(github.Github, 'get_repo', lambda self, repo: FakeRepo())
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GITHUB_APP_SECRET_TOKEN', 'secret')
+    monkeypatch.setenv('HOSTNAME', 'testhost')
+
+    submitted = []
+    job_executor = JobExecutor(jobs_file=None, max_workers=0)
+    monkeypatch.setattr(job_executor, 'submit', lambda cmd, **info: submitted.append(cmd) or 'job-id')
+    monkeypatch.setattr(app, 'JOB_EXECUTOR', job_executor)
+
+    event = copy.deepcopy(PULL_REQUEST_LABELED_EVENT)
+    event['label']['name'] = 'test:testhost'
+    event['repository']['owner'] = {'login': 'easybuilders'}
+    body = json.dumps(event).encode()
+    headers = {
+        'Content-Type': 'application/json',
+        'X-GitHub-Delivery': '72d3162e-cc78-11e3-81ab-4c9367dc0958',
+        'X-GitHub-Event': 'pull_request',
+        'X-Hub-Signature': 'sha1=' + hmac.new(b'secret', msg=body, digestmod='sha1').hexdigest(),
+    }
+
+    client = app.create_app(github.Github()).test_client()
+    res = client.post('/', data=body, headers=headers)
+    assert res.status_code == 202
+    assert len(submitted) == 1
+    assert len(comments) == 1
+
+    # redelivery is not handled again
+    res = client.post('/', data=body, headers=headers)
+    assert res.status_code == 200
+    assert res.json == {'duplicate delivery': '72d3162e-cc78-11e3-81ab-4c9367dc0958'}
+    assert len(submitted) == 1
+    assert len(comments) == 1
+
+    # also not after a restart of the app
+    client = app.create_app(github.Github()).test_client()
+    res = client.post('/', data=body, headers=headers)
+    assert res.status_code == 200
+    assert len(submitted) == 1
+
+    # other deliveries are handled
+    headers['X-GitHub-Delivery'] = '8e6f4a2c-cc78-11e3-81ab-4c9367dc0958'
+    res = client.post('/', data=body, headers=headers)
+    assert res.status_code == 202
+    assert len(submitted) == 2
+    assert len(comments) == 2
+
+    # if posting comment fails after job was queued, delivery is still considered to be handled,
+    # so a redelivery doesn't result in another job being queued
+    def failing_create_comment(self, msg):
+        raise github.GithubException(500, 'Server Error', None)
+
+    monkeypatch.setattr(FakeIssue, 'create_comment', failing_create_comment)
+    headers['X-GitHub-Delivery'] = '9a1c2b3d-cc78-11e3-81ab-4c9367dc0958'
+    for _ in range(2):
+        res = client.post('/', data=body, headers=headers)
+        assert len(submitted) == 3
+    assert len(comments) == 2
+
+
+def test_webhook_verifier(monkeypatch, tmp_path):
+
+    def sign(secret, body, digestmod):
+        return digestmod + '=' + hmac.new(secret, msg=body, digestmod=digestmod).hexdigest()
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GITHUB_APP_SECRET_TOKEN', 'secret')
+    monkeypatch.delenv('GITHUB_APP_SECRET_TOKEN_NEXT', raising=False)
+    monkeypatch.setattr(app, 'JOB_EXECUTOR', JobExecutor(jobs_file=None, max_workers=0))
+
+    body = json.dumps(PING_EVENT).encode()
+    client = app.create_app(github.Github(), deliveries_file=None).test_client()
+
+    def post(**signatures):
+        headers = {'Content-Type': 'application/json', 'X-GitHub-Event': 'ping'}
+        for key, value in signatures.items():
+            headers[key.replace('_', '-')] = value
+        return client.post('/', data=body, headers=headers).status_code
+
+    assert post(X_Hub_Signature_256=sign(b'secret', body, 'sha256')) == 200
+    assert post(X_Hub_Signature=sign(b'secret', body, 'sha1')) == 200
+    assert post(X_Hub_Signature_256=sign(b'wrong', body, 'sha256')) == 403
+    assert post(X_Hub_Signature=sign(b'wrong', body, 'sha1')) == 403
+    assert post() == 403
+    assert post(X_Hub_Signature='md5=123abc') == 501
+
+    # SHA256 signature is preferred over SHA1 signature
+    sha1_ok, sha1_wrong = sign(b'secret', body, 'sha1'), sign(b'wrong', body, 'sha1')
+    sha256_ok, sha256_wrong = sign(b'secret', body, 'sha256'), sign(b'wrong', body, 'sha256')
+    assert post(X_Hub_Signature=sha1_ok, X_Hub_Signature_256=sha256_wrong) == 403
+    assert post(X_Hub_Signature=sha1_wrong, X_Hub_Signature_256=sha256_ok) == 200
+
+    # a second webhook secret can be used while rotating the webhook secret
+    assert post(X_Hub_Signature_256=sign(b'next_secret', body, 'sha256')) == 403
+    monkeypatch.setenv('GITHUB_APP_SECRET_TOKEN_NEXT', 'next_secret')
+    client = app.create_app(github.Github(), deliveries_file=None).test_client()
+    assert post(X_Hub_Signature_256=sign(b'next_secret', body, 'sha256')) == 200
+    assert post(X_Hub_Signature_256=sign(b'secret', body, 'sha256')) == 200
+    assert post(X_Hub_Signature_256=sign(b'wrong', body, 'sha256')) == 403
+
+    # microbenchmark: verifier vs original implementation (which created a new HMAC object for each request)
+    verifier = WebhookVerifier(['secret'])
+    for size in [1024, 1024 ** 2]:
+        data = b'x' * size
+        signatures = dict((x, sign(b'secret', data, x).split('=')[1]) for x in ['sha1', 'sha256'])
+        cnt = 10 * 1024 ** 2 // size
+
+        start = time.time()
+        for _ in range(cnt):
+            webhook_secret_from_env = os.getenv('GITHUB_APP_SECRET_TOKEN')
+            mac = hmac.new(webhook_secret_from_env.encode(), msg=data, digestmod='sha1')
+            assert hmac.compare_digest(str(mac.hexdigest()), str(signatures['sha1']))
+        old_time = time.time() - start
+
+        new_times = {}
+        for digestmod in ['sha1', 'sha256']:
+            start = time.time()
+            for _ in range(cnt):
+                assert verifier.check(digestmod, signatures[digestmod], data)
+            new_times[digestmod] = time.time() - start
+
+        msg = "verifying %d requests of %d bytes: %.3fs originally (SHA1), %.3fs (SHA1) / %.3fs (SHA256) with verifier"
+        print(msg % (cnt, size, old_time, new_times['sha1'], new_times['sha256']))
+
+
+def test_github_handles(monkeypatch):
+
+    def fake_request(self, verb, url, *args, **kwargs):
+        requests.append((verb, url))
+        return {}, {'url': url}
+
+    requests = []
+    monkeypatch.setattr(github.Requester.Requester, 'requestJsonAndCheck', fake_request)
+    monkeypatch.setenv('HOSTNAME', 'testhost')
+    monkeypatch.setattr(app, 'JOB_EXECUTOR', JobExecutor(jobs_file=None, max_workers=0))
+
+    gh = GitHubHandles(github.Github(), max_size=3)
+
+    # handles are lazy: no GitHub API requests are done to get them
+    issue = gh.get_issue('boegel/easybuild-easyconfigs', 75)
+    assert issue.url.endswith('/repos/boegel/easybuild-easyconfigs/issues/75')
+    assert requests == []
+
+    # handles are cached
+    assert gh.get_issue('boegel/easybuild-easyconfigs', 75) is issue
+    repo = gh.get_repo('boegel/easybuild-easyconfigs')
+    assert gh.get_repo('boegel/easybuild-easyconfigs') is repo
+
+    # least recently used handles are evicted when cache is full
+    gh.get_repo('boegel/boegelbot')
+    gh.get_issue('boegel/boegelbot', 1)
+    assert gh.get_issue('boegel/easybuild-easyconfigs', 75) is not issue
+    assert len(gh.handles) == 3
+
+    # handles are invalidated for relevant events
+    issue = gh.get_issue('boegel/easybuild-easyconfigs', 75)
+    event = copy.deepcopy(PULL_REQUEST_OPENED_EVENT)
+    event['action'] = 'synchronize'
+    handle_event(gh, FakeRequest('pull_request', event))
+    assert gh.get_issue('boegel/easybuild-easyconfigs', 75) is not issue
+
+    repo = gh.get_repo('boegel/easybuild-easyconfigs')
+    event = {
+        'action': 'renamed',
+        'changes': {'repository': {'name': {'from': 'easybuild-easyconfigs'}}},
+        'repository': {'full_name': 'boegel/easyconfigs'},
+    }
+    handle_event(gh, FakeRequest('repository', event))
+    assert gh.get_repo('boegel/easybuild-easyconfigs') is not repo
+    assert ('boegel/easybuild-easyconfigs', 75) not in gh.handles
+
+    # handles expire
+    gh = GitHubHandles(github.Github(), ttl=0)
+    repo = gh.get_repo('boegel/boegelbot')
+    assert gh.get_repo('boegel/boegelbot') is not repo
+
+    # only a single GitHub API request is done to comment on a PR when handling a label event
+    event = copy.deepcopy(PULL_REQUEST_LABELED_EVENT)
+    event['label']['name'] = 'test:testhost'
+    event['repository']['owner'] = {'login': 'easybuilders'}
+    res = handle_event(gh, FakeRequest('pull_request', event))
+    assert res.status_code == 202
+    assert requests == [('POST', '/repos/boegel/easybuild-easyconfigs/issues/75/comments')]
+
+
+def test_logger(tmp_path):
+
+    log_file = tmp_path / 'app.log'
+    logger = Logger(log_file=str(log_file), max_bytes=30 * 1024, backup_count=2)
+
+    # logging from multiple threads at the same time results in complete log lines
+    threads = []
+    for idx in range(10):
+        msgs = ['message %d from thread %d' % (x, idx) for x in range(100)]
+        threads.append(threading.Thread(target=lambda msgs: [logger.log('INFO', msg) for msg in msgs], args=(msgs,)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger.flush()
+
+    # log file is rotated when it becomes too large
+    assert os.path.getsize(log_file) <= 30 * 1024
+    assert os.path.exists(str(log_file) + '.1')
+    assert os.path.exists(str(log_file) + '.2')
+    assert not os.path.exists(str(log_file) + '.3')
+
+    records = []
+    for path in [str(log_file) + '.2', str(log_file) + '.1', str(log_file)]:
+        with open(path) as fh:
+            records.extend(json.loads(line) for line in fh)
+    assert len(records) == 1000
+    assert sorted(records[0]) == ['level', 'msg', 'time']
+    assert records[-1]['level'] == 'INFO'
+
+    # messages from the same thread are logged in order
+    msgs = [record['msg'] for record in records if record['msg'].endswith('from thread 3')]
+    assert msgs == sorted(msgs, key=lambda msg: int(msg.split(' ')[1]))
+    assert msgs[-1] == 'message 99 from thread 3'
+
+    # failing to write a log record doesn't stop the writer thread:
+    # log file that was left closed (for example by failed rotation) is reopened
+    logger.fh.close()
+    for msg in ['one', 'two']:
+        logger.log('INFO', msg)
+    logger.flush()
+    with open(str(log_file)) as fh:
+        assert [json.loads(line)['msg'] for line in fh][-1] == 'two'
+
+    # arguments are formatted with pprint.pformat by writer thread,
+    # log message is also logged if that fails (in which case arguments are included as is)
+    logger.log('INFO', "%s: %s", 'foo', {'bar': 1})
+    logger.log('INFO', "%s: %s", 'foo')
+    logger.log('INFO', "three")
+    logger.flush()
+    with open(str(log_file)) as fh:
+        msgs = [json.loads(line)['msg'] for line in fh][-3:]
+    assert msgs[0] == "'foo': {'bar': 1}"
+    assert msgs[1].startswith("%s: %s [failed to format arguments (")
+    assert msgs[1].endswith("): 'foo']")
+    assert msgs[2] == "three"
+
+
+def test_event_summary():
+
+    # pad events with lots of extra fields, like actual GitHub webhook payloads
+    events = {}
+    for event_type, event in [('check_run', CHECK_RUN_EVENT), ('check_suite', CHECK_SUITE_EVENT),
+                              ('workflow_run', WORKFLOW_RUN_EVENT)]:
+        event = copy.deepcopy(event)
+        event[event_type]['pull_requests'] = [{'number': 12345}]
+        event['repository'].update(('field_%d' % idx, 'value %d' % idx) for idx in range(100))
+        event['sender'] = dict(('field_%d' % idx, 'value %d' % idx) for idx in range(30))
+        events[event_type] = event
+
+    def old_check_run_summary(payload):
+        """Original implementation of summary for check_run events."""
+        pprint.pformat(payload)
+        check_run_data = {
+            'action': payload['action'],
+            'app_name': payload['check_run']['app']['name'],
+            'app_slug': payload['check_run']['app']['slug'],
+            'conclusion': payload['check_run']['conclusion'],
+            'html_url': payload['check_run']['html_url'],
+            'name': payload['check_run']['name'],
+            'repo': payload['repository']['full_name'],
+            'status': payload['check_run']['status'],
+        }
+        pull_requests = payload['check_run'].get('pull_requests', [])
+        if pull_requests:
+            check_run_data['pr_id'] = pull_requests[0]['number']
+        pprint.pformat(check_run_data)
+        return check_run_data
+
+    assert event_summary('check_run', events['check_run']) == old_check_run_summary(events['check_run'])
+    assert event_summary('check_suite', events['check_suite']) == {
+        'action': 'completed',
+        'app_name': 'GitHub Actions',
+        'app_slug': 'github-actions',
+        'conclusion': 'failure',
+        'pr_id': 12345,
+        'repo': 'boegel/boegelbot',
+        'status': 'queued',
+    }
+    assert sorted(event_summary('workflow_run', WORKFLOW_RUN_EVENT)) == [
+        'action', 'conclusion', 'html_url', 'repo', 'status', 'workflow_name', 'workflow_path',
+    ]
+
+    # microbenchmark: summary vs original implementation (which always pretty-printed the payload)
+    cnt = 1000
+    start = time.time()
+    for _ in range(cnt):
+        old_check_run_summary(events['check_run'])
+    old_time = time.time() - start
+
+    start = time.time()
+    for _ in range(cnt):
+        event_summary('check_run', events['check_run'])
+    new_time = time.time() - start
+    print("check_run event summary (%d events): %.3fs with pformat, %.3fs lazy" % (cnt, old_time, new_time))
+
+
+def test_benchmark_webhooks(monkeypatch, tmp_path):
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GITHUB_APP_SECRET_TOKEN', '')
+    monkeypatch.setattr(app, 'JOB_EXECUTOR', JobExecutor(jobs_file=None))
+
+    results = benchmark_webhooks.main(['--count', '10', '--concurrency', '2'])
+    assert sorted(results) == ['check_run', 'check_suite', 'ping', 'pull_request', 'workflow_run']
+    for event_type in results:
+        assert len(results[event_type]['latencies']) == 10
+
+    report = benchmark_webhooks.report(results)
+    assert report.splitlines()[0].split() == ['event', 'type', 'requests', 'p50', '(ms)', 'p99', '(ms)', 'req/s']
+
+    # unexpected status codes are reported, also when they are received in one of the concurrent clients
+    deliveries = benchmark_webhooks.sign_deliveries(benchmark_webhooks.DEFAULT_CORPUS, 'secret')
+    with pytest.raises(RuntimeError, match="Unexpected status code for .* event: 500"):
+        benchmark_webhooks.replay(lambda headers, body: 500, deliveries, 10, concurrency=2)
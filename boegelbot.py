@@ -4,28 +4,29 @@ A bot that helps out with incoming contributions to the EasyBuild project
 
 author: Kenneth Hoste (kenneth.hoste@ugent.be)
 """
+import codecs
+import collections
+import concurrent.futures
 import datetime
+import fcntl
+import functools
+import getpass
+import json
 import os
+import random
 import re
 import shlex
+import signal
 import socket
+import subprocess
 import sys
-from pprint import pformat, pprint
-
-try:
-    import travispy
-except ImportError:
-    pass
-
-from easybuild.tools.build_log import EasyBuildError, print_warning
-from easybuild.tools.config import init_build_options
-from easybuild.tools.github import GITHUB_API_URL, GITHUB_MAX_PER_PAGE, fetch_github_token, post_comment_in_issue
-from easybuild.tools.py2vs3 import HTTPError
-from easybuild.tools.github import GITHUB_PR_STATE_OPEN, STATUS_PENDING, STATUS_SUCCESS, fetch_pr_data
-from easybuild.tools.run import run_cmd
-from easybuild.tools.systemtools import get_system_info
-
-from easybuild.base.generaloption import simple_option
+import threading
+import time
+from pprint import pformat
+from urllib.error import HTTPError
+
+# only lightweight modules are imported here, to keep startup fast;
+# (expensive) imports of EasyBuild framework modules (and travispy) are done only when they are actually needed
 from easybuild.base.rest import RestClient
 
 
@@ -33,13 +34,136 @@ DRY_RUN = False
 TRAVIS_URL = 'https://travis-ci.org'
 VERSION = '20200716.01'
 
+# same values as in easybuild.tools.github, defined here to avoid having to import it
+GITHUB_API_URL = 'https://api.github.com'
+GITHUB_MAX_PER_PAGE = 100
+GITHUB_PR_STATE_OPEN = 'open'
+KEYRING_GITHUB_TOKEN = 'github_token'
+STATUS_PENDING = 'pending'
+STATUS_SUCCESS = 'success'
+
+# EasyBuild configuration is only initialised when EasyBuild functionality is used, see init_easybuild
+EASYBUILD_INITIALIZED = False
+EASYBUILD_INIT_LOCK = threading.Lock()
+
+# commands to submit test jobs for the same EasyBuild branch (other than develop) are not run concurrently,
+# since they update the checkouts of the EasyBuild repositories for that branch first (see easybuild_develop.sh)
+SUBMIT_LOCKS = {}
+SUBMIT_LOCKS_LOCK = threading.Lock()
+
 MODE_CHECK_GITHUB_ACTIONS = 'check_github_actions'
 MODE_CHECK_TRAVIS = 'check_travis'
+MODE_DAEMON = 'daemon'
 MODE_TEST_PR = 'test_pr'
 
+# default intervals (in seconds) for periodic tasks in daemon mode, randomized with 10% jitter
+DAEMON_INTERVAL_CHECK_GITHUB_ACTIONS = 10 * 60
+DAEMON_INTERVAL_REFRESH = 15 * 60
+DAEMON_INTERVAL_TEST_PR = 2 * 60
+DAEMON_JITTER = 0.1
+
+# actions that can be requested via a comment in which the bot is mentioned, see CommandParser
+REQUEST_ACTION_SCREAM = 'scream'
+REQUEST_ACTION_TEST = 'test'
+# custom arguments that can be specified when requesting to test a PR (like EB_ARGS="...")
+REQUEST_ARGS = ['CORE_CNT', 'EB_ARGS', 'EB_BRANCH', 'SLURM_ARGS']
+
+# EasyBuild repositories for which checkouts are kept up to date in daemon mode
+EASYBUILD_REPOS = ['easybuild-framework', 'easybuild-easyblocks', 'easybuild-easyconfigs']
+# maximum time (in seconds) to wait for lock on checkouts of a repository (same as in easybuild_develop.sh)
+CHECKOUT_LOCK_TIMEOUT = 600
+
 # see https://github.com/easybuilders/easybuild-containers
 CONTAINER_BASE_URL = 'docker://ghcr.io/easybuilders'
 
+# maximum number of retries for GitHub API requests when rate limit is hit
+GITHUB_API_MAX_RETRIES = 5
+# initial backoff time (in seconds) for GitHub API requests when hitting the rate limit (doubled for every retry)
+GITHUB_API_BACKOFF = 10
+# maximum time to wait (in seconds) before retrying a GitHub API request
+GITHUB_API_MAX_WAIT = 15 * 60
+
+# check string included in comments by bot, to avoid processing the same notification multiple times
+PROCESSED_CHECK_TMPL = "notification for comment with ID %s processed"
+PROCESSED_REGEX = re.compile(PROCESSED_CHECK_TMPL % r'(\S+)')
+
+# pattern for comments in which the bot is mentioned (bot should be mentioned at the start of a line)
+MENTION_REGEX_TMPL = r'^\s*@%s:?\s*'
+
+# notifications are polled no more often than indicated by GitHub (via X-Poll-Interval header, 60s by default)
+NOTIFICATIONS_POLL_INTERVAL = 60
+LINK_NEXT_REGEX = re.compile(r'<(?P<url>[^>]+)>;\s*rel="next"')
+
+# job ID is included in output of 'sbatch', for example: "Submitted batch job 1234"
+SLURM_JOB_ID_REGEX = re.compile(r'^Submitted batch job (?P<job_id>[0-9]+)', re.M)
+# Slurm job states for jobs that are not finished yet (as reported by sacct)
+SLURM_ACTIVE_STATES = ('COMPLETING', 'PENDING', 'REQUEUED', 'RESIZING', 'RUNNING', 'SUSPENDED')
+# decisions by admission scheduler for requests to test a PR
+ADMIT_DUPLICATE = 'duplicate'
+ADMIT_QUEUED = 'queued'
+ADMIT_SUBMIT = 'submit'
+ADMIT_TESTED = 'tested'
+# marker for duplicate of a request that was admitted in the same batch (job for it is being submitted)
+DUPLICATE_PENDING = 'pending'
+# priorities for requests to test a PR (lower value means higher priority)
+TEST_REQUEST_PRIORITY_MAINTAINER = 0
+TEST_REQUEST_PRIORITY_CONTRIBUTOR = 1
+# Slurm jobs are no longer tracked if no status was found for them after 7 days
+SLURM_JOB_MAX_AGE = 7 * 24 * 3600
+# results of test jobs are used for 30 days for identical requests to test a PR
+TEST_RESULT_MAX_AGE = 30 * 24 * 3600
+# test reports are posted in PR by 'eb --upload-test-report' (using same GitHub account as bot)
+TEST_REPORT_PREFIX = "Test report by @"
+# suffixes for memory sizes reported by Slurm (like MaxRSS)
+SLURM_MEM_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# time (in seconds) during which cached PR data is used without revalidating it
+PR_CACHE_TTL = 5 * 60
+# maximum number of entries in PR data cache
+PR_CACHE_MAX_SIZE = 1000
+
+# job logs are downloaded and processed in chunks of 1MB
+JOB_LOG_CHUNK_SIZE = 1024 * 1024
+# maximum number of lines of test suite output to include in comment
+JOB_LOG_MAX_LINES = 100
+
+# line that marks end of output for failing test suite
+TEST_SUITE_ERROR_LINE = "ERROR: Not all tests were successful"
+# line that marks start of test output: only dots and 'E'/'F' characters
+START_TEST_REGEX = re.compile(r'^[\.EF]+$')
+# timestamp prefix for lines in GitHub Actions job logs, for example: 2020-07-13T09:54:36.5004935Z
+TIMESTAMP_REGEX = re.compile(r'^[0-9-]{10}T[0-9:]{8}\.[0-9]+Z ')
+
+# patterns for fluke failures in job logs,
+# each with a literal string that must be present in the log for the pattern to match
+FLUKE_PATTERNS = [
+    # Travis fluke failures
+    (r"Failed to connect to .* port [0-9]+: Connection timed out", ": Connection timed out"),
+    (r"fatal: unable to access .*: Failed to connect to github.com port [0-9]+: Connection timed out",
+     "fatal: unable to access "),
+    (r"Could not connect to ppa.launchpad.net.*, connection timed out", ", connection timed out"),
+    (r"Failed to fetch .* Unable to connect to .*", " Unable to connect to "),
+    (r"Failed to fetch .* Service Unavailable", " Service Unavailable"),
+    (r"ERROR 504: Gateway Time-out", "ERROR 504: Gateway Time-out"),
+    (r"Could not connect to .*, connection timed out", ", connection timed out"),
+    (r"No output has been received in the last [0-9]*m[0-9]*s, this potentially indicates a stalled build",
+     "No output has been received in the last "),
+    (r"curl.*SSL read: error", "SSL read: error"),
+    (r"A TLS packet with unexpected length was received", "A TLS packet with unexpected length was received"),
+    (r"ReadTimeoutError:.*Read timed out", "Read timed out"),
+    (r"ERROR 500: Internal Server Error", "ERROR 500: Internal Server Error"),
+    (r"Some index files failed to download", "Some index files failed to download"),
+    (r"Error 502: Bad Gateway", "Error 502: Bad Gateway"),
+    # GitHub Actions fluke failures
+    (r"500 \(Internal Server Error\)", "500 (Internal Server Error)"),
+    (r"failed: Connection timed out", "failed: Connection timed out"),  # for downloading stuff from SourceForge
+    (r"unable to resolve host address", "unable to resolve host address"),  # DNS issues
+    (r"fetch-pack: unexpected disconnect", "fetch-pack: unexpected disconnect"),
+    (r"Internal Server Error occurred while resolving", "Internal Server Error occurred while resolving"),
+]
+# compile fluke patterns only once
+FLUKE_REGEXES = [(literal, re.compile(pattern, re.M)) for (pattern, literal) in FLUKE_PATTERNS]
+
 
 def error(msg):
     """Print error message and exit."""
@@ -57,46 +181,206 @@ def info(msg):
     print("%s... %s" % (msg, ('', '[DRY RUN]')[DRY_RUN]))
 
 
-def is_fluke(job_log_txt):
-    """Detect fluke failures in Travis job log."""
-    fluke_patterns = [
-        # Travis fluke failures
-        r"Failed to connect to .* port [0-9]+: Connection timed out",
-        r"fatal: unable to access .*: Failed to connect to github.com port [0-9]+: Connection timed out",
-        r"Could not connect to ppa.launchpad.net.*, connection timed out",
-        r"Failed to fetch .* Unable to connect to .*",
-        r"Failed to fetch .* Service Unavailable",
-        r"ERROR 504: Gateway Time-out",
-        r"Could not connect to .*, connection timed out",
-        r"No output has been received in the last [0-9]*m[0-9]*s, this potentially indicates a stalled build",
-        r"curl.*SSL read: error",
-        r"A TLS packet with unexpected length was received",
-        r"ReadTimeoutError:.*Read timed out",
-        r"ERROR 500: Internal Server Error",
-        r"Some index files failed to download",
-        r"Error 502: Bad Gateway",
-        # GitHub Actions fluke failures
-        r"500 \(Internal Server Error\)",
-        r"failed: Connection timed out",  # for downloading stuff from SourceForge
-        r"unable to resolve host address",  # DNS issues
-        r"fetch-pack: unexpected disconnect",
-        r"Internal Server Error occurred while resolving",
-    ]
-    fluke = False
-    for pattern in fluke_patterns:
-        regex = re.compile(pattern, re.M)
-        if regex.search(job_log_txt):
-            print("Fluke found: '%s'" % regex.pattern)
-            fluke = True
-            break
+def init_easybuild():
+    """Initialise EasyBuild configuration, if it wasn't done yet."""
+    global EASYBUILD_INITIALIZED
+    with EASYBUILD_INIT_LOCK:
+        if not EASYBUILD_INITIALIZED:
+            from easybuild.tools.config import init_build_options
+            init_build_options()
+            EASYBUILD_INITIALIZED = True
+
+
+def det_commit_status(account, repository, commit_sha, github_user):
+    """Determine status of specified commit (see easybuild.tools.github.det_commit_status)."""
+    init_easybuild()
+    from easybuild.tools.github import det_commit_status as eb_det_commit_status
+    return eb_det_commit_status(account, repository, commit_sha, github_user)
+
+
+def get_github_token(github_user):
+    """
+    Get GitHub token for specified user from keyring: directly via keyring if possible,
+    since that's a lot cheaper than importing easybuild.tools.github to use fetch_github_token.
+    """
+    token = None
+    try:
+        import keyring
+        token = keyring.get_password(KEYRING_GITHUB_TOKEN, github_user)
+    except ImportError:
+        pass
+    except Exception as err:
+        warning("Failed to get GitHub token for %s from keyring: %s" % (github_user, err))
+
+    if token is None:
+        # fall back to EasyBuild (which also provides an informative message if no token is available)
+        from easybuild.tools.github import fetch_github_token
+        token = fetch_github_token(github_user)
+
+    return token
+
 
-    return fluke
+def iter_log_chunks(job_log):
+    """
+    Iterate over job log in chunks that only contain complete lines.
+
+    The job log can be provided as a single string, or as an iterable of chunks (strings),
+    so the full job log does not have to be kept in memory.
+    """
+    if isinstance(job_log, str):
+        job_log = [job_log]
+
+    # partial line at the end of a chunk is carried over to the next chunk
+    partial_line = ''
+    for chunk in job_log:
+        chunk = partial_line + chunk
+        idx = chunk.rfind('\n') + 1
+        chunk, partial_line = chunk[:idx], chunk[idx:]
+        if chunk:
+            yield chunk
+
+    # last line may not be terminated by a newline
+    if partial_line:
+        yield partial_line + '\n'
+
+
+def find_fluke_in_chunk(chunk):
+    """Find fluke failure in chunk of job log, and return pattern that matched (or None if no fluke was found)."""
+    for literal, regex in FLUKE_REGEXES:
+        # use cheap substring check to avoid running the regular expression if it can not match
+        if literal in chunk and regex.search(chunk):
+            return regex.pattern
+
+    return None
+
+
+def find_fluke(job_log):
+    """
+    Find fluke failure in job log (string or iterable of chunks),
+    and return pattern that matched (or None if no fluke was found).
+    """
+    for chunk in iter_log_chunks(job_log):
+        fluke_pattern = find_fluke_in_chunk(chunk)
+        if fluke_pattern:
+            return fluke_pattern
+
+    return None
+
+
+def is_fluke(job_log):
+    """Detect fluke failures in Travis/GitHub Actions job log."""
+    fluke_pattern = find_fluke(job_log)
+    if fluke_pattern:
+        print("Fluke found: '%s'" % fluke_pattern)
+
+    return bool(fluke_pattern)
+
+
+def github_api_headers(github):
+    """Return headers to use for (low-level) requests to GitHub API."""
+    client = github.client
+    headers = {'User-Agent': client.user_agent}
+    if client.auth_header is not None:
+        headers['Authorization'] = client.auth_header
+    return headers
+
+
+def github_api_get_conditional(github, url, etag=None, **params):
+    """
+    Perform GET request to GitHub API for specified URL (JSON data),
+    as a conditional request if the ETag of previously downloaded data is specified.
+
+    Returns HTTP status code, data, and ETag; status code 304 (with None as data) indicates that data was not modified.
+    """
+    client = github.client
+    headers = github_api_headers(github)
+    if etag:
+        headers['If-None-Match'] = etag
+
+    try:
+        conn = client.get_connection(client.GET, url + client.urlencode(params), None, headers)
+    except HTTPError as err:
+        if err.code == 304:
+            return 304, None, etag
+        raise
+
+    try:
+        return conn.code, json.loads(conn.read()), conn.headers.get('ETag')
+    finally:
+        conn.close()
+
+
+def stream_github_url(github, url, chunk_size=JOB_LOG_CHUNK_SIZE):
+    """
+    Stream contents of specified GitHub API URL as decoded text, rather than downloading it in one go.
+
+    Returns HTTP status code and generator for chunks of text;
+    urllib's HTTPError is raised (right away) if the request fails.
+    """
+    client = github.client
+    conn = client.get_connection(client.GET, url, None, github_api_headers(github))
+
+    def read_chunks():
+        """Read and decode chunks from connection (until it's exhausted)."""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        try:
+            chunk = conn.read(chunk_size)
+            while chunk:
+                yield decoder.decode(chunk)
+                chunk = conn.read(chunk_size)
+            yield decoder.decode(b'', final=True)
+        finally:
+            conn.close()
+
+    return conn.code, read_chunks()
+
+
+def scan_job_log(job_log, max_lines=JOB_LOG_MAX_LINES):
+    """
+    Scan job log (string or iterable of chunks) for output of failing test suite, in a single streaming pass.
+
+    Only (up to) the last max_lines lines are retained in a ring buffer, so memory usage is bounded
+    regardless of the size of the job log.
+
+    Returns a tuple with:
+    * list of retained log lines (timestamp prefixes stripped);
+    * boolean indicating whether line that marks end of test suite output was found;
+    * boolean indicating whether lines were dropped because of max_lines;
+    * pattern for fluke failure (only determined if end of test suite output was not found, None otherwise)
+    """
+    tail = collections.deque(maxlen=max_lines)
+    # number of lines since last line that marks start of test output
+    test_lines_cnt = 0
+    fluke_pattern = None
+
+    for chunk in iter_log_chunks(job_log):
+        if fluke_pattern is None:
+            fluke_pattern = find_fluke_in_chunk(chunk)
+
+        for line in chunk.splitlines():
+            line = TIMESTAMP_REGEX.sub('', line)
+
+            tail.append(line)
+
+            # only retain output that follows the line that marks start of test output
+            if START_TEST_REGEX.match(line):
+                test_lines_cnt = 0
+                continue
+
+            test_lines_cnt += 1
+            if line.startswith(TEST_SUITE_ERROR_LINE):
+                log_lines = list(tail)[-min(test_lines_cnt, len(tail)):]
+                return log_lines, True, test_lines_cnt > max_lines, None
+
+    return list(tail), False, False, fluke_pattern
 
 
 def fetch_travis_failed_builds(github_account, repository, owner, github_token):
     """Scan Travis test runs for failures, and return notification to be sent to PR if one is found"""
 
-    if 'travispy' not in globals():
+    try:
+        import travispy
+    except ImportError:
         error("travisy not available?!")
 
     travis = travispy.TravisPy.github_auth(github_token)
@@ -143,7 +427,7 @@ def fetch_travis_failed_builds(github_account, repository, owner, github_token):
                         flukes.append(job_id)
 
                 if flukes:
-                    boegel_gh_token = fetch_github_token('boegel')
+                    boegel_gh_token = get_github_token('boegel')
                     if boegel_gh_token:
                         travis_boegel = travispy.TravisPy.github_auth(boegel_gh_token)
                         for (job_id, job) in zip(flukes, travis_boegel.jobs(ids=flukes)):
@@ -197,10 +481,834 @@ def fetch_travis_failed_builds(github_account, repository, owner, github_token):
     return res
 
 
-def fetch_github_failed_workflows(github, github_account, repository, github_user, owner):
-    """Scan GitHub Actions for failed workflow runs."""
+def github_api_call(func, *args, **kwargs):
+    """
+    Perform GitHub API request via specified function,
+    and retry with backoff if the GitHub API rate limit (or secondary rate limit) was hit.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except HTTPError as err:
+            if err.code not in (403, 429) or attempt >= GITHUB_API_MAX_RETRIES:
+                raise
+
+            # see https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api
+            headers = err.headers or {}
+            if headers.get('Retry-After'):
+                wait = int(headers['Retry-After'])
+            elif headers.get('X-RateLimit-Remaining') == '0' and headers.get('X-RateLimit-Reset'):
+                wait = int(headers['X-RateLimit-Reset']) - time.time()
+            elif err.code == 429:
+                wait = GITHUB_API_BACKOFF * 2 ** attempt
+            else:
+                # 403 that is not related to rate limiting
+                raise
 
-    res = []
+            wait = min(max(wait, 1), GITHUB_API_MAX_WAIT)
+            warning("GitHub API rate limit hit (status %s), retrying in %d seconds..." % (err.code, wait))
+            time.sleep(wait)
+            attempt += 1
+
+
+def run_concurrently(func, items, max_workers):
+    """
+    Run specified function for each of the items, concurrently if max_workers > 1,
+    and return list of results (in the same order as the items).
+    """
+    items = list(items)
+    if max_workers > 1 and len(items) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(func, items))
+    else:
+        return [func(item) for item in items]
+
+
+def split_workers(max_workers, cnt):
+    """
+    Split specified maximum number of workers across specified number of items that are processed concurrently;
+    returns number of items to process concurrently, and number of workers to use for each of them
+    (so the total number of workers never exceeds max_workers).
+    """
+    max_workers = max(max_workers, 1)
+    cnt = max(min(cnt, max_workers), 1)
+    return cnt, max_workers // cnt
+
+
+class PRDataCache(object):
+    """
+    Cache for (full) pull request data, shared across modes.
+
+    Entries are keyed by (account, repository, PR), and are only valid for the head SHA of the PR they were fetched for.
+    Entries that are younger than ttl seconds are used as is, older entries (and entries loaded from disk)
+    are revalidated using conditional requests (ETag/If-None-Match), so unchanged data only costs a 304 response.
+    Only the max_size most recently used entries are retained.
+    """
+
+    # (relative) URLs for parts of full PR data that can be revalidated via conditional requests
+    URLS = {
+        'pr': 'repos/%(account)s/%(repository)s/pulls/%(pr)s',
+        'issue_comments': 'repos/%(account)s/%(repository)s/issues/%(pr)s/comments',
+        'reviews': 'repos/%(account)s/%(repository)s/pulls/%(pr)s/reviews',
+    }
+
+    def __init__(self, path=None, ttl=PR_CACHE_TTL, max_size=PR_CACHE_MAX_SIZE):
+        """Constructor."""
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hit': 0, 'not modified': 0, 'download': 0}
+
+        if self.path and os.path.exists(self.path):
+            self.load()
+
+    def load(self):
+        """Load cache entries from disk."""
+        try:
+            with open(self.path) as fh:
+                entries = json.load(fh)
+        except (IOError, ValueError) as err:
+            warning("Failed to load PR data cache from %s: %s" % (self.path, err))
+            return
+
+        for entry in entries:
+            # entries loaded from disk must always be revalidated
+            key = tuple(entry.pop('key'))
+            self.entries[key] = dict(entry, comment_index={}, timestamp=0)
+
+        print("Loaded %d entries from PR data cache %s" % (len(self.entries), self.path))
+
+    def save(self):
+        """Save cache entries to disk (if a path was specified)."""
+        if not self.path:
+            return
+
+        with self.lock:
+            entries = [{'key': key, 'etags': entry['etags'], 'pr_data': entry['pr_data']}
+                       for (key, entry) in self.entries.items()]
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(entries, fh)
+        os.replace(tmp_path, self.path)
+
+        print("PR data cache saved to %s (%d entries; %s)" % (self.path, len(entries), self.stats_str()))
+
+    def stats_str(self):
+        """Return string representation of cache statistics."""
+        return ', '.join('%d %s' % (self.stats[key], key) for key in sorted(self.stats))
+
+    def invalidate(self, pr_data):
+        """Invalidate entry for specified PR, for example after posting a comment in it."""
+        base_repo = pr_data['base']['repo']
+        key = (base_repo['owner']['login'], base_repo['name'], int(pr_data['number']))
+        with self.lock:
+            if key in self.entries:
+                self.entries[key]['timestamp'] = 0
+
+    def comment_index(self, pr_data, github_user):
+        """Return index for comments in specified PR data, which is only created once per cache entry."""
+        base_repo = pr_data['base']['repo']
+        key = (base_repo['owner']['login'], base_repo['name'], int(pr_data['number']))
+        with self.lock:
+            entry = self.entries.get(key)
+
+        # only cache index if specified PR data is the data that is cached
+        if entry is None or entry['pr_data'] is not pr_data:
+            return CommentIndex(pr_data['issue_comments'], github_user)
+
+        if github_user not in entry['comment_index']:
+            entry['comment_index'][github_user] = CommentIndex(pr_data['issue_comments'], github_user)
+        return entry['comment_index'][github_user]
+
+    def fetch(self, github, pr, account, repository, github_user, head_sha=None):
+        """
+        Fetch full data for specified PR, using cached data where possible.
+        If the head SHA of the PR is specified, cached data for another head SHA is not used as is.
+        """
+        key = (account, repository, int(pr))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+
+        if entry and time.time() - entry['timestamp'] < self.ttl:
+            if head_sha is None or entry['pr_data']['head']['sha'] == head_sha:
+                with self.lock:
+                    self.stats['hit'] += 1
+                return entry['pr_data']
+
+        old_etags = entry['etags'] if entry else {}
+        old_pr_data = entry['pr_data'] if entry else {}
+
+        tmpl_dict = {'account': account, 'repository': repository, 'pr': pr}
+        pr_data, etags, stats = {}, {}, []
+        for name in sorted(self.URLS):
+            url = self.URLS[name] % tmpl_dict
+            params = {} if name == 'pr' else {'per_page': GITHUB_MAX_PER_PAGE}
+            status, data, etags[name] = github_api_call(github_api_get_conditional, github, url,
+                                                        etag=old_etags.get(name), **params)
+            if status == 304:
+                stats.append('not modified')
+                if name == 'pr':
+                    pr_data.update((k, v) for (k, v) in old_pr_data.items() if k not in self.URLS)
+                else:
+                    pr_data[name] = old_pr_data[name]
+            elif status == 200:
+                stats.append('download')
+                if name == 'pr':
+                    pr_data.update(data)
+                else:
+                    pr_data[name] = data
+            else:
+                msg = "Failed to get data for %s/%s PR #%s from %s (status: %s)"
+                error(msg % (account, repository, pr, url, status))
+
+        # status of last commit can change without the PR data changing, so it is always determined
+        pr_data['status_last_commit'] = det_commit_status(account, repository, pr_data['head']['sha'], github_user)
+
+        with self.lock:
+            for stat in stats:
+                self.stats[stat] += 1
+            self.entries[key] = {'comment_index': {}, 'etags': etags, 'pr_data': pr_data, 'timestamp': time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        return pr_data
+
+
+def normalize_comment(txt):
+    """Normalize text of comment, by stripping leading/trailing whitespace from every line."""
+    return '\n'.join(line.strip() for line in txt.strip().splitlines())
+
+
+class CommentIndex(object):
+    """
+    Index for comments in a pull request, to check in constant time whether a particular message was already posted,
+    or whether a notification for a particular comment was already processed.
+    Also keeps track of the author of each comment, and of the most recent comment in which the bot is mentioned.
+    """
+
+    def __init__(self, comments, github_user):
+        """
+        Constructor: index (normalized) body and lines of all comments, IDs of comments for which bot processed
+        a notification, author of each comment, and most recent comment that mentions the bot
+        (all in a single pass, latest first).
+        """
+        self.bodies = set()
+        self.lines = set()
+        self.processed_ids = set()
+        self.authors = {}
+        self.latest_mention = None
+
+        mention_regex = re.compile(MENTION_REGEX_TMPL % github_user, re.M)
+
+        for comment_data in reversed(comments):
+            comment_txt, comment_by = comment_data['body'], comment_data['user']['login']
+            body = normalize_comment(comment_txt)
+            self.bodies.add(body)
+            self.lines.update(body.splitlines())
+            self.authors[comment_data['id']] = comment_by
+            if comment_by == github_user:
+                self.processed_ids.update(PROCESSED_REGEX.findall(comment_txt))
+            if self.latest_mention is None and mention_regex.search(comment_txt):
+                self.latest_mention = comment_data
+
+    def author(self, comment_id):
+        """Return GitHub login of author of comment with specified ID (None if comment is not known)."""
+        return self.authors.get(comment_id)
+
+    def contains(self, check_msg):
+        """Check whether specified message is included in any of the comments."""
+        check_msg = normalize_comment(check_msg)
+        if check_msg in self.bodies:
+            return True
+        # only look into each comment if all lines of message are found in comments at all,
+        # since lines of message could be spread across different comments
+        if not all(line in self.lines for line in check_msg.splitlines()):
+            return False
+        return any(check_msg in body for body in self.bodies)
+
+    def is_processed(self, comment_id):
+        """Check whether notification for comment with specified ID was already processed."""
+        return str(comment_id) in self.processed_ids
+
+
+class WorkflowRunJournal(object):
+    """
+    Journal of GitHub Actions workflow runs that were already processed (per repository),
+    which can be persisted to disk so workflow runs are only processed again if they were updated.
+    """
+
+    def __init__(self, path=None):
+        """Constructor."""
+        self.path = path
+        self.repos = {}
+        # workflow runs that are only recorded once a comment was posted in the corresponding PR:
+        # (account, repository, PR) -> list of workflow runs
+        self.pending = {}
+
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path) as fh:
+                    self.repos = json.load(fh)
+            except (IOError, ValueError) as err:
+                warning("Failed to load journal of workflow runs from %s: %s" % (self.path, err))
+
+    def _repo(self, github_account, repository):
+        """Return journal entry for specified repository."""
+        return self.repos.setdefault(github_account + '/' + repository, {'runs': {}})
+
+    def is_done(self, github_account, repository, entry):
+        """Check whether specified workflow run was already processed (and was not updated since)."""
+        return self._repo(github_account, repository)['runs'].get(str(entry['id'])) == entry['updated_at']
+
+    def record(self, github_account, repository, entries):
+        """Record specified workflow runs as processed."""
+        repo = self._repo(github_account, repository)
+        for entry in entries:
+            repo['runs'][str(entry['id'])] = entry['updated_at']
+
+    def defer(self, github_account, repository, pr, entries):
+        """Record specified workflow runs as processed once a comment was posted in specified PR (see commit)."""
+        self.pending.setdefault((github_account, repository, pr), []).extend(entries)
+
+    def commit(self, github_account, repository, pr):
+        """Record workflow runs as processed that were deferred until a comment was posted in specified PR."""
+        self.record(github_account, repository, self.pending.pop((github_account, repository, pr), []))
+
+    def prune(self, github_account, repository, entries):
+        """Only retain processed workflow runs that are included in specified list of workflow runs."""
+        repo = self._repo(github_account, repository)
+        run_ids = set(str(entry['id']) for entry in entries)
+        repo['runs'] = dict((run_id, ts) for (run_id, ts) in repo['runs'].items() if run_id in run_ids)
+
+    def save(self):
+        """Save journal to disk (if a path was specified, and not in dry run mode)."""
+        if self.path and not DRY_RUN:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as fh:
+                json.dump(self.repos, fh, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class NotificationsPoller(object):
+    """
+    Engine for polling GitHub notifications: each poll only transfers notifications that were updated since
+    the previous poll ('since' parameter + If-Modified-Since header), and honours the poll interval
+    that is indicated by GitHub. State of the poller can be persisted to disk, to use it across runs.
+    """
+
+    def __init__(self, path=None):
+        """Constructor."""
+        self.path = path
+        self.state = {'last_modified': None, 'last_poll': 0, 'poll_interval': 0, 'since': None}
+        # state resulting from last poll, which is only applied once notifications were processed (see commit)
+        self.pending = {}
+
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path) as fh:
+                    self.state.update(json.load(fh))
+            except (IOError, ValueError) as err:
+                warning("Failed to load state of notifications poller from %s: %s" % (self.path, err))
+
+    def _get(self, github, url, headers):
+        """Get page of notifications; returns HTTP status code, data, and response headers."""
+        client = github.client
+        try:
+            conn = client.get_connection(client.GET, url, None, headers)
+        except HTTPError as err:
+            if err.code == 304:
+                return 304, [], err.headers
+            raise
+
+        try:
+            return conn.code, json.loads(conn.read()), conn.headers
+        finally:
+            conn.close()
+
+    def poll(self, github):
+        """
+        Poll for notifications that were updated since the previous poll, following pagination.
+        Notifications that were already read are included, since they may have been marked as read
+        by another host that uses the same GitHub account.
+        Without state of a previous poll, only unread notifications are considered.
+        Next poll only considers notifications that were updated since this poll once commit() is called.
+
+        Returns None if the poll interval did not expire yet.
+        """
+        # discard state of previous poll that was not committed (since processing notifications failed)
+        self.pending = {}
+
+        wait = self.state['last_poll'] + self.state['poll_interval'] - time.time()
+        if wait > 0:
+            print("Not polling notifications yet, poll interval expires in %d seconds" % wait)
+            return None
+
+        since = self.state['since']
+
+        client = github.client
+        params = {'per_page': GITHUB_MAX_PER_PAGE}
+        if since:
+            params.update({'all': 'true', 'since': since})
+        url = 'notifications' + client.urlencode(params)
+        headers = github_api_headers(github)
+        if self.state['last_modified'] and since:
+            headers['If-Modified-Since'] = self.state['last_modified']
+
+        notifications = []
+        first_page = True
+        while url:
+            status, data, resp_headers = github_api_call(self._get, github, url, headers)
+            if first_page:
+                self.state['poll_interval'] = int(resp_headers.get('X-Poll-Interval') or NOTIFICATIONS_POLL_INTERVAL)
+                if status == 304:
+                    print("No notifications updated since %s" % since)
+                    break
+                self.pending['last_modified'] = resp_headers.get('Last-Modified')
+                # only first page is requested conditionally
+                headers.pop('If-Modified-Since', None)
+                first_page = False
+
+            notifications.extend(data)
+
+            res = LINK_NEXT_REGEX.search(resp_headers.get('Link') or '')
+            if res:
+                url = res.group('url')
+                if url.startswith(client.url):
+                    url = url[len(client.url):]
+            else:
+                url = None
+
+        self.state['last_poll'] = time.time()
+        # timestamps are in ISO 8601 format, so they can be compared as strings
+        timestamps = [notification['updated_at'] for notification in notifications]
+        if since:
+            timestamps.append(since)
+        if timestamps:
+            self.pending['since'] = max(timestamps)
+
+        return notifications
+
+    def commit(self):
+        """Apply state resulting from last poll, after notifications were processed."""
+        self.state.update(self.pending)
+        self.pending = {}
+
+    def save(self):
+        """
+        Save state of poller to disk (if a path was specified);
+        not in dry run mode, since notifications are not acted upon then (so they must be considered again).
+        """
+        if self.path and not DRY_RUN:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as fh:
+                json.dump(self.state, fh, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+def parse_mem_size(value):
+    """Parse memory size as reported by Slurm (like '1234K'), and return it in bytes (None if it can't be parsed)."""
+    res = re.match(r'^(?P<size>[0-9.]+)(?P<unit>[KMGT]?)$', value.strip())
+    if res:
+        return int(float(res.group('size')) * SLURM_MEM_UNITS[res.group('unit')])
+    return None
+
+
+class SlurmJobTracker(object):
+    """
+    Tracker for Slurm jobs that were submitted to test a PR: all outstanding jobs are checked with a single 'squeue'
+    command (and a single 'sacct' command for jobs that are no longer in the queue), so the status of finished jobs
+    can be reported back in the PR. Tracked jobs (and requests to test a PR that were queued by the admission
+    scheduler, see AdmissionScheduler) can be persisted to disk, to keep track of them across runs.
+    """
+
+    def __init__(self, path=None, slurm_path=None):
+        """Constructor."""
+        self.path = path
+        # directory in which Slurm commands are located (if they're not available via $PATH)
+        self.slurm_path = slurm_path
+        self.jobs = {}
+        self.queue = []
+        # results of finished jobs, see result_key
+        self.results = {}
+        self.lock = threading.Lock()
+
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path) as fh:
+                    data = json.load(fh)
+                self.jobs, self.queue = data['jobs'], data['queue']
+                self.results = data.get('results', {})
+            except (IOError, KeyError, ValueError) as err:
+                warning("Failed to load tracked Slurm jobs from %s: %s" % (self.path, err))
+
+    def add(self, job_id, test_request):
+        """Start tracking specified job, which was submitted for specified request to test a PR."""
+        with self.lock:
+            self.jobs[str(job_id)] = {
+                'account': test_request['account'],
+                'cmd': test_request['cmd'],
+                'head_sha': test_request.get('head_sha'),
+                'host': test_request.get('host'),
+                'pr': int(test_request['pr']),
+                'repository': test_request['repository'],
+                'requested_by': test_request['requested_by'],
+                'submitted': time.time(),
+            }
+
+    @staticmethod
+    def result_key(test_request):
+        """
+        Return key for result of specified request to test a PR (or job that was submitted for it):
+        head SHA of the PR + test command (which includes the PR, EasyBuild branch, arguments for 'eb' and container).
+        """
+        return '%s %s' % (test_request.get('head_sha'), test_request['cmd'])
+
+    def record_result(self, job, report_url=None):
+        """Record result of specified finished job, and URL to corresponding test report (if known)."""
+        with self.lock:
+            self.results[self.result_key(job)] = {
+                'exit_code': job['exit_code'],
+                'finished': time.time(),
+                'job_id': job['id'],
+                'report_url': report_url,
+                'state': job['state'],
+            }
+
+    def get_result(self, test_request):
+        """Return result for specified request to test a PR, if there is one (and it's not too old)."""
+        result = self.results.get(self.result_key(test_request))
+        if result and time.time() - result['finished'] < TEST_RESULT_MAX_AGE:
+            return result
+        return None
+
+    def _run(self, cmd):
+        """Run specified Slurm command, and return output (None if command failed)."""
+        if self.slurm_path:
+            cmd = [os.path.join(self.slurm_path, cmd[0])] + cmd[1:]
+        try:
+            res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        except OSError as err:
+            warning("Failed to run '%s': %s" % (' '.join(cmd), err))
+            return None
+        if res.returncode:
+            warning("'%s' failed (exit code %s): %s" % (' '.join(cmd), res.returncode, res.stderr.strip()))
+            return None
+        return res.stdout
+
+    def done(self, job_id):
+        """Stop tracking specified job (once status of finished job was reported)."""
+        with self.lock:
+            self.jobs.pop(str(job_id), None)
+
+    def poll(self):
+        """
+        Check status of all tracked jobs.
+        Returns list of finished jobs, with state, exit code, elapsed time and maximum memory usage (MaxRSS);
+        finished jobs are still tracked until done() is called for them, so their status is reported only once.
+        """
+        with self.lock:
+            job_ids = sorted(self.jobs, key=int)
+        if not job_ids:
+            return []
+
+        # jobs that are still queued or running are listed by squeue (which doesn't require job accounting);
+        # squeue fails if none of the specified jobs are known anymore, so list all jobs of current user
+        # (--me is not supported by older Slurm versions)
+        out = self._run(['squeue', '--noheader', '--user=' + getpass.getuser(), '--format=%i %T'])
+        if out is None:
+            return []
+        queued = set(line.split()[0] for line in out.splitlines() if line.strip())
+
+        done_ids = [job_id for job_id in job_ids if job_id not in queued]
+        if not done_ids:
+            return []
+
+        # get accounting info for all jobs that are no longer queued at once;
+        # MaxRSS is only available for job steps (like <job id>.batch), so take maximum over all steps
+        cmd = ['sacct', '--noheader', '--parsable2', '--jobs=' + ','.join(done_ids),
+               '--format=JobID,State,ExitCode,Elapsed,MaxRSS']
+        out = self._run(cmd)
+        if out is None:
+            return []
+
+        accounting = {}
+        for line in out.splitlines():
+            fields = line.split('|')
+            if len(fields) != 5:
+                continue
+            job_id, step = (fields[0].split('.', 1) + [None])[:2]
+            info = accounting.setdefault(job_id, {'max_rss': None, 'max_rss_bytes': -1})
+            if step is None:
+                # 'CANCELLED by 12345' => 'CANCELLED'
+                info.update({'state': fields[1].split(' ')[0], 'exit_code': fields[2], 'elapsed': fields[3]})
+            rss_bytes = parse_mem_size(fields[4])
+            if rss_bytes is not None and rss_bytes > info['max_rss_bytes']:
+                info.update({'max_rss': fields[4], 'max_rss_bytes': rss_bytes})
+
+        finished = []
+        with self.lock:
+            for job_id in done_ids:
+                info = accounting.get(job_id)
+                job = self.jobs[job_id]
+                if info and 'state' in info and info['state'] not in SLURM_ACTIVE_STATES:
+                    del info['max_rss_bytes']
+                    finished.append(dict(job, id=job_id, **info))
+                elif time.time() - job['submitted'] > SLURM_JOB_MAX_AGE:
+                    warning("No status found for Slurm job %s, so no longer tracking it" % job_id)
+                    del self.jobs[job_id]
+
+        return finished
+
+    def save(self):
+        """
+        Save tracked jobs (and queued requests + results of jobs) to disk (if a path was specified);
+        not in dry run mode, since status of finished jobs is not reported then (so it must be reported later).
+        """
+        if self.path and not DRY_RUN:
+            with self.lock:
+                # only retain results that can still be used
+                now = time.time()
+                self.results = dict((key, result) for (key, result) in self.results.items()
+                                    if now - result['finished'] < TEST_RESULT_MAX_AGE)
+                data = {'jobs': self.jobs, 'queue': self.queue, 'results': self.results}
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w') as fh:
+                    json.dump(data, fh, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+
+
+class AdmissionScheduler(object):
+    """
+    Admission control for requests to test a PR on the current host:
+    duplicate requests (same test command for the same head SHA of a PR) are merged with outstanding jobs,
+    or answered with the result of a job that was already run (unless testing the PR again is forced);
+    the number of outstanding test jobs is capped, and requests that can't be submitted yet are queued
+    in priority order (requests by maintainers first, next smaller PRs first, next oldest requests first).
+    Outstanding jobs, queued requests and results of finished jobs are kept in the Slurm job tracker.
+    """
+
+    def __init__(self, job_tracker, max_jobs=0):
+        """Constructor."""
+        self.job_tracker = job_tracker
+        # maximum number of outstanding test jobs (0 means no limit)
+        self.max_jobs = max_jobs
+        # number of requests that were admitted, but for which no job was submitted yet
+        self.pending = 0
+
+    @staticmethod
+    def priority(test_request):
+        """Return priority for specified request to test a PR (lower value means higher priority)."""
+        return (test_request['priority'], test_request['changed_files'], test_request['received'])
+
+    @staticmethod
+    def is_duplicate(test_request, other):
+        """Check whether specified requests to test a PR are duplicates."""
+        return test_request['cmd'] == other['cmd'] and test_request.get('head_sha') == other.get('head_sha')
+
+    def _has_capacity(self):
+        """Check whether another test job can be submitted (should be called while holding job tracker lock)."""
+        return not self.max_jobs or len(self.job_tracker.jobs) + self.pending < self.max_jobs
+
+    def admit(self, test_requests):
+        """
+        Decide for each of the specified requests to test a PR whether to submit a test job now, or to queue it,
+        or whether it's a duplicate of an outstanding job or queued request.
+        Returns list of (decision, info) tuples (in the same order as the requests):
+        (ADMIT_SUBMIT, None), (ADMIT_QUEUED, <position in queue>),
+        (ADMIT_DUPLICATE, <job ID, None if queued, DUPLICATE_PENDING if admitted in same batch>),
+        or (ADMIT_TESTED, <result of job that was already run>).
+        """
+        decisions = [None] * len(test_requests)
+        queued = []
+        with self.job_tracker.lock:
+            jobs, queue = self.job_tracker.jobs, self.job_tracker.queue
+            admitted = []
+            for idx in sorted(range(len(test_requests)), key=lambda idx: self.priority(test_requests[idx])):
+                test_request = test_requests[idx]
+                force = test_request.get('force', False)
+                job_ids = [job_id for (job_id, job) in jobs.items() if self.is_duplicate(test_request, job)]
+                result = None if force else self.job_tracker.get_result(test_request)
+                if job_ids and not force:
+                    decisions[idx] = (ADMIT_DUPLICATE, job_ids[0])
+                elif any(self.is_duplicate(test_request, other) for other in admitted):
+                    decisions[idx] = (ADMIT_DUPLICATE, DUPLICATE_PENDING)
+                elif any(self.is_duplicate(test_request, other) for other in queue):
+                    decisions[idx] = (ADMIT_DUPLICATE, None)
+                elif result:
+                    decisions[idx] = (ADMIT_TESTED, result)
+                # requests that were queued before and have higher priority go first
+                elif self._has_capacity() and (not queue or self.priority(test_request) < self.priority(queue[0])):
+                    decisions[idx] = (ADMIT_SUBMIT, None)
+                    admitted.append(test_request)
+                    self.pending += 1
+                else:
+                    queue.append(test_request)
+                    queue.sort(key=self.priority)
+                    queued.append(idx)
+
+            # only determine positions in queue when all requests were queued
+            for idx in queued:
+                position = next(pos for (pos, other) in enumerate(queue) if other is test_requests[idx])
+                decisions[idx] = (ADMIT_QUEUED, position + 1)
+
+        return decisions
+
+    def dispatch(self):
+        """Return queued requests to test a PR that can be submitted now (and remove them from the queue)."""
+        released = []
+        with self.job_tracker.lock:
+            queue = self.job_tracker.queue
+            while queue and self._has_capacity():
+                released.append(queue.pop(0))
+                self.pending += 1
+        return released
+
+    def submitted(self, cnt):
+        """
+        Register that specified number of admitted (or dispatched) requests are no longer pending
+        (test jobs were submitted for them, or submitting them failed).
+        """
+        with self.job_tracker.lock:
+            self.pending -= cnt
+
+    def requeue(self, test_requests):
+        """Put specified dispatched requests back in the queue, since no test jobs were submitted for them."""
+        with self.job_tracker.lock:
+            self.job_tracker.queue.extend(test_requests)
+            self.job_tracker.queue.sort(key=self.priority)
+            self.pending -= len(test_requests)
+
+
+def det_pr_for_head(github, github_account, repository, head):
+    """Determine data for PR that corresponds to specified head (<user>:<branch>), if any."""
+    status, pr_data = github_api_call(github.repos[github_account][repository].pulls.get, head=head)
+    if status != 200:
+        error("Status for downloading data for PR with head %s should be 200, got %s" % (head, status))
+
+    if len(pr_data) == 1:
+        return pr_data[0]
+    else:
+        warning("Expected exactly one PR with head %s, found %s: %s" % (head, len(pr_data), pr_data))
+        return None
+
+
+def process_failed_workflow_run(github, github_account, repository, owner, entry, pr_data):
+    """
+    Process failed workflow run for (open) PR for which the status of the last commit is not pending or successful,
+    and return comment to post in PR and message to check whether it was already posted (or None).
+    """
+    pr_id = pr_data['number']
+    pr_head_sha = pr_data['head']['sha']
+
+    # make sure workflow was run for latest commit in this PR
+    head_sha = entry['head_sha']
+    if head_sha != pr_head_sha:
+        msg = "Workflow %s was for commit %s, " % (entry['html_url'], head_sha)
+        msg += "not latest commit in PR #%s (%s), so skipping" % (pr_id, pr_head_sha)
+        print(msg)
+        return None
+
+    # download list of jobs in workflow
+    run_id = entry['id']
+    status, jobs_data = github_api_call(github.repos[github_account][repository].actions.runs[run_id].jobs.get)
+    if status != 200:
+        error("Failed to download list of jobs for workflow run %s" % entry['html_url'])
+
+    # determine ID of first failing job
+    job_id = None
+    for job in jobs_data['jobs']:
+        if job['conclusion'] == 'failure':
+            job_id = job['id']
+            print("Found failing job for workflow %s: %s" % (entry['html_url'], job_id))
+            break
+
+    if job_id is None:
+        error("ID of failing job not found for workflow %s" % entry['html_url'])
+
+    status = None
+    try:
+        logs_url = 'repos/%s/%s/actions/jobs/%s/logs' % (github_account, repository, job_id)
+        status, log_chunks = github_api_call(stream_github_url, github, logs_url)
+    except HTTPError as err:
+        status = err.code
+
+    if status == 200:
+        print("Streaming log for job %s" % job_id)
+    else:
+        warning("Failed to download log for job %s" % job_id)
+        log_chunks = '(failed to fetch log contents due to HTTP status code %s)' % status
+
+    log_lines, error_line_found, truncated, fluke_pattern = scan_job_log(log_chunks)
+
+    if not error_line_found:
+        msg = "Log line that marks end of test suite output not found for job %s! " % job_id
+        msg += "Last %d lines of log:\n%s" % (len(log_lines), '\n'.join(log_lines))
+        warning(msg)
+        if fluke_pattern:
+            print("Fluke found: '%s'" % fluke_pattern)
+            owner_gh_token = get_github_token(owner)
+            if owner_gh_token:
+                github_owner = RestClient(GITHUB_API_URL, username=owner, token=owner_gh_token,
+                                          user_agent='eb-pr-check')
+                print("Fluke found, restarting this workflow using @%s's GitHub account..." % owner)
+                repo_api = github_owner.repos[github_account][repository]
+                # note: this must be one line
+                # have to use __getattr__ because rerun-failed-jobs includes dashes
+                # cfr. https://docs.github.com/en/rest/actions/workflow-runs?apiVersion=2022-11-28#re-run-a-workflow
+                status, _  = repo_api.__getattr__('actions/runs/%s/rerun-failed-jobs' % run_id).post()
+                if status == 201:
+                    print("Failed jobs for workflow %s restarted" % entry['html_url'])
+                else:
+                    print("Failed to restart failed jobs for workflow %s: status %s" % (entry['html_url'], status))
+            else:
+                warning("Fluke found but can't restart workflow, no token found for @%s" % owner)
+
+        return None
+
+    # compose comment
+    pr_comment = "@%s: Tests failed in GitHub Actions" % pr_data['user']['login']
+    pr_comment += ", see %s" % entry['html_url']
+
+    # use first part of comment to check whether comment was already posted
+    check_msg = pr_comment
+
+    if truncated:
+        pr_comment += "\nLast %d lines of output from first failing test suite run:\n\n```" % len(log_lines)
+    else:
+        pr_comment += "\nOutput from first failing test suite run:\n\n```"
+
+    for line in log_lines:
+        pr_comment += line + '\n'
+
+    pr_comment += "```\n"
+
+    pr_comment += "\n*bleep, bloop, I'm just a bot (boegelbot v%s)*\n" % VERSION
+    pr_comment += "Please talk to my owner `@%s` if you notice me acting stupid),\n" % owner
+    pr_comment += "or submit a pull request to https://github.com/boegel/boegelbot fix the problem."
+
+    return pr_comment, check_msg
+
+
+def fetch_github_failed_workflows(github, github_account, repository, github_user, owner, max_workers=1,
+                                  pr_cache=None, run_journal=None):
+    """
+    Scan GitHub Actions for failed workflow runs.
+
+    GitHub API requests are performed concurrently for different PRs (using up to max_workers threads),
+    the result is the same as when processing the workflow runs one by one.
+
+    If a journal of workflow runs is provided, workflow runs that were already processed before
+    (and were not updated since) are skipped.
+    """
+    if pr_cache is None:
+        pr_cache = PRDataCache()
 
     # only consider failed workflows triggered by pull requests
     params = {
@@ -212,7 +1320,7 @@ def fetch_github_failed_workflows(github, github_account, repository, github_use
     }
 
     try:
-        status, run_data = github.repos[github_account][repository].actions.runs.get(**params)
+        status, run_data = github_api_call(github.repos[github_account][repository].actions.runs.get, **params)
     except socket.gaierror as err:
         error("Failed to download GitHub Actions workflow runs data: %s" % err)
 
@@ -222,8 +1330,8 @@ def fetch_github_failed_workflows(github, github_account, repository, github_use
     else:
         error("Status for downloading GitHub Actions workflow runs data should be 200, got %s" % status)
 
-    failing_prs = set()
-
+    failed_runs = []
+    done_cnt = 0
     for idx, entry in enumerate(run_data):
 
         if entry['status'] != 'completed':
@@ -234,161 +1342,87 @@ def fetch_github_failed_workflows(github, github_account, repository, github_use
             print("Ignoring successful workflow run %s" % entry['html_url'])
             continue
 
+        if run_journal and run_journal.is_done(github_account, repository, entry):
+            done_cnt += 1
+            continue
+
         head_user = entry['head_repository']['owner']['login']
         head = '%s:%s' % (head_user, entry['head_branch'])
-        head_sha = entry['head_sha']
-
-        # determine corresponding PR (if any)
-        status, pr_data = github.repos[github_account][repository].pulls.get(head=head)
-        if status != 200:
-            error("Status for downloading data for PR with head %s should be 200, got %s" % (head, status))
-
-        if len(pr_data) == 1:
-            pr_data = pr_data[0]
+        failed_runs.append((idx, head, entry))
+
+    if run_journal:
+        print("Ignoring %d failed workflow runs that were already processed" % done_cnt)
+
+    # determine corresponding PR (if any), only once per head
+    heads = list(dict.fromkeys(head for (_, head, _) in failed_runs))
+    det_pr = functools.partial(det_pr_for_head, github, github_account, repository)
+    pr_data_per_head = dict(zip(heads, run_concurrently(det_pr, heads, max_workers)))
+
+    # group failed workflow runs per PR, retaining order
+    failed_runs_per_pr = {}
+    pr_head_shas = {}
+    for idx, head, entry in failed_runs:
+        pr_data = pr_data_per_head[head]
+        if pr_data:
             print("Failed workflow run %s found (PR: %s)" % (entry['html_url'], pr_data['html_url']))
-
-            pr_id = pr_data['number']
-
-            # skip PRs for which a failing workflow was already encountered
-            if pr_id in failing_prs:
-                print("PR #%s already encountered, so skipping workflow %s" % (pr_id, entry['html_url']))
-                continue
-
-            pr_data, _ = fetch_pr_data(pr_id, github_account, repository, github_user, full=True,
-                                       per_page=GITHUB_MAX_PER_PAGE)
-
-            if pr_data['state'] == 'open':
-
-                pr_head_sha = pr_data['head']['sha']
-
-                # make sure workflow was run for latest commit in this PR
-                if head_sha != pr_head_sha:
-                    msg = "Workflow %s was for commit %s, " % (entry['html_url'], head_sha)
-                    msg += "not latest commit in PR #%s (%s), so skipping" % (pr_id, pr_head_sha)
-                    print(msg)
-                    continue
-
-                # check status of most recent commit in this PR,
-                # ignore this PR if status is "success" or "pending"
-                pr_status = pr_data['status_last_commit']
-                print("Status of last commit (%s) in PR #%s: %s" % (pr_head_sha, pr_id, pr_status))
-
-                if pr_status in ['action_required', STATUS_PENDING, STATUS_SUCCESS]:
-                    print("Status of last commit in PR #%s is '%s', so ignoring it for now..." % (pr_id, pr_status))
-                    continue
-
-                # download list of jobs in workflow
-                run_id = entry['id']
-                status, jobs_data = github.repos[github_account][repository].actions.runs[run_id].jobs.get()
-                if status != 200:
-                    error("Failed to download list of jobs for workflow run %s" % entry['html_url'])
-
-                # determine ID of first failing job
-                job_id = None
-                for job in jobs_data['jobs']:
-                    if job['conclusion'] == 'failure':
-                        job_id = job['id']
-                        print("Found failing job for workflow %s: %s" % (entry['html_url'], job_id))
-                        break
-
-                if job_id is None:
-                    error("ID of failing job not found for workflow %s" % entry['html_url'])
-
-                status = None
-                try:
-                    status, log_txt = github.repos[github_account][repository].actions.jobs[job_id].logs.get()
-                    log_txt = log_txt.decode(errors='ignore')
-                except HTTPError as err:
-                    status = err.code
-
-                if status == 200:
-                    print("Downloaded log for job %s" % job_id)
-                else:
-                    warning("Failed to download log for job %s" % job_id)
-                    log_txt = '(failed to fetch log contents due to HTTP status code %s)' % status
-
-                # strip off timestamp prefixes
-                # example timestamp: 2020-07-13T09:54:36.5004935Z
-                timestamp_regex = re.compile(r'^[0-9-]{10}T[0-9:]{8}\.[0-9]+Z ')
-                log_lines = [timestamp_regex.sub('', x) for x in log_txt.splitlines()]
-
-                # determine line that marks end of output for failing test suite:
-                # "ERROR: Not all tests were successful"
-                error_line_idx = None
-                for idx, line in enumerate(log_lines):
-                    if line.startswith("ERROR: Not all tests were successful"):
-                        error_line_idx = idx
-                        print("Found error line @ index %s" % error_line_idx)
-                        break
-
-                if error_line_idx is None:
-                    log_txt_clean = '\n'.join(log_lines)
-                    warning("Log line that marks end of test suite output not found for job %s!\n%s" % (job_id, log_txt_clean))
-                    if is_fluke(log_txt):
-                        owner_gh_token = fetch_github_token(owner)
-                        if owner_gh_token:
-                            github_owner = RestClient(GITHUB_API_URL, username=owner, token=owner_gh_token,
-                                                      user_agent='eb-pr-check')
-                            print("Fluke found, restarting this workflow using @%s's GitHub account..." % owner)
-                            repo_api = github_owner.repos[github_account][repository]
-                            # note: this must be one line
-                            # have to use __getattr__ because rerun-failed-jobs includes dashes
-                            # cfr. https://docs.github.com/en/rest/actions/workflow-runs?apiVersion=2022-11-28#re-run-a-workflow
-                            status, _  = repo_api.__getattr__('actions/runs/%s/rerun-failed-jobs' % run_id).post()
-                            if status == 201:
-                                print("Failed jobs for workflow %s restarted" % entry['html_url'])
-                            else:
-                                print("Failed to restart failed jobs for workflow %s: status %s" % (entry['html_url'], status))
-                        else:
-                            warning("Fluke found but can't restart workflow, no token found for @%s" % owner)
-
-                    continue
-
-                # find line that marks start of test output: only dots and 'E'/'F' characters
-                start_test_regex = re.compile(r'^[\.EF]+$')
-                start_line_idx = error_line_idx
-                start_log_line = log_lines[start_line_idx]
-                while(start_line_idx >= 0 and not (start_log_line and start_test_regex.match(start_log_line))):
-                    start_line_idx -= 1
-                    start_log_line = log_lines[start_line_idx]
-
-                log_lines = log_lines[start_line_idx+1:error_line_idx+1]
-
-                # compose comment
-                pr_comment = "@%s: Tests failed in GitHub Actions" % pr_data['user']['login']
-                pr_comment += ", see %s" % entry['html_url']
-
-                # use first part of comment to check whether comment was already posted
-                check_msg = pr_comment
-
-                if len(log_lines) > 100:
-                    log_lines = log_lines[-100:]
-                    pr_comment += "\nLast 100 lines of output from first failing test suite run:\n\n```"
-                else:
-                    pr_comment += "\nOutput from first failing test suite run:\n\n```"
-
-                for line in log_lines:
-                    pr_comment += line + '\n'
-
-                pr_comment += "```\n"
-
-                pr_comment += "\n*bleep, bloop, I'm just a bot (boegelbot v%s)*\n" % VERSION
-                pr_comment += "Please talk to my owner `@%s` if you notice me acting stupid),\n" % owner
-                pr_comment += "or submit a pull request to https://github.com/boegel/boegelbot fix the problem."
-
-                res.append((pr_id, pr_comment, check_msg))
-                failing_prs.add(pr_id)
-            else:
+            failed_runs_per_pr.setdefault(pr_data['number'], []).append((idx, entry))
+            pr_head_shas[pr_data['number']] = pr_data['head']['sha']
+
+    def process_pr(pr_id):
+        """
+        Process failed workflow runs for specified PR (in order), until one is found to report back on.
+        Returns result (if any) and list of workflow runs that no longer need to be considered.
+        """
+        pr_runs = failed_runs_per_pr[pr_id]
+        pr_data = pr_cache.fetch(github, pr_id, github_account, repository, github_user,
+                                 head_sha=pr_head_shas[pr_id])
+
+        if pr_data['state'] != 'open':
+            for _ in pr_runs:
                 print("Ignoring failed workflow run for closed PR %s" % pr_data['html_url'])
-        else:
-            warning("Expected exactly one PR with head %s, found %s: %s" % (head, len(pr_data), pr_data))
+            return None, [entry for (_, entry) in pr_runs]
+
+        # check status of most recent commit in this PR,
+        # ignore this PR if status is "success" or "pending"
+        pr_status = pr_data['status_last_commit']
+        print("Status of last commit (%s) in PR #%s: %s" % (pr_data['head']['sha'], pr_id, pr_status))
+
+        if pr_status in ['action_required', STATUS_PENDING, STATUS_SUCCESS]:
+            print("Status of last commit in PR #%s is '%s', so ignoring it for now..." % (pr_id, pr_status))
+            # workflow runs must be considered again later, since status of this PR may still change
+            return None, []
+
+        for idx, entry in pr_runs:
+            pr_res = process_failed_workflow_run(github, github_account, repository, owner, entry, pr_data)
+            if pr_res:
+                # skip other workflow runs for PRs for which a failing workflow was already encountered
+                skipped = [e['html_url'] for (i, e) in pr_runs if i > idx]
+                if skipped:
+                    print("PR #%s already encountered, so skipping workflows %s" % (pr_id, ', '.join(skipped)))
+                return (idx, (pr_id,) + pr_res), [entry for (_, entry) in pr_runs]
+
+        return None, [entry for (_, entry) in pr_runs]
+
+    pr_results = run_concurrently(process_pr, failed_runs_per_pr, max_workers)
+
+    # sort results by index of corresponding workflow run, to ensure deterministic output
+    res = [pr_res for (_, pr_res) in sorted(x for (x, _) in pr_results if x)]
+
+    if run_journal:
+        for pr_res, done_runs in pr_results:
+            if pr_res:
+                # workflow runs for PRs to report back on are only recorded once the comment was posted
+                run_journal.defer(github_account, repository, pr_res[1][0], done_runs)
+            else:
+                run_journal.record(github_account, repository, done_runs)
+        run_journal.prune(github_account, repository, run_data)
 
     print("Processed %d failed workflow runs, found %d PRs to report back on" % (len(run_data), len(res)))
 
     return res
 
 
-def comment(github, github_user, repository, pr_data, msg, check_msg=None, verbose=True):
+def comment(github, github_user, repository, pr_data, msg, check_msg=None, verbose=True, pr_cache=None):
     """Post a comment in the pull request."""
     # decode message first, if needed
     known_msgs = {
@@ -410,13 +1444,16 @@ def comment(github, github_user, repository, pr_data, msg, check_msg=None, verbo
 
     # only actually post comment if it wasn't posted before
     if check_msg:
-        msg_regex = re.compile(re.escape(check_msg), re.M)
-        for comment in pr_data['issue_comments']:
-            if msg_regex.search(comment['body']):
-                msg = "Message already found (using pattern '%s'), " % check_msg
-                msg += "not posting comment again to PR %s!" % pr_data['number']
-                print(msg)
-                return
+        if pr_cache:
+            comment_index = pr_cache.comment_index(pr_data, github_user)
+        else:
+            comment_index = CommentIndex(pr_data['issue_comments'], github_user)
+
+        if comment_index.contains(check_msg):
+            msg = "Message already found (using pattern '%s'), " % check_msg
+            msg += "not posting comment again to PR %s!" % pr_data['number']
+            print(msg)
+            return
         print("Message not found yet (using pattern '%s'), stand back for posting!" % check_msg)
 
     target = '%s/%s' % (pr_data['base']['repo']['owner']['login'], pr_data['base']['repo']['name'])
@@ -425,19 +1462,123 @@ def comment(github, github_user, repository, pr_data, msg, check_msg=None, verbo
     else:
         info("Posting comment as user '%s' in %s PR #%s" % (github_user, target, pr_data['number']))
     if not DRY_RUN:
+        init_easybuild()
+        from easybuild.tools.github import post_comment_in_issue
         post_comment_in_issue(pr_data['number'], msg, repo=repository, github_user=github_user)
+        # make sure cached PR data is not used as is anymore, since it doesn't include the posted comment
+        if pr_cache:
+            pr_cache.invalidate(pr_data)
     print("Done!")
 
 
-def check_notifications(github, github_user, github_account, repository):
+class BotRequest(object):
+    """Request for the bot, as parsed from a comment in which the bot was mentioned."""
+
+    def __init__(self, msg, for_host=False, for_gpuhost=False, action=None, container=None, args=None, force=False):
+        """Constructor."""
+        # comment text, with mentions of the bot removed
+        self.msg = msg
+        # whether request is for the current host or GPU host (i.e. whether it is mentioned)
+        self.for_host = for_host
+        self.for_gpuhost = for_gpuhost
+        # requested action (REQUEST_ACTION_*), None if it's not clear what is requested
+        self.action = action
+        # container image to test in (if specified)
+        self.container = container
+        # custom arguments for 'eb' or submit command (core_cnt, eb_args, eb_branch, slurm_args)
+        self.args = args or {}
+        # whether PR should be tested again, even if it was already tested (with the same settings)
+        self.force = force
+
+    def __eq__(self, other):
+        return isinstance(other, BotRequest) and self.__dict__ == other.__dict__
+
+    def __repr__(self):
+        return 'BotRequest(%s)' % ', '.join('%s=%r' % (key, value) for (key, value) in sorted(self.__dict__.items()))
+
+
+class CommandParser(object):
+    """
+    Parser for comments in which the bot is mentioned.
+    Regular expressions for the supported commands are only compiled once (when the parser is created).
     """
-    Check notification for specified repository (and act on them).
+
+    def __init__(self, github_user, host, gpuhost):
+        """Constructor."""
+        # make sure that also only --host can be specified without --gpuhost and vice versa
+        host = host or 'NO_HOST_PATTERN_PROVIDED'
+        gpuhost = gpuhost or 'NO_GPUHOST_PATTERN_PROVIDED'
+
+        self.mention_regex = re.compile(MENTION_REGEX_TMPL % github_user, re.M)
+        self.host_regex = re.compile(r'@.*%s' % host, re.M)
+        self.gpuhost_regex = re.compile(r'@.*%s' % gpuhost, re.M)
+        self.please_regex = re.compile(r'[Pp]lease test', re.M)
+        self.force_regex = re.compile(r'^(--)?force[.,!]?$', re.I)
+        self.in_container_regex = re.compile(r'[Pp]lease test @.*%s in container (?P<container>.*)' % host, re.M)
+        self.arg_regex = re.compile(r'^(?P<key>%s)=(?P<value>.*)$' % '|'.join(REQUEST_ARGS), re.S)
+
+    def is_mention(self, comment_txt):
+        """Check whether bot is mentioned in specified comment."""
+        return bool(self.mention_regex.search(comment_txt))
+
+    def parse(self, comment_txt):
+        """Parse specified comment; returns BotRequest instance, or None if bot is not mentioned in comment."""
+        if not self.mention_regex.search(comment_txt):
+            return None
+
+        msg = self.mention_regex.sub(' ', comment_txt)
+        req = BotRequest(msg, for_host=bool(self.host_regex.search(msg)),
+                         for_gpuhost=bool(self.gpuhost_regex.search(msg)))
+
+        if "PLEASE " in msg:
+            req.action = REQUEST_ACTION_SCREAM
+        elif self.please_regex.search(msg):
+            req.action = REQUEST_ACTION_TEST
+
+            res = self.in_container_regex.search(msg)
+            if res:
+                req.container = res.group('container').strip()
+
+            # check whether custom arguments for 'eb' or submit command are specified (like EB_ARGS="...")
+            try:
+                items = shlex.split(msg)
+            except ValueError as err:
+                warning("Failed to split message in parts (%s), ignoring quotes" % err)
+                items = msg.split()
+            for item in items:
+                res = self.arg_regex.match(item)
+                if res:
+                    req.args[res.group('key').lower()] = res.group('value')
+                # 'force' outside of custom arguments (so not in EB_ARGS="--force") means testing again is forced
+                elif self.force_regex.match(item):
+                    req.force = True
+
+        return req
+
+
+def index_notifications(notifications):
+    """Index notifications by (full) repository name and reason."""
+    index = {}
+    for notification in notifications:
+        index.setdefault((notification['full_repo_name'], notification['reason']), []).append(notification)
+    return index
+
+
+def check_notifications(github, github_user, github_account, repositories, poller=None):
+    """
+    Check notification for specified repositories (and act on them).
+    Returns dict with list of relevant notifications for each of the repositories.
     """
     print("Checking notifcations... (current time: %s)" % datetime.datetime.now())
 
-    status, res = github.notifications.get(per_page=GITHUB_MAX_PER_PAGE)
+    if poller is None:
+        poller = NotificationsPoller()
+
+    res = poller.poll(github)
+    if res is None:
+        return dict((repository, []) for repository in repositories)
 
-    print("Found %d unread notifications" % len(res))
+    print("Found %d updated notifications" % len(res))
 
     # only retain stuff we care about
     notifications = []
@@ -452,25 +1593,144 @@ def check_notifications(github, github_user, github_account, repository):
         })
 
     # filter notifications:
-    # - only notifications for repo we care about
+    # - only notifications for repos we care about
     # - only notifications for mentions
     # - only notifications for pull requests
-    full_repo_name = github_account + '/' + repository
-    retained = []
-    for notification in notifications:
-        if notification['full_repo_name'] == full_repo_name and notification['subject']['type'] == 'PullRequest':
-            if notification['reason'] == 'mention':
-                retained.append(notification)
-    print("Retained %d relevant notifications after filtering" % len(retained))
+    index = index_notifications(notifications)
+    retained = {}
+    for repository in repositories:
+        mentions = index.get((github_account + '/' + repository, 'mention'), [])
+        retained[repository] = [x for x in mentions if x['subject']['type'] == 'PullRequest']
+    print("Retained %d relevant notifications after filtering" % sum(len(x) for x in retained.values()))
 
     return retained
 
 
-def process_notifications(notifications, github, github_user, github_account, repository, host, gpuhost, pr_test_cmd, core_cnt, gpu_job_opt):
-    """Process provided notifications."""
+def mark_notification_read(github, thread_id):
+    """Mark notification thread with specified ID as read."""
+    if DRY_RUN:
+        print("[DRY RUN] Not marking notification thread %s as read" % thread_id)
+    else:
+        github_api_call(github.notifications.threads[thread_id].patch)
+
+
+def submit_test_job(cmd):
+    """
+    Run specified command to submit job to test a PR (usually an 'sbatch' command), and return (output, exit code).
+    Commands are run directly via subprocess (rather than via EasyBuild's run_cmd),
+    so they can be run concurrently (run_cmd changes the working directory, and caches results per command).
+    """
+    res = subprocess.run(cmd, shell=True, executable='/bin/bash', stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                         universal_newlines=True)
+    return (res.stdout, res.returncode)
+
+
+def submit_lock(eb_branch):
+    """Return lock to use when submitting jobs to test a PR with specified EasyBuild branch."""
+    with SUBMIT_LOCKS_LOCK:
+        return SUBMIT_LOCKS.setdefault(eb_branch, threading.Lock())
+
+
+def submit_test_requests(test_requests, job_tracker=None, scheduler=None, max_workers=1):
+    """
+    Submit jobs for specified requests to test a PR (concurrently, using up to max_workers threads),
+    and start tracking submitted Slurm jobs (if a job tracker is specified).
+    Jobs for requests that use the same EasyBuild branch (other than develop) are submitted one by one.
+    Returns list of (output, exit code, job ID) tuples; job ID is None if the job is not tracked.
+    """
+    # group requests per EasyBuild branch: (branch, None) for requests that must be submitted one by one,
+    # (develop, index) for requests that use develop branch (checkouts for develop are updated separately)
+    groups = collections.OrderedDict()
+    for idx, test_request in enumerate(test_requests):
+        eb_branch = test_request.get('eb_branch', 'develop')
+        groups.setdefault((eb_branch, idx if eb_branch == 'develop' else None), []).append(idx)
+
+    def submit_group(key):
+        """Submit jobs for requests in specified group, one by one."""
+        eb_branch, develop_idx = key
+        if develop_idx is not None:
+            return [(develop_idx, submit_test_job(test_requests[develop_idx]['cmd']))]
+        # also don't run submit commands for this branch concurrently with those for other repositories
+        with submit_lock(eb_branch):
+            return [(idx, submit_test_job(test_requests[idx]['cmd'])) for idx in groups[key]]
+
+    outputs = [None] * len(test_requests)
+    results = []
+    try:
+        for group_outputs in run_concurrently(submit_group, groups, max_workers):
+            for idx, output in group_outputs:
+                outputs[idx] = output
+
+        for test_request, (out, ec) in zip(test_requests, outputs):
+            res = SLURM_JOB_ID_REGEX.search(out)
+            job_id = None
+            if ec == 0 and res and job_tracker is not None:
+                job_id = res.group('job_id')
+                job_tracker.add(job_id, test_request)
+            results.append((out, ec, job_id))
+    finally:
+        # requests are no longer pending, also if submitting jobs failed (so admission scheduler doesn't leak capacity)
+        if scheduler is not None:
+            scheduler.submitted(len(test_requests))
+
+    return results
+
+
+def format_test_job_msg(cmd, out, ec, job_id):
+    """Format message on submitted test job, to include in comment."""
+    lines = [
+        '',
+        "PR test command '`%s`' executed!" % cmd,
+        "* exit code: %s" % ec,
+        "* output:",
+        "```",
+        out.strip(),
+        "```",
+        '',
+        "Test results coming soon (I hope)...",
+    ]
+    if job_id:
+        lines.extend(['', "I'll report back once Slurm job %s is finished." % job_id])
+    return '\n'.join(lines)
+
+
+def get_hostname():
+    """Return name of current host (as determined by EasyBuild)."""
+    init_easybuild()
+    from easybuild.tools.systemtools import get_system_info
+    return get_system_info().get('hostname', '(hostname not known)')
+
+
+def process_notifications(notifications, github, github_user, github_account, repository, host, gpuhost, pr_test_cmd,
+                          core_cnt, gpu_job_opt, pr_cache=None, parser=None, max_workers=1, job_tracker=None,
+                          scheduler=None):
+    """
+    Process provided notifications.
+
+    Requests to test a PR are collected first, and are then submitted concurrently (using up to max_workers threads),
+    after which all replies are posted concurrently too.
+    If an admission scheduler is specified, it decides which requests are submitted, queued, or merged with
+    an outstanding job.
+    Submitted Slurm jobs are registered in the job tracker (if one is specified), so their status can be reported.
+    """
+    if pr_cache is None:
+        pr_cache = PRDataCache()
+    if parser is None:
+        parser = CommandParser(github_user, host, gpuhost)
 
     res = []
 
+    # replies to post, as (PR data, reply message, check string) tuples;
+    # for requests to test a PR the reply is completed after the test command was run
+    replies = []
+    # requests to test a PR, as (index of reply, request) tuples
+    submissions = []
+    # IDs of notification threads to mark as read once replies are posted
+    thread_ids = []
+    # comments that were already processed in this cycle (for multiple notifications for the same PR)
+    seen = set()
+    hostname = None
+
     cnt = len(notifications)
     for idx, notification in enumerate(notifications):
         pr_title = notification['subject']['title']
@@ -480,223 +1740,561 @@ def process_notifications(notifications, github, github_user, github_account, re
         print(msg)
 
         # check comments (latest first)
-        pr_data, _ = fetch_pr_data(pr_id, github_account, repository, github_user, full=True,
-                                   per_page=GITHUB_MAX_PER_PAGE)
-
-        comments_data = pr_data['issue_comments']
-
-        # determine comment that triggered the notification
-        trigger_comment_id = None
-        mention_regex = re.compile(r'^\s*@%s:?\s*' % github_user, re.M)
-        for comment_data in comments_data[::-1]:
-            comment_id, comment_txt = comment_data['id'], comment_data['body']
-            if mention_regex.search(comment_txt):
-                trigger_comment_id = comment_id
-                break
+        pr_data = pr_cache.fetch(github, pr_id, github_account, repository, github_user)
 
-        check_str = "notification for comment with ID %s processed" % trigger_comment_id
+        comment_index = pr_cache.comment_index(pr_data, github_user)
 
-        processed = False
-        for comment_data in comments_data[::-1]:
-            comment_by, comment_txt = comment_data['user']['login'], comment_data['body']
-            if comment_by == github_user and check_str in comment_txt:
-                print("check_str '%s' found in: %s" % (check_str, comment_txt))
-                processed = True
-                break
+        # determine comment that triggered the notification (most recent comment that mentions the bot)
+        trigger_comment = comment_index.latest_mention
+        trigger_comment_id = trigger_comment['id'] if trigger_comment else None
+
+        check_str = PROCESSED_CHECK_TMPL % trigger_comment_id
 
-        if processed:
+        if comment_index.is_processed(trigger_comment_id) or (pr_id, trigger_comment_id) in seen:
+            print("check_str '%s' found in comment by @%s" % (check_str, github_user))
             msg = "Notification %s already processed, so skipping it... " % notification['thread_id']
             msg += "(timestamp: %s)" % notification['timestamp']
             print(msg)
+            if notification['unread']:
+                mark_notification_read(github, notification['thread_id'])
             continue
 
-        # Make sure that also only --host can be specified without --gpuhost and vice versa
-        if not host:
-          host = 'NO_HOST_PATTERN_PROVIDED'
-        if not gpuhost:
-          gpuhost = 'NO_GPUHOST_PATTERN_PROVIDED'
-
-        host_regex = re.compile(r'@.*%s' % host, re.M)
-        gpuhost_regex = re.compile(r'@.*%s' % gpuhost, re.M)
-
-        mention_found = False
-        for comment_data in comments_data[::-1]:
-            comment_id, comment_by = comment_data['id'], comment_data['user']['login']
-            comment_txt = comment_data['body']
-            if mention_regex.search(comment_txt):
-                print("Found comment including '%s': %s" % (mention_regex.pattern, comment_txt))
-
-                msg = mention_regex.sub(' ', comment_txt)
-
-                # require that @<host> or @<gpuhost> is included in comment before taking any action
-                if host_regex.search(msg) or gpuhost_regex.search(msg):
-                    print("Comment includes '%s', so processing it..." % host_regex.pattern)
-
-                    maintainers = ['akesandgren', 'bartoldeman', 'bedroge', 'boegel', 'branfosj', 'casparvl', 'Crivella',
-                                   'jfgrimm', 'lexming', 'Micket', 'migueldiascosta', 'ocaisa', 'SebastianAchilles',
-                                   'smoors', 'verdurin', 'WilleBell']
-                    contributors = ['robert-mijakovic', 'deniskristak', 'ItIsI-Orient', 'PetrKralCZ', 'sassy-crick',
-                                    'laraPPr', 'pavelToman', 'Louwrensth', 'Thyre']
-                    allowed_accounts = maintainers + contributors
-
-                    please_regex = re.compile(r'[Pp]lease test', re.M)
-
-                    if comment_by not in allowed_accounts:
-
-                        allowed_accounts_str = ' or '.join('@%s' % x for x in allowed_accounts)
-
-                        reply_msg = "@%s: I noticed your comment, " % comment_by
-                        reply_msg += "but I only dance when %s tells me (for now), I'm sorry..." %  allowed_accounts_str
-
-                    elif "PLEASE " in msg:
-                        reply_msg = "Don't scream, it's rude and I don't like people who do..."
-                    elif please_regex.search(msg):
-
-                        system_info = get_system_info()
-                        hostname = system_info.get('hostname', '(hostname not known)')
-
-                        reply_msg = "@%s: Request for testing this PR well received on %s\n" % (comment_by, hostname)
-
-                        tmpl_dict = {
-                            'container': '',  # no container used by default
-                            'core_cnt': core_cnt,  # use default number of cores (as specified via --core-cnt option)
-                            'eb_args': '',  # no arguments to 'eb' command by default
-                            'eb_branch': 'develop',  # use develop branch by default
-                            'pr': pr_id,
-                            'repository': repository,
-                            'slurm_args': '',
-                        }
-
-                        # if running on gpuhost add gpu_job_opt to tmpl_dict
-                        if gpuhost_regex.search(msg):
-                            tmpl_dict.update({
-                                'slurm_args': gpu_job_opt,
-                            })
-
-                        # check whether custom arguments for 'eb' or submit command are specified
-                        for item in shlex.split(msg):
-                            for key in ['CORE_CNT', 'EB_ARGS', 'EB_BRANCH', 'SLURM_ARGS']:
-                                if item.startswith(key + '='):
-                                    _, value = item.split('=', 1)
-                                    tmpl_dict[key.lower()] = '"%s"' % value
-                                    break
-
-                        # check whether testing in a container image is requested
-                        in_container_pattern = "[Pp]lease test @.*%s in container (?P<container>.*)" % host
-                        in_container_regex = re.compile(in_container_pattern, re.M)
-                        res = in_container_regex.search(msg)
-                        if res:
-                            tmpl_dict['container'] = CONTAINER_BASE_URL + '/' + res.group('container').strip()
-
-                        # run pr test command, check exit code and capture output
-                        cmd = pr_test_cmd % tmpl_dict
-                        (out, ec) = run_cmd(cmd, simple=False)
-
-                        reply_msg += '\n'.join([
-                            '',
-                            "PR test command '`%s`' executed!" % cmd,
-                            "* exit code: %s" % ec,
-                            "* output:",
-                            "```",
-                            out.strip(),
-                            "```",
-                            '',
-                            "Test results coming soon (I hope)...",
-                        ])
-
+        if trigger_comment:
+            seen.add((pr_id, trigger_comment_id))
+            comment_by = comment_index.author(trigger_comment_id)
+            comment_txt = trigger_comment['body']
+            request = parser.parse(comment_txt)
+            print("Found comment including '%s': %s" % (parser.mention_regex.pattern, comment_txt))
+
+            msg = request.msg
+
+            # require that @<host> or @<gpuhost> is included in comment before taking any action
+            if request.for_host or request.for_gpuhost:
+                print("Comment includes '%s', so processing it..." % parser.host_regex.pattern)
+
+                maintainers = ['akesandgren', 'bartoldeman', 'bedroge', 'boegel', 'branfosj', 'casparvl', 'Crivella',
+                               'jfgrimm', 'lexming', 'Micket', 'migueldiascosta', 'ocaisa', 'SebastianAchilles',
+                               'smoors', 'verdurin', 'WilleBell']
+                contributors = ['robert-mijakovic', 'deniskristak', 'ItIsI-Orient', 'PetrKralCZ', 'sassy-crick',
+                                'laraPPr', 'pavelToman', 'Louwrensth', 'Thyre']
+                allowed_accounts = maintainers + contributors
+
+                if comment_by not in allowed_accounts:
+
+                    allowed_accounts_str = ' or '.join('@%s' % x for x in allowed_accounts)
+
+                    reply_msg = "@%s: I noticed your comment, " % comment_by
+                    reply_msg += "but I only dance when %s tells me (for now), I'm sorry..." %  allowed_accounts_str
+
+                elif request.action == REQUEST_ACTION_SCREAM:
+                    reply_msg = "Don't scream, it's rude and I don't like people who do..."
+                elif request.action == REQUEST_ACTION_TEST:
+
+                    if hostname is None:
+                        hostname = get_hostname()
+
+                    reply_msg = "@%s: Request for testing this PR well received on %s\n" % (comment_by, hostname)
+
+                    tmpl_dict = {
+                        'container': '',  # no container used by default
+                        'core_cnt': core_cnt,  # use default number of cores (as specified via --core-cnt option)
+                        'eb_args': '',  # no arguments to 'eb' command by default
+                        'eb_branch': 'develop',  # use develop branch by default
+                        'pr': pr_id,
+                        'repository': repository,
+                        'slurm_args': '',
+                    }
+
+                    # if running on gpuhost add gpu_job_opt to tmpl_dict
+                    if request.for_gpuhost:
+                        tmpl_dict.update({
+                            'slurm_args': gpu_job_opt,
+                        })
+
+                    # custom arguments for 'eb' or submit command
+                    for key, value in request.args.items():
+                        tmpl_dict[key] = '"%s"' % value
+
+                    # check whether testing in a container image is requested
+                    if request.container:
+                        tmpl_dict['container'] = CONTAINER_BASE_URL + '/' + request.container
+
+                    # test command is run (together with other test commands) once all notifications were processed
+                    if comment_by in maintainers:
+                        priority = TEST_REQUEST_PRIORITY_MAINTAINER
                     else:
-                        reply_msg = "Got message \"%s\", but I don't know what to do with it, sorry..." % msg
-
-                    # always include 'details' part than includes a check string
-                    # which includes the ID of the comment we're reacting to,
-                    # so we can avoid re-processing the same comment again...
-                    reply_msg += '\n'.join([
-                        '',
-                        '',
-                        "<details>",
-                        '',
-                        "*- %s*" % check_str,
-                        '',
-                        "*Message to humans: this is just bookkeeping information for me,",
-                        "it is of no use to you (unless you think I have a bug, which I don't).*",
-                        "</details>",
-                    ])
-
-                    comment(github, github_user, repository, pr_data, reply_msg, verbose=DRY_RUN)
+                        priority = TEST_REQUEST_PRIORITY_CONTRIBUTOR
+                    test_request = {
+                        'account': github_account,
+                        'changed_files': pr_data.get('changed_files', 0),
+                        'cmd': pr_test_cmd % tmpl_dict,
+                        'eb_branch': request.args.get('eb_branch', 'develop'),
+                        'force': request.force,
+                        'head_sha': pr_data.get('head', {}).get('sha'),
+                        'host': host,
+                        'pr': int(pr_id),
+                        'priority': priority,
+                        'received': time.time(),
+                        'repository': repository,
+                        'requested_by': comment_by,
+                    }
+                    submissions.append((len(replies), test_request))
+
                 else:
-                    print("Pattern '%s' not found in comment for PR #%s, so ignoring it" % (host_regex.pattern, pr_id))
+                    reply_msg = "Got message \"%s\", but I don't know what to do with it, sorry..." % msg
 
-                mention_found = True
-                break
+                replies.append((pr_data, reply_msg, check_str))
             else:
-                # skip irrelevant comments (no mention found)
-                print("Pattern '%s' not found in comment for PR #%s, so ignoring it" % (mention_regex.pattern, pr_id))
-                continue
-
-        if not mention_found:
-            print_warning("Relevant comment for notification #%d for PR %s not found?!" % (idx, pr_id))
+                msg = "Pattern '%s' not found in comment for PR #%s, so ignoring it"
+                print(msg % (parser.host_regex.pattern, pr_id))
+        else:
+            warning("Relevant comment for notification #%d for PR %s not found?!" % (idx, pr_id))
             sys.stderr.write("Notification data:\n" + pformat(notification))
 
+        if notification['unread']:
+            thread_ids.append(notification['thread_id'])
+
+    if scheduler is None:
+        decisions = [(ADMIT_SUBMIT, None)] * len(submissions)
+    else:
+        decisions = scheduler.admit([test_request for (_, test_request) in submissions])
+
+    # run test commands concurrently, check exit code and capture output
+    # (right after admitting requests, so requests that were admitted are always registered as submitted)
+    submit = [(reply_idx, test_request) for ((reply_idx, test_request), (decision, _)) in zip(submissions, decisions)
+              if decision == ADMIT_SUBMIT]
+    if submit:
+        print("Running %d PR test command(s) for %s..." % (len(submit), repository))
+    results = submit_test_requests([test_request for (_, test_request) in submit], job_tracker=job_tracker,
+                                   scheduler=scheduler, max_workers=max_workers)
+
+    for (reply_idx, test_request), (decision, info) in zip(submissions, decisions):
+        pr_data, reply_msg, check_str = replies[reply_idx]
+        if decision == ADMIT_DUPLICATE:
+            if info == DUPLICATE_PENDING:
+                reply_msg += "\nA job to test this PR with the same settings is being submitted for another request, "
+            elif info:
+                reply_msg += "\nThis PR is already being tested with the same settings in Slurm job %s, " % info
+            else:
+                reply_msg += "\nA request to test this PR with the same settings is already queued, "
+            reply_msg += "so not submitting another job."
+        elif decision == ADMIT_TESTED:
+            reply_msg += "\nThis PR (commit %s) was already tested with the same settings " % test_request['head_sha']
+            reply_msg += "in Slurm job %s (state: %s, exit code: %s), " % (info['job_id'], info['state'],
+                                                                          info['exit_code'])
+            if info['report_url']:
+                reply_msg += "see %s for the test report, " % info['report_url']
+            reply_msg += "so not submitting another job (use 'force' to test it again)."
+        elif decision == ADMIT_QUEUED:
+            reply_msg += "\nThe maximum number of %d test jobs on %s is reached, " % (scheduler.max_jobs, hostname)
+            reply_msg += "so this request was queued (position %d), " % info
+            reply_msg += "I'll let you know once a test job is submitted for it."
+        replies[reply_idx] = (pr_data, reply_msg, check_str)
+
+    for (reply_idx, test_request), (out, ec, job_id) in zip(submit, results):
+        pr_data, reply_msg, check_str = replies[reply_idx]
+        reply_msg += format_test_job_msg(test_request['cmd'], out, ec, job_id)
+        replies[reply_idx] = (pr_data, reply_msg, check_str)
+
+    def post_reply(reply):
+        """Post reply in PR."""
+        pr_data, reply_msg, check_str = reply
+
+        # always include 'details' part than includes a check string
+        # which includes the ID of the comment we're reacting to,
+        # so we can avoid re-processing the same comment again...
+        reply_msg += '\n'.join([
+            '',
+            '',
+            "<details>",
+            '',
+            "*- %s*" % check_str,
+            '',
+            "*Message to humans: this is just bookkeeping information for me,",
+            "it is of no use to you (unless you think I have a bug, which I don't).*",
+            "</details>",
+        ])
+
+        comment(github, github_user, repository, pr_data, reply_msg, verbose=DRY_RUN, pr_cache=pr_cache)
+
+    run_concurrently(post_reply, replies, max_workers)
+
+    # notifications are marked as read once they were processed, so they don't clutter the list of unread notifications
+    # (notifications are polled including those that were read, so other hosts will still see them)
+    for thread_id in thread_ids:
+        mark_notification_read(github, thread_id)
+
     return res
 
 
+def find_test_report(pr_data, github_user, since, host=None):
+    """
+    Find test report that was posted in PR (by 'eb --upload-test-report') since specified time,
+    and which mentions specified host label (if any); returns URL to comment with test report (None if not found).
+    """
+    # timestamps are in ISO 8601 format, so they can be compared as strings
+    since = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(since))
+    for comment_data in reversed(pr_data['issue_comments']):
+        if comment_data.get('created_at', '') < since:
+            break
+        comment_txt = comment_data['body']
+        if comment_data['user']['login'] == github_user and comment_txt.startswith(TEST_REPORT_PREFIX):
+            if not host or host in comment_txt:
+                return comment_data.get('html_url')
+    return None
+
+
+def report_finished_jobs(github, github_user, job_tracker, pr_cache=None, max_workers=1):
+    """
+    Report status of Slurm jobs to test a PR that are finished (exit code, elapsed time, maximum memory usage)
+    in the corresponding PRs, and return list of finished jobs.
+    Results of finished jobs are recorded, so identical requests to test a PR can be answered without a new job.
+    """
+    if pr_cache is None:
+        pr_cache = PRDataCache()
+
+    finished = job_tracker.poll()
+    if not finished:
+        return finished
+
+    print("Found %d finished Slurm job(s) to test a PR" % len(finished))
+    hostname = get_hostname()
+
+    def report_job(job):
+        """Report status of specified job in corresponding PR."""
+        check_msg = "@%s: Slurm job %s to test this PR on %s is finished" % (job['requested_by'], job['id'], hostname)
+        msg = '\n'.join([
+            check_msg,
+            "* state: %s" % job['state'],
+            "* exit code: %s" % job['exit_code'],
+            "* elapsed time: %s" % job['elapsed'],
+            "* maximum memory usage (MaxRSS): %s" % (job['max_rss'] or '(unknown)'),
+        ])
+        pr_data = pr_cache.fetch(github, job['pr'], job['account'], job['repository'], github_user)
+        report_url = find_test_report(pr_data, github_user, job['submitted'], host=job.get('host'))
+        if report_url is None:
+            # test report may have been posted after PR data was cached
+            pr_cache.invalidate(pr_data)
+            pr_data = pr_cache.fetch(github, job['pr'], job['account'], job['repository'], github_user)
+            report_url = find_test_report(pr_data, github_user, job['submitted'], host=job.get('host'))
+
+        if report_url:
+            msg += "\n* test report: %s" % report_url
+        # only record results of jobs that actually tested the PR
+        if job['state'] == 'COMPLETED' or report_url:
+            job_tracker.record_result(job, report_url=report_url)
+
+        comment(github, github_user, job['repository'], pr_data, msg, check_msg=check_msg, verbose=DRY_RUN,
+                pr_cache=pr_cache)
+
+        # only stop tracking job once its status was reported (or found to be reported already)
+        job_tracker.done(job['id'])
+
+    run_concurrently(report_job, finished, max_workers)
+
+    return finished
+
+
+def dispatch_queued_requests(github, github_user, scheduler, pr_cache=None, max_workers=1):
+    """
+    Submit jobs for queued requests to test a PR (as far as admission scheduler allows),
+    and report back in the corresponding PRs. Returns list of requests for which a job was submitted.
+    """
+    if pr_cache is None:
+        pr_cache = PRDataCache()
+
+    test_requests = scheduler.dispatch()
+    if not test_requests:
+        return test_requests
+
+    def fetch_pr_data(test_request):
+        """Fetch data for PR of specified request to test a PR."""
+        return pr_cache.fetch(github, test_request['pr'], test_request['account'], test_request['repository'],
+                              github_user)
+
+    # PR may have been updated since request was queued, and the current head of the PR will be tested,
+    # so update head SHA (which is used for tracking the job, and to detect duplicate requests)
+    try:
+        prs_data = run_concurrently(fetch_pr_data, test_requests, max_workers)
+    # error() exits, but dispatched requests should not be lost
+    except (Exception, SystemExit):
+        scheduler.requeue(test_requests)
+        raise
+    for test_request, pr_data in zip(test_requests, prs_data):
+        test_request['head_sha'] = pr_data.get('head', {}).get('sha')
+
+    print("Submitting jobs for %d queued request(s) to test a PR..." % len(test_requests))
+    results = submit_test_requests(test_requests, job_tracker=scheduler.job_tracker, scheduler=scheduler,
+                                   max_workers=max_workers)
+    hostname = get_hostname()
+
+    def report_submission(item):
+        """Report submission of job for queued request in corresponding PR."""
+        test_request, pr_data, (out, ec, job_id) = item
+        msg = "@%s: Queued request for testing this PR was submitted on %s\n" % (test_request['requested_by'],
+                                                                                  hostname)
+        msg += format_test_job_msg(test_request['cmd'], out, ec, job_id)
+        comment(github, github_user, test_request['repository'], pr_data, msg, verbose=DRY_RUN, pr_cache=pr_cache)
+
+    run_concurrently(report_submission, list(zip(test_requests, prs_data, results)), max_workers)
+
+    return test_requests
+
+
+def check_failed_tests(github, github_token, mode, github_account, repositories, github_user, owner, max_workers=1,
+                       pr_cache=None, run_journal=None):
+    """
+    Check for failed tests (in GitHub Actions or Travis) for specified repositories (concurrently),
+    and post comments in affected PRs.
+    """
+    if pr_cache is None:
+        pr_cache = PRDataCache()
+    if run_journal is None:
+        run_journal = WorkflowRunJournal()
+
+    # maximum number of workers is shared across repositories
+    repo_workers, max_workers = split_workers(max_workers, len(repositories))
+
+    def check_repository(repository):
+        """Check for failed tests in specified repository, and post comments in affected PRs."""
+        if mode == MODE_CHECK_TRAVIS:
+            res = fetch_travis_failed_builds(github_account, repository, owner, github_token)
+        elif mode == MODE_CHECK_GITHUB_ACTIONS:
+            res = fetch_github_failed_workflows(github, github_account, repository, github_user, owner,
+                                                max_workers=max_workers, pr_cache=pr_cache, run_journal=run_journal)
+        else:
+            error("Unknown mode: %s" % mode)
+
+        fetch_full_pr_data = functools.partial(pr_cache.fetch, github, account=github_account,
+                                               repository=repository, github_user=github_user)
+        prs_data = run_concurrently(fetch_full_pr_data, [pr for (pr, _, _) in res], max_workers)
+
+        for (pr, pr_comment, check_msg), pr_data in zip(res, prs_data):
+            if pr_data['state'] == GITHUB_PR_STATE_OPEN:
+                comment(github, github_user, repository, pr_data, pr_comment, check_msg=check_msg, verbose=DRY_RUN,
+                        pr_cache=pr_cache)
+            else:
+                print("Not posting comment in already closed %s PR #%s" % (repository, pr))
+            # workflow runs are only recorded as processed once comment was posted (or found to be posted already)
+            run_journal.commit(github_account, repository, pr)
+
+    run_concurrently(check_repository, repositories, repo_workers)
+
+    # only update journal of workflow runs after comments were posted (no comments are posted in dry run mode)
+    run_journal.save()
+
+    # also save PR data cache, so ETags are retained if daemon is stopped unexpectedly
+    pr_cache.save()
+
+
+def check_test_requests(github, github_user, github_account, repositories, host, gpuhost, pr_test_cmd, core_cnt,
+                        gpu_job_opt, pr_cache=None, poller=None, max_workers=1, job_tracker=None, scheduler=None):
+    """
+    Check notifications for requests to test PRs in specified repositories (concurrently), and act on them
+    (test jobs are submitted and replies are posted using up to max_workers threads in total).
+    If a job tracker is specified, submitted Slurm jobs are tracked, the status of finished jobs is reported,
+    and requests are admitted via an admission scheduler (which may queue them).
+    """
+    if pr_cache is None:
+        pr_cache = PRDataCache()
+    if poller is None:
+        poller = NotificationsPoller()
+    if scheduler is None and job_tracker is not None:
+        scheduler = AdmissionScheduler(job_tracker)
+
+    if job_tracker is not None:
+        # status of all outstanding Slurm jobs is checked at once;
+        # next, jobs are submitted for queued requests (if finished jobs made room for them)
+        report_finished_jobs(github, github_user, job_tracker, pr_cache=pr_cache, max_workers=max_workers)
+        dispatch_queued_requests(github, github_user, scheduler, pr_cache=pr_cache, max_workers=max_workers)
+
+    notifications = check_notifications(github, github_user, github_account, repositories, poller=poller)
+    parser = CommandParser(github_user, host, gpuhost)
+
+    # maximum number of workers is shared across repositories
+    repo_workers, repo_max_workers = split_workers(max_workers, len(repositories))
+
+    def process_repository(repository):
+        """Process notifications for specified repository."""
+        process_notifications(notifications[repository], github, github_user, github_account, repository, host,
+                              gpuhost, pr_test_cmd, core_cnt, gpu_job_opt, pr_cache=pr_cache, parser=parser,
+                              max_workers=repo_max_workers, job_tracker=job_tracker, scheduler=scheduler)
+
+    run_concurrently(process_repository, repositories, repo_workers)
+
+    # only update state of notifications poller after notifications were processed,
+    # so notifications are considered again if processing them failed
+    poller.commit()
+    poller.save()
+
+    if job_tracker is not None:
+        job_tracker.save()
+
+    # also save PR data cache, so ETags are retained if daemon is stopped unexpectedly
+    pr_cache.save()
+
+
+def run_git(args, path):
+    """Run git command with specified arguments in specified directory, and return (stripped) output."""
+    cmd = ['git'] + args
+    res = subprocess.run(cmd, cwd=path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    if res.returncode:
+        raise RuntimeError("'%s' failed in %s: %s" % (' '.join(cmd), path, res.stdout.strip()))
+    return res.stdout.strip()
+
+
+def lock_file(fh, timeout):
+    """Obtain exclusive lock on specified (open) file, like the flock command does; wait up to timeout seconds."""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            if time.time() >= deadline:
+                error("Failed to obtain lock on %s within %d seconds" % (fh.name, timeout))
+            time.sleep(min(1, timeout))
+
+
+def refresh_checkouts(prefix, branch, repos=EASYBUILD_REPOS):
+    """
+    Update checkouts of specified repositories in specified location (to latest commit in specified branch),
+    but only if the upstream HEAD changed (which is checked concurrently for all repositories).
+    Checkouts are locked in the same way as easybuild_develop.sh does, so they are not updated concurrently.
+    Returns list of repositories that were updated.
+    """
+    def refresh(repo):
+        path = os.path.join(prefix, repo)
+        # lock is released when lock file is closed
+        with open(os.path.join(prefix, '.%s.lock' % repo), 'w') as lock_fh:
+            lock_file(lock_fh, CHECKOUT_LOCK_TIMEOUT)
+
+            upstream_head = run_git(['ls-remote', 'origin', 'refs/heads/' + branch], path).split('\t')[0]
+            if upstream_head and upstream_head == run_git(['rev-parse', 'HEAD'], path):
+                return False
+
+            print("Updating %s checkout of %s branch to %s..." % (repo, branch, upstream_head))
+            run_git(['checkout', branch], path)
+            run_git(['pull', 'origin', branch], path)
+            return True
+
+    updated = [repo for (repo, res) in zip(repos, run_concurrently(refresh, repos, len(repos))) if res]
+    print("Checkouts in %s: %d/%d updated" % (prefix, len(updated), len(repos)))
+    return updated
+
+
+def run_daemon(tasks, jitter=DAEMON_JITTER, stop=None):
+    """
+    Run specified tasks (name, interval in seconds, function) periodically, until SIGTERM (or SIGINT) is received.
+    Intervals are randomized with specified jitter (fraction of interval), so hosts don't poll in lockstep.
+    A task that is running when a signal is received is completed first.
+    """
+    if stop is None:
+        stop = threading.Event()
+
+    def handle_signal(signum, _):
+        print("Received signal %d, stopping..." % signum)
+        stop.set()
+
+    orig_handlers = dict((signum, signal.signal(signum, handle_signal)) for signum in [signal.SIGINT, signal.SIGTERM])
+
+    try:
+        next_run = dict((name, time.time()) for (name, _, _) in tasks)
+        while tasks and not stop.is_set():
+            name, interval, func = min(tasks, key=lambda task: next_run[task[0]])
+            delay = next_run[name] - time.time()
+            if delay > 0 and stop.wait(delay):
+                break
+
+            print("Running task '%s' (current time: %s)" % (name, datetime.datetime.now()))
+            try:
+                func()
+            # error() exits, but a failing task should not stop the daemon
+            except (Exception, SystemExit) as err:
+                warning("Task '%s' failed: %s" % (name, err))
+
+            next_run[name] = time.time() + interval * (1 + random.uniform(-jitter, jitter))
+    finally:
+        for signum, handler in orig_handlers.items():
+            signal.signal(signum, handler)
+
+    print("Daemon stopped")
+
+
 def main():
 
     opts = {
         'core-cnt': ("Default core count to use for jobs", None, 'store', None),
+        'daemon-interval-check-github-actions': ("Interval (in seconds) for checking GitHub Actions in daemon mode "
+                                                 "(0 to disable)", 'int', 'store',
+                                                 DAEMON_INTERVAL_CHECK_GITHUB_ACTIONS),
+        'daemon-interval-refresh': ("Interval (in seconds) for checking whether EasyBuild checkouts should be updated "
+                                    "in daemon mode (0 to disable)", 'int', 'store', DAEMON_INTERVAL_REFRESH),
+        'daemon-interval-test-pr': ("Interval (in seconds) for checking for requests to test PRs in daemon mode "
+                                    "(0 to disable)", 'int', 'store', DAEMON_INTERVAL_TEST_PR),
+        'daemon-jitter': ("Jitter for intervals in daemon mode (fraction of interval)", 'float', 'store',
+                          DAEMON_JITTER),
+        'eb-branch': ("Branch of EasyBuild repositories to keep checkouts up to date for in daemon mode", None,
+                      'store', 'develop'),
+        'eb-prefix': ("Location of EasyBuild repositories to keep checkouts up to date for in daemon mode", None,
+                      'store', None),
         'github-account': ("GitHub account where repository is located", None, 'store', 'easybuilders', 'a'),
         'github-user': ("GitHub user to use (for authenticated access)", None, 'store', 'boegel', 'u'),
         'mode': ("Mode to run in", 'choice', 'store', MODE_CHECK_TRAVIS,
-                 [MODE_CHECK_GITHUB_ACTIONS, MODE_CHECK_TRAVIS, MODE_TEST_PR]),
+                 [MODE_CHECK_GITHUB_ACTIONS, MODE_CHECK_TRAVIS, MODE_DAEMON, MODE_TEST_PR]),
         'owner': ("Owner of the bot account that is used", None, 'store', 'boegel'),
-        'repository': ("Repository to use", None, 'store', 'easybuild-easyconfigs', 'r'),
+        'repository': ("Repositories to use (comma-separated list, handled concurrently within --max-workers)",
+                       'strlist', 'store', ['easybuild-easyconfigs'], 'r'),
         'host': ("Label for current host (used to filter comments asking to test a PR)", None, 'store', ''),
         'gpuhost': ("Label for current gpuhost (used to filter comments asking to test a PR)", None, 'store', ''),
         'pr-test-cmd': ("Command to use for testing easyconfig pull requests (should include '%(pr)s' template value)",
                         None, 'store', ''),
         'gpu-job-opt': ("Additional job option to run an a GPU node", None, 'store', None),
+        'max-workers': ("Maximum number of concurrent GitHub API requests (and submissions of test jobs)",
+                        'int', 'store', 4),
+        'run-journal': ("Path to file in which processed GitHub Actions workflow runs are recorded (between runs)",
+                        None, 'store', None),
+        'notifications-state': ("Path to file in which state of polling for notifications is stored (between runs)",
+                                None, 'store', None),
+        'pr-cache': ("Path to file in which cached pull request data is stored (between runs)", None, 'store', None),
+        'pr-cache-ttl': ("Time (in seconds) during which cached pull request data is used without revalidating it",
+                         'int', 'store', PR_CACHE_TTL),
+        'slurm-jobs': ("Path to file in which submitted Slurm jobs to test a PR are tracked (between runs)",
+                       None, 'store', None),
+        'slurm-path': ("Directory in which Slurm commands (squeue, sacct) are located (default: use $PATH)",
+                       None, 'store', None),
+        'max-test-jobs': ("Maximum number of outstanding jobs to test a PR (0 means no limit), "
+                          "additional requests are queued (requires tracking of Slurm jobs)", 'int', 'store', 0),
     }
 
+    from easybuild.base.generaloption import simple_option
     go = simple_option(go_dict=opts)
-    init_build_options()
 
     github_account = go.options.github_account
     github_user = go.options.github_user
     mode = go.options.mode
     owner = go.options.owner
-    owner = go.options.owner
-    repository = go.options.repository
+    repositories = go.options.repository
     host = go.options.host
     gpuhost = go.options.gpuhost
     pr_test_cmd = go.options.pr_test_cmd
     core_cnt = go.options.core_cnt
     gpu_job_opt = go.options.gpu_job_opt
-
-    github_token = fetch_github_token(github_user)
-
-    # prepare using GitHub API
-    github = RestClient(GITHUB_API_URL, username=github_user, token=github_token, user_agent='eb-pr-check')
-
-    if mode in [MODE_CHECK_GITHUB_ACTIONS, MODE_CHECK_TRAVIS]:
-
-        if mode == MODE_CHECK_TRAVIS:
-            res = fetch_travis_failed_builds(github_account, repository, owner, github_token)
-        elif mode == MODE_CHECK_GITHUB_ACTIONS:
-            res = fetch_github_failed_workflows(github, github_account, repository, github_user, owner)
-        else:
-            error("Unknown mode: %s" % mode)
-
-        for pr, pr_comment, check_msg in res:
-            params = {'per_page': GITHUB_MAX_PER_PAGE}
-            pr_data, _ = fetch_pr_data(pr, github_account, repository, github_user, full=True, **params)
-            if pr_data['state'] == GITHUB_PR_STATE_OPEN:
-                comment(github, github_user, repository, pr_data, pr_comment, check_msg=check_msg, verbose=DRY_RUN)
-            else:
-                print("Not posting comment in already closed %s PR #%s" % (repository, pr))
-
-    elif mode == MODE_TEST_PR:
+    max_workers = go.options.max_workers
+    pr_cache = PRDataCache(path=go.options.pr_cache, ttl=go.options.pr_cache_ttl)
+    poller = NotificationsPoller(path=go.options.notifications_state)
+    run_journal = WorkflowRunJournal(path=go.options.run_journal)
+    # submitted Slurm jobs can only be tracked if they're not forgotten after this run
+    job_tracker, scheduler = None, None
+    if go.options.slurm_jobs or mode == MODE_DAEMON:
+        job_tracker = SlurmJobTracker(path=go.options.slurm_jobs, slurm_path=go.options.slurm_path)
+        scheduler = AdmissionScheduler(job_tracker, max_jobs=go.options.max_test_jobs)
+    elif go.options.max_test_jobs:
+        error("--max-test-jobs requires that Slurm jobs are tracked (via --slurm-jobs, or in daemon mode)")
+
+    if mode == MODE_TEST_PR or (mode == MODE_DAEMON and go.options.daemon_interval_test_pr):
         if not host:
-            error("--host is required when using '--mode %s' !" % MODE_TEST_PR)
+            error("--host is required when using '--mode %s' !" % mode)
 
         if '%(pr)s' not in pr_test_cmd or '%(eb_args)s' not in pr_test_cmd:
             error("--pr-test-cmd should include '%%(pr)s' and '%%(eb_args)s', found '%s'" % (pr_test_cmd))
@@ -704,9 +2302,46 @@ def main():
         if core_cnt is None:
             error("--core-cnt must be used to specify the default number of cores to request per submitted job!")
 
-        notifications = check_notifications(github, github_user, github_account, repository)
-        process_notifications(notifications, github, github_user, github_account, repository, host, gpuhost, pr_test_cmd,
-                              core_cnt, gpu_job_opt)
+    github_token = get_github_token(github_user)
+
+    # prepare using GitHub API (client is shared by all repositories)
+    github = RestClient(GITHUB_API_URL, username=github_user, token=github_token, user_agent='eb-pr-check')
+
+    failed_tests_args = (github_account, repositories, github_user, owner)
+    failed_tests_kwargs = {'max_workers': max_workers, 'pr_cache': pr_cache, 'run_journal': run_journal}
+    test_requests_args = (github, github_user, github_account, repositories, host, gpuhost, pr_test_cmd, core_cnt,
+                          gpu_job_opt)
+    test_requests_kwargs = {'job_tracker': job_tracker, 'max_workers': max_workers, 'pr_cache': pr_cache,
+                            'poller': poller, 'scheduler': scheduler}
+
+    if mode in [MODE_CHECK_GITHUB_ACTIONS, MODE_CHECK_TRAVIS]:
+        check_failed_tests(github, github_token, mode, *failed_tests_args, **failed_tests_kwargs)
+
+    elif mode == MODE_TEST_PR:
+        check_test_requests(*test_requests_args, **test_requests_kwargs)
+
+    elif mode == MODE_DAEMON:
+        # stay resident, and run tasks periodically (rather than running this script via cron)
+        tasks = []
+        if go.options.eb_prefix and go.options.daemon_interval_refresh:
+            refresh = functools.partial(refresh_checkouts, go.options.eb_prefix, go.options.eb_branch)
+            tasks.append(('refresh EasyBuild checkouts', go.options.daemon_interval_refresh, refresh))
+
+        if go.options.daemon_interval_test_pr:
+            test_pr = functools.partial(check_test_requests, *test_requests_args, **test_requests_kwargs)
+            tasks.append((MODE_TEST_PR, go.options.daemon_interval_test_pr, test_pr))
+
+        if go.options.daemon_interval_check_github_actions:
+            check_github_actions = functools.partial(check_failed_tests, github, github_token,
+                                                     MODE_CHECK_GITHUB_ACTIONS, *failed_tests_args,
+                                                     **failed_tests_kwargs)
+            tasks.append((MODE_CHECK_GITHUB_ACTIONS, go.options.daemon_interval_check_github_actions,
+                          check_github_actions))
+
+        if not tasks:
+            error("No tasks to run in daemon mode, all intervals are set to zero?!")
+
+        run_daemon(tasks, jitter=go.options.daemon_jitter)
     else:
         error("Unknown mode: %s" % mode)
 
@@ -21,38 +21,79 @@ if [ ! -f $INIT_ENV ]; then
     exit 1
 fi
 
-for eb_repo in easybuild-framework easybuild-easyblocks easybuild-easyconfigs; do
-
-    cd $EB_PREFIX
+# checkouts for other branches are git worktrees of the checkouts for develop branch (if those are available),
+# so objects are shared rather than having full clones for every branch
+EB_DEVELOP_PREFIX=$HOME/easybuild
+
+# update checkout of specified repository, but only if upstream HEAD of $EB_BRANCH changed
+function refresh_checkout {
+    eb_repo=$1
+
+    # checkouts of a repository (for all branches) share the objects of the checkout for develop branch,
+    # so only one process at a time (for example when test jobs are submitted concurrently) may fetch/pull
+    # or create a worktree for this repository
+    exec 9> $EB_DEVELOP_PREFIX/.${eb_repo}.lock
+    if ! flock --wait 600 9; then
+        echo "Failed to obtain lock for checkouts of ${eb_repo} repository!" >&2
+        exit 1
+    fi
 
-    if [ ! -d ${eb_repo} ]; then
-        echo
-        echo "+++ cloning ${eb_repo} repository to $EB_PREFIX/${eb_repo}..."
-        echo
+    if [ ! -d $EB_PREFIX/${eb_repo} ]; then
+        if [ "$EB_PREFIX" != "$EB_DEVELOP_PREFIX" ] && [ -d $EB_DEVELOP_PREFIX/${eb_repo} ]; then
+            echo "+++ creating worktree for '$EB_BRANCH' branch of ${eb_repo} repository in $EB_PREFIX/${eb_repo}..."
+            cd $EB_DEVELOP_PREFIX/${eb_repo}
+            git fetch origin +refs/heads/$EB_BRANCH:refs/remotes/origin/$EB_BRANCH
+            git worktree add --track -B $EB_BRANCH $EB_PREFIX/${eb_repo} origin/$EB_BRANCH
+        else
+            echo "+++ cloning ${eb_repo} repository to $EB_PREFIX/${eb_repo}..."
+            git clone https://github.com/easybuilders/${eb_repo}.git $EB_PREFIX/${eb_repo}
+        fi
+    fi
 
-        git clone https://github.com/easybuilders/${eb_repo}.git
+    cd $EB_PREFIX/${eb_repo}
+
+    upstream_head=$(git ls-remote origin refs/heads/$EB_BRANCH)
+    upstream_head=${upstream_head%%[[:space:]]*}
+    if [ ! -z "$upstream_head" ] && [ "$upstream_head" = "$(git rev-parse HEAD)" ]; then
+        echo "+++ '$EB_BRANCH' branch of ${eb_repo} is up to date ($upstream_head)"
+    else
+        echo "+++ updating '$EB_BRANCH' branch of ${eb_repo} to $upstream_head"
+        git checkout $EB_BRANCH
+        git pull origin $EB_BRANCH
+        echo "+++ current HEAD:"
+        git log -n 1
     fi
+}
 
-    cd ${eb_repo}
+refresh_start=$(date +%s.%N)
+refresh_logs=$(mktemp -d)
 
-    echo
-    echo "+++ checking out '$EB_BRANCH' branch"
-    echo
+# repositories are refreshed concurrently, output is printed per repository once they're all done
+pids=""
+for eb_repo in easybuild-framework easybuild-easyblocks easybuild-easyconfigs; do
+    refresh_checkout ${eb_repo} > $refresh_logs/${eb_repo}.log 2>&1 &
+    pids="$pids $!"
+done
 
-    git checkout $EB_BRANCH
+failed=0
+for pid in $pids; do
+    wait $pid || failed=$((failed+1))
+done
 
+for eb_repo in easybuild-framework easybuild-easyblocks easybuild-easyconfigs; do
     echo
-    echo "+++ updating '$EB_BRANCH' branch"
-    echo
-    git pull origin $EB_BRANCH
+    cat $refresh_logs/${eb_repo}.log
+done
+rm -rf $refresh_logs
 
-    echo
-    echo "+++ current HEAD:"
-    echo
-    git log -n 1
+echo
+echo "+++ refreshing checkouts in $EB_PREFIX took $(echo "$(date +%s.%N) $refresh_start" | awk '{printf "%.2f", $1-$2}')s"
+echo
 
-    echo
-done
+if [ $failed -gt 0 ]; then
+    echo "Failed to refresh $failed checkout(s) in $EB_PREFIX!" >&2
+    exit 1
+fi
 
 source $INIT_ENV
 
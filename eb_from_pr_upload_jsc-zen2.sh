@@ -43,4 +43,28 @@ fi
 
 module use $EASYBUILD_PREFIX/modules/all
 
-eb $repo_pr_arg $EB_PR --debug --rebuild --robot --upload-test-report --download-timeout=1000 $EB_ARGS
+EB_CMD="eb $repo_pr_arg $EB_PR --debug --rebuild --robot --upload-test-report --download-timeout=1000 $EB_ARGS"
+
+# dependency reuse mode (opt-in, by setting $EB_SHARED_PREFIX):
+# dependencies that are already installed in shared installation prefix (for same OS + CPU arch) are used,
+# only easyconfigs from PR (and missing dependencies) are installed in $EASYBUILD_PREFIX
+if [ -z "$EB_SHARED_PREFIX" ]; then
+    $EB_CMD
+else
+    EB_SHARED_INSTALLPATH=$EB_SHARED_PREFIX/Rocky8/zen2
+    # append, so modules in $EASYBUILD_PREFIX take precedence over those in shared installation prefix
+    module use --append $EB_SHARED_INSTALLPATH/modules/all
+
+    # determine which dependencies are already installed before starting the build,
+    # so we can report how many node-hours were saved by not building them again
+    EB_DRY_RUN_OUT=$(mktemp /tmp/$USER-eb-dry-run-XXXXXX)
+    eb $repo_pr_arg $EB_PR --rebuild --robot --dry-run $EB_ARGS > $EB_DRY_RUN_OUT 2>&1 || true
+
+    ec=0
+    EB_START=$SECONDS
+    $EB_CMD || ec=$?
+
+    python3 $HOME/boegelbot/eb_reuse_report.py $EB_SHARED_INSTALLPATH $EB_DRY_RUN_OUT --prefix $EASYBUILD_PREFIX --nodes ${SLURM_JOB_NUM_NODES:-1} --elapsed $((SECONDS-EB_START)) || true
+    rm -f $EB_DRY_RUN_OUT
+    exit $ec
+fi
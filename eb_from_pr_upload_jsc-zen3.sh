@@ -59,9 +59,7 @@ if [ ! -z "${EB_ARGS}" ]; then
     EB_CMD="${EB_CMD} ${EB_ARGS}"
 fi
 
-if [ -z "${EB_CONTAINER}" ]; then
-    ${EB_CMD}
-else
+if [ ! -z "${EB_CONTAINER}" ]; then
     if [ ! -z "$(command -v apptainer)" ]; then
         CONTAINER_EXEC_CMD="apptainer exec"
     elif [ ! -z "$(command -v singularity)" ]; then
@@ -73,6 +71,45 @@ else
     module unuse ${EASYBUILD_PREFIX}/modules/all
     export EASYBUILD_PREFIX=${TOPDIR}/${USER}/container-$(basename ${EB_CONTAINER})/${CPU_ARCH}
     module use ${EASYBUILD_PREFIX}/modules/all
+fi
+
+# dependency reuse mode (opt-in, by setting $EB_SHARED_PREFIX):
+# dependencies that are already installed in shared installation prefix (for same OS/container + CPU arch) are used,
+# only easyconfigs from PR (and missing dependencies) are installed in $EASYBUILD_PREFIX
+CONTAINER_MODULE_USE=""
+if [ ! -z "${EB_SHARED_PREFIX}" ]; then
+    if [ -z "${EB_CONTAINER}" ]; then
+        EB_SHARED_INSTALLPATH=${EB_SHARED_PREFIX}/${OS_DISTRO}${OS_VERSION}/${CPU_ARCH}
+    else
+        EB_SHARED_INSTALLPATH=${EB_SHARED_PREFIX}/container-$(basename ${EB_CONTAINER})/${CPU_ARCH}
+        CONTAINER_BIND_PATHS="${CONTAINER_BIND_PATHS} --bind ${EB_SHARED_PREFIX}:${EB_SHARED_PREFIX}:ro"
+        CONTAINER_MODULE_USE="module use --append ${EB_SHARED_INSTALLPATH}/modules/all;"
+    fi
+    # append, so modules in $EASYBUILD_PREFIX take precedence over those in shared installation prefix
+    module use --append ${EB_SHARED_INSTALLPATH}/modules/all
+fi
 
-    ${CONTAINER_EXEC_CMD} ${CONTAINER_BIND_PATHS} ${EB_CONTAINER} bash -l -c "export PATH=$PATH:\$PATH; export PYTHONPATH=$PYTHONPATH:\$PYTHONPATH; module unuse $MODULEPATH; ${EB_CMD}"
+function run_eb {
+    if [ -z "${EB_CONTAINER}" ]; then
+        $1
+    else
+        ${CONTAINER_EXEC_CMD} ${CONTAINER_BIND_PATHS} ${EB_CONTAINER} bash -l -c "export PATH=$PATH:\$PATH; export PYTHONPATH=$PYTHONPATH:\$PYTHONPATH; module unuse $MODULEPATH; ${CONTAINER_MODULE_USE} $1"
+    fi
+}
+
+if [ -z "${EB_SHARED_PREFIX}" ]; then
+    run_eb "${EB_CMD}"
+else
+    # determine which dependencies are already installed before starting the build,
+    # so we can report how many node-hours were saved by not building them again
+    EB_DRY_RUN_OUT=$(mktemp /tmp/${USER}-eb-dry-run-XXXXXX)
+    run_eb "eb ${repo_pr_arg} ${EB_PR} --rebuild --robot --dry-run ${EB_ARGS}" > ${EB_DRY_RUN_OUT} 2>&1 || true
+
+    ec=0
+    EB_START=${SECONDS}
+    run_eb "${EB_CMD}" || ec=$?
+
+    python3 ${HOME}/boegelbot/eb_reuse_report.py ${EB_SHARED_INSTALLPATH} ${EB_DRY_RUN_OUT} --prefix ${EASYBUILD_PREFIX} --nodes ${SLURM_JOB_NUM_NODES:-1} --elapsed $((SECONDS-EB_START)) || true
+    rm -f ${EB_DRY_RUN_OUT}
+    exit ${ec}
 fi
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+#
+# Report on dependencies that were taken from a shared (read-only) installation prefix when testing a PR
+# (dependency reuse mode of eb_from_pr_upload_*.sh scripts), and estimate how many node-hours that saved,
+# based on how long it took to build these dependencies (according to the EasyBuild logs in the shared prefix).
+#
+# usage:
+#   eb_reuse_report.py <shared installation prefix> <output of 'eb --robot --dry-run'> [--prefix <prefix>]
+#                      [--nodes <number of nodes>] [--elapsed <elapsed time for test, in seconds>]
+#
+# author: Kenneth Hoste (@boegel)
+#
+# license: GPLv2
+#
+import argparse
+import datetime
+import glob
+import os
+import re
+import sys
+
+
+# line in output of 'eb --dry-run' for an easyconfig, for example:
+#  * [x] /path/to/zlib-1.2.13-GCCcore-12.3.0.eb (module: zlib/1.2.13-GCCcore-12.3.0)
+DRY_RUN_REGEX = re.compile(r'^\s*\*\s*\[(?P<status>.)\]\s*(?P<ec>\S+)\s*\(module:\s*(?P<module>[^)\s]+)\)', re.M)
+
+# timestamp prefix of lines in EasyBuild log, for example: == 2024-01-01 12:34:56,789
+LOG_TIMESTAMP_REGEX = re.compile(r'^== (?P<timestamp>[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2})')
+LOG_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def installed_modules(dry_run_out):
+    """Determine modules for easyconfigs that are already installed, from output of 'eb --dry-run'."""
+    return [res.group('module') for res in DRY_RUN_REGEX.finditer(dry_run_out) if res.group('status') == 'x']
+
+
+def has_module(prefix, module):
+    """Check whether specified module is installed in specified installation prefix."""
+    module_path = os.path.join(prefix, 'modules', 'all', module)
+    return os.path.exists(module_path) or os.path.exists(module_path + '.lua')
+
+
+def build_time(prefix, module):
+    """
+    Determine how long it took to build software for specified module in specified installation prefix (in seconds),
+    using first and last timestamp in (most recent) EasyBuild log in installation directory; None if not known.
+    """
+    log_pattern = os.path.join(prefix, 'software', *module.split('/'), 'easybuild', 'easybuild-*.log')
+    logs = sorted(glob.glob(log_pattern))
+    if not logs:
+        return None
+
+    first, last = None, None
+    with open(logs[-1], errors='replace') as fh:
+        for line in fh:
+            res = LOG_TIMESTAMP_REGEX.match(line)
+            if res:
+                last = res.group('timestamp')
+                if first is None:
+                    first = last
+
+    if first is None:
+        return None
+
+    first, last = [datetime.datetime.strptime(ts, LOG_TIMESTAMP_FORMAT) for ts in (first, last)]
+    return (last - first).total_seconds()
+
+
+def reuse_report(shared_prefix, dry_run_out, prefix=None, nodes=1, elapsed=None):
+    """
+    Compose report on dependencies that were taken from shared installation prefix,
+    and the number of node-hours that was saved by not building them again.
+    Modules that are also installed in the (own) installation prefix take precedence, so they are not counted.
+    """
+    reused = []
+    for module in installed_modules(dry_run_out):
+        if has_module(shared_prefix, module) and not (prefix and has_module(prefix, module)):
+            reused.append((module, build_time(shared_prefix, module)))
+
+    lines = ["Dependencies taken from shared installation prefix %s: %d" % (shared_prefix, len(reused))]
+    for module, secs in reused:
+        if secs is None:
+            lines.append("* %s (build time not known)" % module)
+        else:
+            lines.append("* %s (%.2f node-hours)" % (module, nodes * secs / 3600.))
+
+    saved = nodes * sum(secs for (_, secs) in reused if secs) / 3600.
+    lines.append("Estimated node-hours saved: %.2f" % saved)
+    if elapsed is not None:
+        lines.append("Node-hours used for test: %.2f" % (nodes * elapsed / 3600.))
+
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Report on dependencies taken from shared installation prefix")
+    parser.add_argument('shared_prefix', help="Shared (read-only) installation prefix")
+    parser.add_argument('dry_run_out', help="File with output of 'eb --robot --dry-run'")
+    parser.add_argument('--prefix', help="Installation prefix used for test (takes precedence over shared prefix)")
+    parser.add_argument('--nodes', type=int, default=1, help="Number of nodes used for test")
+    parser.add_argument('--elapsed', type=float, help="Elapsed time for test (in seconds)")
+    opts = parser.parse_args(args)
+
+    with open(opts.dry_run_out, errors='replace') as fh:
+        dry_run_out = fh.read()
+
+    print(reuse_report(opts.shared_prefix, dry_run_out, prefix=opts.prefix, nodes=opts.nodes, elapsed=opts.elapsed))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
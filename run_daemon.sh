@@ -0,0 +1,25 @@
+#!/bin/bash
+#
+# Run boegelbot in daemon mode (instead of running cron_test_prs.sh via cron):
+# EasyBuild checkouts are kept up to date by boegelbot itself,
+# and GitHub Actions + requests to test PRs are checked periodically.
+#
+# usage: ./run_daemon.sh <boegelbot.py options, like --host, --core-cnt, --pr-test-cmd, ...>
+
+# change to directory in which this script is located
+cd `dirname $(realpath $0)`
+
+# make sure EasyBuild repositories are available
+./easybuild_develop.sh
+
+# set up environment
+EB_PREFIX=$HOME/easybuild
+source init_env_easybuild_develop.sh
+
+# stop daemon gracefully with 'kill <PID>' (SIGTERM)
+exec python3 ./boegelbot.py --mode daemon --github-user boegelbot --eb-prefix $EB_PREFIX \
+    --notifications-state $HOME/.boegelbot_notifications.json \
+    --pr-cache $HOME/.boegelbot_pr_cache.json \
+    --run-journal $HOME/.boegelbot_run_journal.json \
+    --slurm-jobs $HOME/.boegelbot_slurm_jobs.json \
+    "$@"
@@ -0,0 +1,1506 @@
+import fcntl
+import getpass
+import hashlib
+import json
+import os
+import random
+import re
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from easybuild.base.rest import RestClient
+
+import boegelbot
+from boegelbot import FLUKE_PATTERNS, REQUEST_ACTION_SCREAM, REQUEST_ACTION_TEST, REQUEST_ARGS
+from boegelbot import ADMIT_DUPLICATE, ADMIT_QUEUED, ADMIT_SUBMIT, ADMIT_TESTED, DUPLICATE_PENDING, AdmissionScheduler
+from boegelbot import BotRequest, CommandParser, CommentIndex, PRDataCache, WorkflowRunJournal, comment
+from boegelbot import NotificationsPoller, SlurmJobTracker, check_notifications, check_test_requests
+from boegelbot import fetch_github_failed_workflows
+from boegelbot import dispatch_queued_requests, find_fluke, is_fluke, mark_notification_read, parse_mem_size
+from boegelbot import process_notifications, refresh_checkouts, report_finished_jobs, run_concurrently, run_daemon
+from boegelbot import scan_job_log, split_workers, submit_test_requests
+
+
+# example log line from a GitHub Actions job (no fluke)
+LOG_LINE = "2020-07-13T09:54:36.5004935Z test_dep (test.easyconfigs.easyconfigs.EasyConfigTest) ... ok\n"
+
+
+def gen_log(size_mb, extra_line=None):
+    """Generate synthetic job log of (approximately) specified size, with optional extra line at the end."""
+    job_log = LOG_LINE * (size_mb * 1024 * 1024 // len(LOG_LINE))
+    if extra_line:
+        job_log += extra_line + '\n'
+    return job_log
+
+
+def gen_chunks(job_log, chunk_size):
+    """Split job log in chunks of specified size."""
+    for idx in range(0, len(job_log), chunk_size):
+        yield job_log[idx:idx+chunk_size]
+
+
+def test_find_fluke():
+
+    assert find_fluke('') is None
+    assert find_fluke(LOG_LINE * 10) is None
+    assert not is_fluke(LOG_LINE * 10)
+
+    fluke_lines = [
+        ("fatal: unable to access 'https://github.com/foo/bar.git/': Failed to connect to github.com port 443: "
+         "Connection timed out"),
+        "W: Failed to fetch http://example.com/foo  503  Service Unavailable",
+        "curl: (56) OpenSSL SSL read: error:0A000126:SSL routines::unexpected eof while reading, errno 0",
+        "urllib3.exceptions.ReadTimeoutError: HTTPSConnectionPool(host='example.com'): Read timed out.",
+        "##[error]Response status code does not indicate success: 500 (Internal Server Error).",
+        "fatal: fetch-pack: unexpected disconnect while reading sideband packet",
+    ]
+    for fluke_line in fluke_lines:
+        job_log = LOG_LINE * 10 + fluke_line
+        fluke_pattern = find_fluke(job_log)
+        assert fluke_pattern in [pattern for (pattern, _) in FLUKE_PATTERNS]
+        assert re.search(fluke_pattern, fluke_line)
+        assert is_fluke(job_log)
+
+        # fluke is also found when job log is provided in chunks,
+        # even when line with fluke is split across chunks
+        for chunk_size in [1, 7, 100, 1024]:
+            assert find_fluke(gen_chunks(job_log, chunk_size)) == fluke_pattern
+
+    # pattern must match on a single line
+    assert find_fluke("Failed to fetch http://example.com/foo\n Service Unavailable") is None
+
+
+def test_find_fluke_large_log():
+
+    def naive_find_fluke(job_log):
+        """Original implementation: compile every pattern and search whole log for each of them."""
+        for pattern, _ in FLUKE_PATTERNS:
+            if re.compile(pattern, re.M).search(job_log):
+                return pattern
+        return None
+
+    fluke_line = "Err:1 http://ppa.launchpad.net/foo Could not connect to ppa.launchpad.net:80, connection timed out"
+    for extra_line in [None, fluke_line]:
+        job_log = gen_log(8, extra_line=extra_line)
+
+        start = time.time()
+        expected = naive_find_fluke(job_log)
+        naive_time = time.time() - start
+
+        start = time.time()
+        assert find_fluke(job_log) == expected
+        fluke_time = time.time() - start
+
+        start = time.time()
+        assert find_fluke(gen_chunks(job_log, 1024 * 1024)) == expected
+        chunked_time = time.time() - start
+
+        msg = "find_fluke on %.1fMB log (fluke: %s): %.3fs naive, %.3fs precompiled+prefiltered, %.3fs chunked"
+        print(msg % (len(job_log) / (1024. * 1024), expected is not None, naive_time, fluke_time, chunked_time))
+
+
+def test_scan_job_log():
+
+    timestamp = '2020-07-13T09:54:36.5004935Z '
+    test_output = ["ERROR: test_foo (test.easyconfigs.easyconfigs.EasyConfigTest)", "AssertionError: foo"]
+    job_log_lines = ['setting up...', '..E..', 'still setting up', '...F.'] + test_output
+    job_log_lines += ["ERROR: Not all tests were successful", "this line is not retained"]
+    job_log = '\n'.join(timestamp + x for x in job_log_lines)
+
+    expected = test_output + ["ERROR: Not all tests were successful"]
+    for chunk_size in [1, 13, 1024]:
+        log_lines, error_line_found, truncated, fluke_pattern = scan_job_log(gen_chunks(job_log, chunk_size))
+        assert log_lines == expected
+        assert error_line_found
+        assert not truncated
+        assert fluke_pattern is None
+
+    # only last lines of test output are retained
+    log_lines, error_line_found, truncated, _ = scan_job_log(job_log, max_lines=2)
+    assert log_lines == expected[-2:]
+    assert error_line_found
+    assert truncated
+
+    # without line that marks start of test output, everything up to end of test suite output is retained
+    job_log = '\n'.join(job_log_lines[4:])
+    log_lines, error_line_found, truncated, _ = scan_job_log(job_log)
+    assert log_lines == expected
+    assert not truncated
+
+    # end of test suite output not found: last lines of log + fluke pattern (if any) are returned
+    job_log = gen_log(8, extra_line=timestamp + "fatal: fetch-pack: unexpected disconnect while reading sideband packet")
+    log_lines, error_line_found, truncated, fluke_pattern = scan_job_log(gen_chunks(job_log, 1024 * 1024))
+    assert len(log_lines) == 100
+    assert log_lines[-1] == "fatal: fetch-pack: unexpected disconnect while reading sideband packet"
+    assert not error_line_found
+    assert fluke_pattern == "fetch-pack: unexpected disconnect"
+
+
+class FakeGitHubAPIHandler(BaseHTTPRequestHandler):
+    """Request handler for fake GitHub API server, which serves data from routes dict of server."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        key = (url.path, tuple(sorted((k, v[0]) for (k, v) in parse_qs(url.query).items() if k != 'per_page')))
+        with self.server.lock:
+            self.server.requests.append(key)
+            # first request for routes in rate_limited set gets a 429 response
+            rate_limited = key in self.server.rate_limited
+            self.server.rate_limited.discard(key)
+
+        if rate_limited:
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.end_headers()
+            return
+
+        data = self.server.routes.get(key)
+        if data is None:
+            self.send_response(404)
+            self.end_headers()
+        else:
+            if isinstance(data, str):
+                body, content_type = data.encode(), 'text/plain'
+            else:
+                body, content_type = json.dumps(data).encode(), 'application/json'
+
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            headers = self.server.headers.get(key, {})
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            if self.headers.get('If-Modified-Since') and self.headers['If-Modified-Since'] == headers.get('Last-Modified'):
+                self.send_response(304)
+                for header in sorted(headers):
+                    self.send_header(header, headers[header])
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            for header in sorted(headers):
+                self.send_header(header, headers[header])
+            self.end_headers()
+            self.wfile.write(body)
+
+    def do_PATCH(self):
+        with self.server.lock:
+            self.server.patched.append(urlparse(self.path).path)
+        self.send_response(205)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_github():
+    """Start fake GitHub API server in a separate thread."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGitHubAPIHandler)
+    server.lock = threading.Lock()
+    server.headers = {}
+    server.patched = []
+    server.rate_limited = set()
+    server.requests = []
+    server.routes = {}
+    server.prs = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def gen_workflow_runs_data(server, account, repo, pr_cnt):
+    """Generate data for workflow runs and PRs in fake GitHub API server."""
+    runs = []
+    repo_path = '/repos/%s/%s' % (account, repo)
+    for pr_id in range(1, pr_cnt + 1):
+        head_sha = 'sha%d' % pr_id
+        server.prs[pr_id] = {
+            'head': {'sha': head_sha},
+            'html_url': 'https://github.com/%s/%s/pull/%s' % (account, repo, pr_id),
+            'number': pr_id,
+            'state': 'closed' if pr_id % 5 == 0 else 'open',
+            'user': {'login': 'user%d' % pr_id},
+        }
+        head = 'user%d:branch%d' % (pr_id, pr_id)
+        server.routes[(repo_path + '/pulls', (('head', head),))] = [server.prs[pr_id]]
+        server.routes[(repo_path + '/pulls/%s' % pr_id, ())] = server.prs[pr_id]
+        server.routes[(repo_path + '/pulls/%s/reviews' % pr_id, ())] = []
+        server.routes[(repo_path + '/issues/%s/comments' % pr_id, ())] = [{'body': 'test', 'id': pr_id}]
+
+        # two failed workflow runs per PR: one for an older commit, one for latest commit
+        for run_id, sha in [(pr_id * 100, 'old' + head_sha), (pr_id * 100 + 1, head_sha)]:
+            runs.append({
+                'conclusion': 'failure',
+                'head_branch': 'branch%d' % pr_id,
+                'head_repository': {'owner': {'login': 'user%d' % pr_id}},
+                'head_sha': sha,
+                'html_url': 'https://github.com/%s/%s/actions/runs/%s' % (account, repo, run_id),
+                'id': run_id,
+                'status': 'completed',
+                'updated_at': '2024-01-01T00:%02d:00Z' % pr_id,
+            })
+            job_id = run_id * 10
+            jobs = [{'conclusion': 'success', 'id': job_id + 1}, {'conclusion': 'failure', 'id': job_id}]
+            server.routes[(repo_path + '/actions/runs/%s/jobs' % run_id, ())] = {'jobs': jobs}
+            job_log = LOG_LINE * 1000 + '..F\nFAIL: test_%s\nERROR: Not all tests were successful\n' % pr_id
+            server.routes[(repo_path + '/actions/jobs/%s/logs' % job_id, ())] = job_log
+
+    # also include a successful and an incomplete run
+    runs.append(dict(runs[0], conclusion='success', id=1))
+    runs.append(dict(runs[0], status='in_progress', id=2))
+    server.routes[(repo_path + '/actions/runs', (('event', 'pull_request'),))] = {'workflow_runs': runs[::-1]}
+
+
+def test_fetch_github_failed_workflows(fake_github, monkeypatch):
+
+    monkeypatch.setattr(boegelbot, 'det_commit_status', lambda *args: 'failure')
+    monkeypatch.setattr(time, 'sleep', lambda _: None)
+
+    gen_workflow_runs_data(fake_github, 'easybuilders', 'easybuild-easyconfigs', 25)
+    github = RestClient('http://127.0.0.1:%s' % fake_github.server_port, username='boegelbot', token='fake')
+
+    res_serial = fetch_github_failed_workflows(github, 'easybuilders', 'easybuild-easyconfigs', 'boegelbot',
+                                               'boegel', max_workers=1)
+    serial_requests = sorted(fake_github.requests)
+
+    # 20 open PRs, each with failing run for latest commit
+    assert len(res_serial) == 20
+    assert [pr_id for (pr_id, _, _) in res_serial] == [x for x in range(25, 0, -1) if x % 5]
+    for pr_id, pr_comment, check_msg in res_serial:
+        check_msg_regex = r"^@user%d: Tests failed in GitHub Actions, see .*/actions/runs/%d$" % (pr_id, pr_id * 100 + 1)
+        assert re.match(check_msg_regex, check_msg)
+        assert pr_comment.startswith(check_msg)
+        assert "```..F\nFAIL: test_%d\nERROR: Not all tests were successful\n```" % pr_id not in pr_comment
+        assert "```FAIL: test_%d\nERROR: Not all tests were successful\n```" % pr_id in pr_comment
+
+    # result is identical when requests are performed concurrently, also when rate limit is hit
+    for max_workers in [2, 8, 32]:
+        fake_github.requests = []
+        fake_github.rate_limited.update(sorted(set(serial_requests))[:10])
+        res = fetch_github_failed_workflows(github, 'easybuilders', 'easybuild-easyconfigs', 'boegelbot', 'boegel',
+                                           max_workers=max_workers)
+        assert res == res_serial
+
+        # same requests are done (+ retried requests that hit the rate limit)
+        assert len(fake_github.requests) == len(serial_requests) + 10
+        assert sorted(set(fake_github.requests)) == sorted(set(serial_requests))
+
+
+def test_fetch_github_failed_workflows_multiple_repos(fake_github, monkeypatch, tmp_path):
+
+    monkeypatch.setattr(boegelbot, 'det_commit_status', lambda *args: 'failure')
+
+    repos = ['easybuild-easyblocks', 'easybuild-easyconfigs', 'easybuild-framework']
+    for repo in repos:
+        gen_workflow_runs_data(fake_github, 'easybuilders', repo, 10)
+    github = RestClient('http://127.0.0.1:%s' % fake_github.server_port, username='boegelbot', token='fake')
+
+    res_serial = [fetch_github_failed_workflows(github, 'easybuilders', repo, 'boegelbot', 'boegel') for repo in repos]
+
+    # repositories can be handled concurrently, with a shared GitHub API client, PR data cache and journal
+    pr_cache = PRDataCache()
+    run_journal = WorkflowRunJournal(path=str(tmp_path / 'journal.json'))
+
+    def check_repo(repo):
+        return fetch_github_failed_workflows(github, 'easybuilders', repo, 'boegelbot', 'boegel', max_workers=4,
+                                             pr_cache=pr_cache, run_journal=run_journal)
+
+    assert run_concurrently(check_repo, repos, len(repos)) == res_serial
+    run_journal.save()
+    with open(str(tmp_path / 'journal.json')) as fh:
+        assert sorted(json.load(fh)) == ['easybuilders/' + repo for repo in repos]
+
+    # maximum number of workers is shared across repositories
+    assert split_workers(4, 3) == (3, 1)
+    assert split_workers(8, 3) == (3, 2)
+    assert split_workers(2, 3) == (2, 1)
+    assert split_workers(4, 1) == (1, 4)
+    assert split_workers(0, 3) == (1, 1)
+    assert split_workers(4, 0) == (1, 4)
+
+
+def test_check_notifications(fake_github, monkeypatch, tmp_path):
+
+    def gen_notification(thread_id, repo, reason='mention', subject_type='PullRequest'):
+        return {
+            'id': str(thread_id),
+            'reason': reason,
+            'repository': {'full_name': 'easybuilders/' + repo},
+            'subject': {'type': subject_type, 'url': 'https://api.github.com/repos/easybuilders/%s/pulls/1' % repo},
+            'unread': True,
+            'updated_at': '2024-01-01T00:%02d:00Z' % thread_id,
+        }
+
+    # two pages of notifications
+    since = '2024-01-01T00:00:00Z'
+    key = ('/notifications', (('all', 'true'), ('since', since)))
+    key_page2 = ('/notifications', (('all', 'true'), ('page', '2'), ('since', since)))
+    fake_github.routes[key] = [
+        gen_notification(1, 'easybuild-easyconfigs'),
+        gen_notification(2, 'easybuild-easyblocks'),
+        gen_notification(3, 'easybuild-easyconfigs', reason='subscribed'),
+    ]
+    fake_github.routes[key_page2] = [
+        gen_notification(4, 'easybuild-framework'),
+        gen_notification(5, 'easybuild-easyblocks', subject_type='Issue'),
+        gen_notification(6, 'easybuild-easyblocks'),
+    ]
+    base_url = 'http://127.0.0.1:%s' % fake_github.server_port
+    fake_github.headers[key] = {
+        'Last-Modified': 'Mon, 01 Jan 2024 00:06:00 GMT',
+        'Link': '<%s/notifications?all=true&page=2&since=%s>; rel="next"' % (base_url, since),
+        'X-Poll-Interval': '0',
+    }
+    github = RestClient(base_url, username='boegelbot', token='fake')
+
+    # notifications are only fetched once for all repositories (following pagination)
+    poller = NotificationsPoller(path=str(tmp_path / 'notifications.json'))
+    poller.state['since'] = since
+    res = check_notifications(github, 'boegelbot', 'easybuilders', ['easybuild-easyblocks', 'easybuild-easyconfigs'],
+                              poller=poller)
+    assert fake_github.requests == [key, key_page2]
+    assert sorted(res) == ['easybuild-easyblocks', 'easybuild-easyconfigs']
+    assert [x['thread_id'] for x in res['easybuild-easyblocks']] == ['2', '6']
+    assert [x['thread_id'] for x in res['easybuild-easyconfigs']] == ['1']
+
+    # state of poller is only updated once notifications were processed
+    assert poller.state['since'] == since
+    assert poller.state['last_modified'] is None
+    poller.commit()
+    assert poller.state['since'] == '2024-01-01T00:06:00Z'
+    assert poller.state['last_modified'] == 'Mon, 01 Jan 2024 00:06:00 GMT'
+
+    # next poll only considers notifications that were updated since previous poll
+    poller.save()
+    poller = NotificationsPoller(path=str(tmp_path / 'notifications.json'))
+    fake_github.requests = []
+    key = ('/notifications', (('all', 'true'), ('since', '2024-01-01T00:06:00Z')))
+    fake_github.routes[key] = []
+    fake_github.headers[key] = {'Last-Modified': 'Mon, 01 Jan 2024 00:06:00 GMT', 'X-Poll-Interval': '60'}
+    res = check_notifications(github, 'boegelbot', 'easybuilders', ['easybuild-easyblocks'], poller=poller)
+    assert fake_github.requests == [key]
+    assert res == {'easybuild-easyblocks': []}
+    poller.commit()
+    assert poller.state['since'] == '2024-01-01T00:06:00Z'
+
+    # poll interval indicated by GitHub is honoured
+    fake_github.requests = []
+    res = check_notifications(github, 'boegelbot', 'easybuilders', ['easybuild-easyblocks'], poller=poller)
+    assert fake_github.requests == []
+    assert res == {'easybuild-easyblocks': []}
+
+    # notification threads can be marked as read
+    mark_notification_read(github, '6')
+    assert fake_github.patched == ['/notifications/threads/6']
+
+    # without state of a previous poll, only unread notifications are considered (no matter how old they are)
+    state_path = str(tmp_path / 'notifications_unread.json')
+    poller = NotificationsPoller(path=state_path)
+    fake_github.requests = []
+    key = ('/notifications', ())
+    fake_github.routes[key] = []
+    fake_github.headers[key] = {'X-Poll-Interval': '0'}
+    res = check_notifications(github, 'boegelbot', 'easybuilders', ['easybuild-easyblocks'], poller=poller)
+    assert fake_github.requests == [key]
+    assert res == {'easybuild-easyblocks': []}
+    assert poller.state['since'] is None
+
+    fake_github.routes[key] = [gen_notification(2, 'easybuild-easyblocks'), gen_notification(7, 'easybuild-easyblocks')]
+    res = check_notifications(github, 'boegelbot', 'easybuilders', ['easybuild-easyblocks'], poller=poller)
+    assert [x['thread_id'] for x in res['easybuild-easyblocks']] == ['2', '7']
+    poller.commit()
+    assert poller.state['since'] == '2024-01-01T00:07:00Z'
+
+    # state is not saved in dry run mode, since notifications are not acted upon then
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', True)
+    poller.save()
+    assert not os.path.exists(state_path)
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', False)
+    poller.save()
+    assert NotificationsPoller(path=state_path).state['since'] == '2024-01-01T00:07:00Z'
+
+
+def test_pr_data_cache(fake_github, monkeypatch, tmp_path):
+
+    monkeypatch.setattr(boegelbot, 'det_commit_status', lambda *args: 'success')
+
+    gen_workflow_runs_data(fake_github, 'easybuilders', 'easybuild-easyconfigs', 3)
+    github = RestClient('http://127.0.0.1:%s' % fake_github.server_port, username='boegelbot', token='fake')
+    cache_path = str(tmp_path / 'pr_cache.json')
+
+    pr_cache = PRDataCache(path=cache_path, max_size=2)
+    pr_data = pr_cache.fetch(github, 1, 'easybuilders', 'easybuild-easyconfigs', 'boegelbot')
+    assert pr_data['number'] == 1
+    assert pr_data['head']['sha'] == 'sha1'
+    assert pr_data['issue_comments'] == [{'body': 'test', 'id': 1}]
+    assert pr_data['reviews'] == []
+    assert pr_data['status_last_commit'] == 'success'
+    assert len(fake_github.requests) == 3
+
+    # cached data is used as is, unless a different head SHA is specified
+    assert pr_cache.fetch(github, '1', 'easybuilders', 'easybuild-easyconfigs', 'boegelbot') is pr_data
+    assert pr_cache.fetch(github, 1, 'easybuilders', 'easybuild-easyconfigs', 'boegelbot', head_sha='sha1') is pr_data
+    assert len(fake_github.requests) == 3
+    pr_cache.fetch(github, 1, 'easybuilders', 'easybuild-easyconfigs', 'boegelbot', head_sha='sha2')
+    assert len(fake_github.requests) == 6
+    assert pr_cache.stats == {'hit': 2, 'not modified': 3, 'download': 3}
+
+    # least recently used entries are evicted
+    for pr in [2, 3]:
+        pr_cache.fetch(github, pr, 'easybuilders', 'easybuild-easyconfigs', 'boegelbot')
+    assert list(pr_cache.entries) == [('easybuilders', 'easybuild-easyconfigs', 2),
+                                      ('easybuilders', 'easybuild-easyconfigs', 3)]
+
+    # invalidated entries are revalidated, only data that changed is downloaded again
+    pr_data = pr_cache.fetch(github, 3, 'easybuilders', 'easybuild-easyconfigs', 'boegelbot')
+    pr_cache.invalidate({'base': {'repo': {'name': 'easybuild-easyconfigs', 'owner': {'login': 'easybuilders'}}},
+                         'number': 3})
+    comments = fake_github.routes[('/repos/easybuilders/easybuild-easyconfigs/issues/3/comments', ())]
+    comments.append({'body': 'another comment', 'id': 4})
+    pr_data = pr_cache.fetch(github, 3, 'easybuilders', 'easybuild-easyconfigs', 'boegelbot')
+    assert pr_data['issue_comments'][-1] == {'body': 'another comment', 'id': 4}
+    assert pr_cache.stats == {'hit': 3, 'not modified': 5, 'download': 10}
+
+    # entries can be persisted to disk, and are revalidated when they are loaded again
+    pr_cache.save()
+    assert os.path.exists(cache_path)
+    pr_cache = PRDataCache(path=cache_path)
+    assert len(pr_cache.entries) == 2
+    fake_github.requests = []
+    assert pr_cache.fetch(github, 3, 'easybuilders', 'easybuild-easyconfigs', 'boegelbot') == pr_data
+    assert len(fake_github.requests) == 3
+    assert pr_cache.stats == {'hit': 0, 'not modified': 3, 'download': 0}
+
+
+def test_fetch_github_failed_workflows_journal(fake_github, monkeypatch, tmp_path):
+
+    pr_status = {}
+    monkeypatch.setattr(boegelbot, 'det_commit_status', lambda _, __, sha, ___: pr_status.get(sha, 'failure'))
+
+    gen_workflow_runs_data(fake_github, 'easybuilders', 'easybuild-easyconfigs', 10)
+    runs = fake_github.routes[('/repos/easybuilders/easybuild-easyconfigs/actions/runs', (('event', 'pull_request'),))]
+    github = RestClient('http://127.0.0.1:%s' % fake_github.server_port, username='boegelbot', token='fake')
+    journal_path = str(tmp_path / 'journal.json')
+
+    # status of last commit for PR #3 is still pending
+    pr_status['sha3'] = 'pending'
+
+    run_journal = WorkflowRunJournal(path=journal_path)
+    args = (github, 'easybuilders', 'easybuild-easyconfigs', 'boegelbot', 'boegel')
+    res = fetch_github_failed_workflows(*args, run_journal=run_journal)
+    assert sorted(pr_id for (pr_id, _, _) in res) == [1, 2, 4, 6, 7, 8, 9]
+
+    # workflow runs for PRs to report back on are only recorded once the comment was posted
+    assert '701' not in run_journal.repos['easybuilders/easybuild-easyconfigs']['runs']
+    assert fetch_github_failed_workflows(*args, run_journal=run_journal) != []
+    for (pr_id, _, _) in res:
+        run_journal.commit('easybuilders', 'easybuild-easyconfigs', pr_id)
+    assert '701' in run_journal.repos['easybuilders/easybuild-easyconfigs']['runs']
+    assert run_journal.pending == {}
+    run_journal.save()
+
+    # journal is not saved in dry run mode
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', True)
+    with open(journal_path) as fh:
+        journal = fh.read()
+    run_journal.record('easybuilders', 'easybuild-easyconfigs', [{'id': 123, 'updated_at': '2024-01-03T00:00:00Z'}])
+    run_journal.save()
+    with open(journal_path) as fh:
+        assert fh.read() == journal
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', False)
+
+    # workflow runs that were already processed are not processed again (only workflow runs are listed),
+    # except for workflow runs for PRs for which status of last commit was still pending
+    fake_github.requests = []
+    run_journal = WorkflowRunJournal(path=journal_path)
+    assert fetch_github_failed_workflows(*args, run_journal=run_journal) == []
+    assert len([x for x in fake_github.requests if x[0].endswith('/pulls')]) == 1
+
+    del pr_status['sha3']
+    res = fetch_github_failed_workflows(*args, run_journal=run_journal)
+    assert [pr_id for (pr_id, _, _) in res] == [3]
+    run_journal.commit('easybuilders', 'easybuild-easyconfigs', 3)
+
+    # updated workflow runs are processed again
+    fake_github.requests = []
+    for run in runs['workflow_runs']:
+        if run['id'] == 701:
+            run['updated_at'] = '2024-01-02T00:00:00Z'
+    res = fetch_github_failed_workflows(*args, run_journal=run_journal)
+    assert [pr_id for (pr_id, _, _) in res] == [7]
+    assert len([x for x in fake_github.requests if x[0].endswith('/logs')]) == 1
+    run_journal.commit('easybuilders', 'easybuild-easyconfigs', 7)
+    assert run_journal.repos['easybuilders/easybuild-easyconfigs']['runs']['701'] == '2024-01-02T00:00:00Z'
+
+
+def gen_pr_data(comments_cnt):
+    """Generate PR data with specified number of comments."""
+    comments = []
+    for idx in range(comments_cnt):
+        comments.append({
+            'body': "@boegelbot please test @jsc-zen3\nfoo bar baz\n" * 10,
+            'id': idx,
+            'user': {'login': 'boegel'},
+        })
+        comments.append({
+            'body': "@boegel: Request for testing this PR well received\n\n"
+                    "*- notification for comment with ID %s processed*" % idx,
+            'id': idx + 1000000,
+            'user': {'login': 'boegelbot'},
+        })
+
+    return {
+        'base': {'repo': {'name': 'easybuild-easyconfigs', 'owner': {'login': 'easybuilders'}}},
+        'issue_comments': comments,
+        'number': 123,
+    }
+
+
+def test_comment_index(monkeypatch, capsys):
+
+    pr_data = gen_pr_data(1000)
+    pr_data['issue_comments'].insert(10, {
+        'body': "@boegel: Tests failed in GitHub Actions, see https://example.com/runs/1\nLast 100 lines of output:",
+        'id': 123,
+        'user': {'login': 'boegelbot'},
+    })
+    # only comments posted by bot are taken into account
+    pr_data['issue_comments'].append({
+        'body': "notification for comment with ID 1000 processed",
+        'id': 2000,
+        'user': {'login': 'boegel'},
+    })
+
+    comment_index = CommentIndex(pr_data['issue_comments'], 'boegelbot')
+    assert comment_index.contains("@boegel: Tests failed in GitHub Actions, see https://example.com/runs/1")
+    assert not comment_index.contains("@boegel: Tests failed in GitHub Actions, see https://example.com/runs/2")
+    # message is only found if it is included in a single comment, not if its lines are spread across comments
+    assert comment_index.contains("  @boegel: Tests failed in GitHub Actions, see https://example.com/runs/1  \n")
+    assert comment_index.contains("@boegelbot please test @jsc-zen3\nfoo bar baz")
+    assert not comment_index.contains("@boegelbot please test @jsc-zen3\n"
+                                      "@boegel: Tests failed in GitHub Actions, see https://example.com/runs/1")
+    assert comment_index.is_processed(0)
+    assert comment_index.is_processed('999')
+    assert not comment_index.is_processed(1000)
+    assert not comment_index.is_processed(None)
+    assert comment_index.author(123) == 'boegelbot'
+    assert comment_index.author(999) == 'boegel'
+    assert comment_index.author(12345) is None
+    assert comment_index.latest_mention['id'] == 999
+
+    # comments in which bot is not mentioned at the start of a line are not taken into account
+    comment_data = {'body': "hey @boegelbot: please test @jsc-zen3", 'id': 2001, 'user': {'login': 'x'}}
+    pr_data['issue_comments'].append(comment_data)
+    assert CommentIndex(pr_data['issue_comments'], 'boegelbot').latest_mention['id'] == 999
+    assert CommentIndex(pr_data['issue_comments'], 'easybuilders').latest_mention is None
+
+    # comment is not posted again if check message is found
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', True)
+    check_msg = "@boegel: Tests failed in GitHub Actions, see https://example.com/runs/1"
+    comment(None, 'boegelbot', 'easybuild-easyconfigs', pr_data, check_msg + '\nmore info', check_msg=check_msg)
+    assert "Message already found" in capsys.readouterr().out
+
+    check_msg = check_msg.replace('runs/1', 'runs/2')
+    comment(None, 'boegelbot', 'easybuild-easyconfigs', pr_data, check_msg + '\nmore info', check_msg=check_msg)
+    assert "Message not found yet" in capsys.readouterr().out
+
+    # index is only created once for cached PR data
+    pr_cache = PRDataCache()
+    pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 123)] = {'comment_index': {}, 'pr_data': pr_data}
+    comment_index = pr_cache.comment_index(pr_data, 'boegelbot')
+    assert pr_cache.comment_index(pr_data, 'boegelbot') is comment_index
+    assert pr_cache.comment_index(gen_pr_data(1), 'boegelbot') is not comment_index
+
+
+def test_process_notifications(monkeypatch, capsys):
+
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', True)
+
+    # synthetic PR with a long discussion, in which all requests were already processed
+    pr_data = gen_pr_data(5000)
+    pr_cache = PRDataCache()
+    pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 123)] = {
+        'comment_index': {},
+        'etags': {},
+        'pr_data': pr_data,
+        'timestamp': time.time(),
+    }
+    notification = {
+        'reason': 'mention',
+        'subject': {
+            'title': "test PR",
+            'url': 'https://api.github.com/repos/easybuilders/easybuild-easyconfigs/pulls/123',
+        },
+        'thread_id': '1',
+        'timestamp': '2024-01-01T00:00:00Z',
+        'unread': True,
+    }
+    args = (None, 'boegelbot', 'easybuilders', 'easybuild-easyconfigs', 'jsc-zen3', 'jsc-zen3-a100', 'echo', 16, '')
+
+    start = time.time()
+    process_notifications([notification] * 10, *args, pr_cache=pr_cache)
+    print("processing 10 notifications for PR with %d comments: %.3fs" % (len(pr_data['issue_comments']),
+                                                                           time.time() - start))
+    stdout = capsys.readouterr().out
+    assert stdout.count("already processed, so skipping it") == 10
+    assert stdout.count("Not marking notification thread 1 as read") == 10
+    # comments are only indexed once
+    assert len(pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 123)]['comment_index']) == 1
+
+    # new request by someone who is not allowed to use the bot, followed by other comments
+    pr_data['issue_comments'].append({'body': "@boegelbot please test @jsc-zen3", 'id': 5000, 'user': {'login': 'x'}})
+    pr_data['issue_comments'].extend({'body': "LGTM", 'id': 5001 + idx, 'user': {'login': 'y'}} for idx in range(100))
+    pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 123)]['comment_index'] = {}
+
+    process_notifications([notification], *args, pr_cache=pr_cache)
+    stdout = capsys.readouterr().out
+    assert "@x: I noticed your comment" in stdout
+    assert "notification for comment with ID 5000 processed" in stdout
+
+    # request that doesn't mention host is ignored (but notification is still marked as read)
+    pr_data['issue_comments'].append({'body': "@boegelbot please test @generoso", 'id': 6000, 'user': {'login': 'x'}})
+    pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 123)]['comment_index'] = {}
+    process_notifications([notification], *args, pr_cache=pr_cache)
+    stdout = capsys.readouterr().out
+    assert "not found in comment for PR #123, so ignoring it" in stdout
+    assert "Posting comment" not in stdout
+    assert "Not marking notification thread 1 as read" in stdout
+
+
+# fake 'sbatch' command, which takes a while to submit a job, and fails for PR #5
+FAKE_SBATCH = """#!/bin/bash
+echo "start $EB_PR" >> %(log)s.events
+sleep 0.5
+echo "end $EB_PR" >> %(log)s.events
+if [ "$EB_PR" == "5" ]; then
+    echo "sbatch: error: Batch job submission failed: Invalid account or account/partition combination specified"
+    exit 1
+fi
+echo "$EB_PR:$EB_ARGS:$@" >> %(log)s
+echo "Submitted batch job $((1000 + $EB_PR))"
+"""
+
+
+def max_concurrency(events_file):
+    """Determine maximum number of commands that were running concurrently, from log of start/end events."""
+    running, res = 0, 0
+    for line in events_file.read_text().splitlines():
+        running += 1 if line.startswith('start ') else -1
+        res = max(res, running)
+    return res
+
+
+def setup_test_requests(tmp_path, prs, requested_by='boegel'):
+    """
+    Set up requests to test specified PRs, using fake 'sbatch' command:
+    returns PR data cache (with data for PRs), notifications, and PR test command.
+    """
+    sbatch = tmp_path / 'sbatch'
+    sbatch.write_text(FAKE_SBATCH % {'log': tmp_path / 'sbatch.log'})
+    sbatch.chmod(0o755)
+    pr_test_cmd = "EB_PR=%(pr)s EB_ARGS=%(eb_args)s EB_REPO=%(repository)s " + str(sbatch)
+    pr_test_cmd += " --job-name test_PR_%(pr)s --ntasks=%(core_cnt)s %(slurm_args)s"
+
+    pr_cache = PRDataCache()
+    notifications = []
+    for pr in prs:
+        body = "@boegelbot please test @jsc-zen3" + (' EB_ARGS="--debug --trace"' if pr % 2 else '')
+        pr_data = {
+            'base': {'repo': {'name': 'easybuild-easyconfigs', 'owner': {'login': 'easybuilders'}}},
+            'changed_files': pr,
+            'head': {'sha': 'sha%d' % pr},
+            'issue_comments': [{'body': body, 'id': 100 + pr, 'user': {'login': requested_by}}],
+            'number': pr,
+        }
+        key = ('easybuilders', 'easybuild-easyconfigs', pr)
+        pr_cache.entries[key] = {'comment_index': {}, 'etags': {}, 'pr_data': pr_data, 'timestamp': time.time()}
+        notifications.append({
+            'subject': {
+                'title': "PR #%d" % pr,
+                'url': 'https://api.github.com/repos/easybuilders/easybuild-easyconfigs/pulls/%d' % pr,
+            },
+            'thread_id': str(pr),
+            'timestamp': '2024-01-01T00:00:00Z',
+            'unread': True,
+        })
+
+    return pr_cache, notifications, pr_test_cmd
+
+
+def test_process_notifications_submit(monkeypatch, tmp_path, capsys):
+
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', True)
+    monkeypatch.setattr(boegelbot, 'get_hostname', lambda: 'fakehost')
+
+    # requests to test a dozen different PRs
+    pr_cache, notifications, pr_test_cmd = setup_test_requests(tmp_path, range(1, 13))
+    sbatch_log = tmp_path / 'sbatch.log'
+    # multiple notifications for the same PR only result in a single test job
+    notifications.append(notifications[0])
+
+    args = (None, 'boegelbot', 'easybuilders', 'easybuild-easyconfigs', 'jsc-zen3', '', pr_test_cmd, 16, '')
+    job_tracker = SlurmJobTracker()
+    process_notifications(notifications, *args, pr_cache=pr_cache, max_workers=12, job_tracker=job_tracker)
+
+    # jobs are submitted concurrently
+    assert max_concurrency(tmp_path / 'sbatch.log.events') > 1
+
+    stdout = capsys.readouterr().out
+    assert stdout.count("Request for testing this PR well received on fakehost") == 12
+    assert "notification for comment with ID 101 processed" in stdout
+    assert "Notification 1 already processed" in stdout
+    assert stdout.count("Not marking notification thread") == 13
+
+    submitted = sorted(sbatch_log.read_text().splitlines(), key=lambda x: int(x.split(':')[0]))
+    assert len(submitted) == 11
+    assert submitted[0] == "1:--debug --trace:--job-name test_PR_1 --ntasks=16"
+    assert submitted[1] == "2::--job-name test_PR_2 --ntasks=16"
+    for pr in range(1, 13):
+        if pr == 5:
+            assert "Invalid account or account/partition combination specified" in stdout
+            assert "* exit code: 1" in stdout
+        else:
+            assert "Submitted batch job %d" % (1000 + pr) in stdout
+            assert "I'll report back once Slurm job %d is finished" % (1000 + pr) in stdout
+
+    # submitted jobs are tracked
+    assert sorted(job_tracker.jobs) == [str(1000 + pr) for pr in range(1, 13) if pr != 5]
+    assert job_tracker.jobs['1001']['pr'] == 1
+    assert job_tracker.jobs['1001']['requested_by'] == 'boegel'
+
+    # jobs for requests that use the same EasyBuild branch (other than develop) are submitted one by one
+    # (submit command updates the checkouts of the EasyBuild repositories for that branch first)
+    # (mkdir fails if lock directory for a branch already exists, so overlapping submissions are detected)
+    test_requests = []
+    events = tmp_path / 'submit.events'
+    for idx, eb_branch in enumerate(['5.0.x', 'develop', '5.0.x', 'develop', '5.0.x', '4.9.x']):
+        test_request = gen_test_request(idx)
+        lock_dir = tmp_path / ('lock_%s_%s' % (eb_branch, idx if eb_branch == 'develop' else ''))
+        cmd = "echo 'start %(idx)d' >> %(events)s && mkdir %(lock)s && sleep 0.2 && rmdir %(lock)s && "
+        cmd += "echo 'end %(idx)d' >> %(events)s && echo 'Submitted batch job %(job_id)d'"
+        test_request['cmd'] = cmd % {'events': events, 'idx': idx, 'job_id': 2000 + idx, 'lock': lock_dir}
+        test_request['eb_branch'] = eb_branch
+        test_requests.append(test_request)
+    res = submit_test_requests(test_requests, max_workers=6)
+    assert [(ec, out.strip()) for (out, ec, _) in res] == [(0, 'Submitted batch job %d' % (2000 + idx))
+                                                           for idx in range(6)]
+
+    # jobs for same branch are submitted in order in which requests were received
+    started = [line.split()[1] for line in events.read_text().splitlines() if line.startswith('start ')]
+    assert [idx for idx in started if idx in ['0', '2', '4']] == ['0', '2', '4']
+    # jobs for different branches (and for develop branch) are still submitted concurrently
+    assert max_concurrency(events) > 1
+
+
+def test_check_test_requests(monkeypatch, tmp_path, capsys):
+
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', True)
+    monkeypatch.setattr(boegelbot, 'get_hostname', lambda: 'fakehost')
+
+    pr_cache, notifications, pr_test_cmd = setup_test_requests(tmp_path, [1, 2])
+    pr_cache.path = str(tmp_path / 'pr_cache.json')
+
+    def fake_check_notifications(*args, **kwargs):
+        kwargs['poller'].pending = {'since': '2024-01-01T00:07:00Z'}
+        return {'easybuild-easyconfigs': notifications}
+
+    monkeypatch.setattr(boegelbot, 'check_notifications', fake_check_notifications)
+
+    args = (None, 'boegelbot', 'easybuilders', ['easybuild-easyconfigs'], 'jsc-zen3', '', pr_test_cmd, 16, '')
+    poller = NotificationsPoller()
+    check_test_requests(*args, pr_cache=pr_cache, poller=poller)
+    assert capsys.readouterr().out.count("Request for testing this PR well received on fakehost") == 2
+    assert poller.state['since'] == '2024-01-01T00:07:00Z'
+
+    # PR data cache is saved after each check (not only when bot is stopped, in daemon mode)
+    assert len(PRDataCache(path=pr_cache.path).entries) == 2
+
+    # state of notifications poller is not updated if processing notifications failed,
+    # so the same notifications are considered again in the next check
+    def fake_process_notifications(*args, **kwargs):
+        boegelbot.error("Failed to process notifications")
+
+    monkeypatch.setattr(boegelbot, 'process_notifications', fake_process_notifications)
+    poller = NotificationsPoller()
+    with pytest.raises(SystemExit):
+        check_test_requests(*args, pr_cache=pr_cache, poller=poller)
+    assert poller.state['since'] is None
+
+
+# fake Slurm commands: output is taken from squeue.out/sacct.out files, commands that are run are logged
+FAKE_SLURM_CMD = """#!/bin/bash
+echo "$(basename $0) $@" >> %(dir)s/slurm.log
+if [ -f %(dir)s/$(basename $0).fail ]; then
+    echo "$(basename $0): error: Unable to contact slurm controller (connect failure)" >&2
+    exit 1
+fi
+cat %(dir)s/$(basename $0).out
+"""
+
+
+def gen_test_request(pr, requested_by='boegel', priority=0, changed_files=1, eb_args='', head_sha=None):
+    """Generate request to test a PR."""
+    return {
+        'account': 'easybuilders',
+        'changed_files': changed_files,
+        'cmd': 'EB_PR=%s EB_ARGS="%s" sbatch eb_from_pr_upload.sh' % (pr, eb_args),
+        'head_sha': head_sha or 'sha%d' % pr,
+        'pr': pr,
+        'priority': priority,
+        'received': time.time(),
+        'repository': 'easybuild-easyconfigs',
+        'requested_by': requested_by,
+    }
+
+
+def fake_slurm(tmp_path, squeue_out, sacct_out):
+    """Set up fake Slurm commands (squeue/sacct) with specified output; returns path to directory with commands."""
+    bin_dir = tmp_path / 'bin'
+    if not bin_dir.exists():
+        bin_dir.mkdir()
+        for cmd in ['squeue', 'sacct']:
+            (bin_dir / cmd).write_text(FAKE_SLURM_CMD % {'dir': tmp_path})
+            (bin_dir / cmd).chmod(0o755)
+    (tmp_path / 'squeue.out').write_text(squeue_out)
+    (tmp_path / 'sacct.out').write_text(sacct_out)
+    if (tmp_path / 'slurm.log').exists():
+        (tmp_path / 'slurm.log').unlink()
+    return str(bin_dir)
+
+
+def test_slurm_job_tracker(tmp_path, capsys):
+
+    assert parse_mem_size('2048000K') == 2048000 * 1024
+    assert parse_mem_size('1.5G') == 1536 * 1024 * 1024
+    assert parse_mem_size('123') == 123
+    assert parse_mem_size('') is None
+
+    squeue_out = "1001 RUNNING\n999 PENDING\n"
+    sacct_out = '\n'.join([
+        "1002|COMPLETED|0:0|01:02:03|",
+        "1002.batch|COMPLETED|0:0|01:02:03|2048000K",
+        "1002.extern|COMPLETED|0:0|01:02:03|1000K",
+        "1003|OUT_OF_MEMORY|0:125|00:10:00|",
+        "1003.batch|OUT_OF_MEMORY|0:125|00:10:00|16G",
+        "1003.extern|COMPLETED|0:0|00:10:00|0",
+        "1004|RUNNING|0:0|00:00:05|",
+    ])
+    slurm_path = fake_slurm(tmp_path, squeue_out, sacct_out)
+
+    path = str(tmp_path / 'slurm_jobs.json')
+    job_tracker = SlurmJobTracker(path=path, slurm_path=slurm_path)
+
+    # no Slurm commands are run if no jobs are tracked
+    assert job_tracker.poll() == []
+    assert not (tmp_path / 'slurm.log').exists()
+
+    for job_id in range(1001, 1006):
+        job_tracker.add(job_id, gen_test_request(job_id - 1000))
+    # no accounting info available (yet) for job 1005 (but it's not too old yet)
+    job_tracker.jobs['1005']['submitted'] -= 3600
+
+    finished = sorted(job_tracker.poll(), key=lambda job: job['id'])
+    assert [job['id'] for job in finished] == ['1002', '1003']
+    assert finished[0]['state'] == 'COMPLETED'
+    assert finished[0]['exit_code'] == '0:0'
+    assert finished[0]['elapsed'] == '01:02:03'
+    assert finished[0]['max_rss'] == '2048000K'
+    assert finished[0]['pr'] == 2
+    assert finished[1]['state'] == 'OUT_OF_MEMORY'
+    assert finished[1]['exit_code'] == '0:125'
+    assert finished[1]['max_rss'] == '16G'
+
+    # status of all jobs is checked with a single squeue + sacct command
+    slurm_log = (tmp_path / 'slurm.log').read_text().splitlines()
+    assert len(slurm_log) == 2
+    assert slurm_log[0].startswith('squeue ')
+    assert '--user=%s' % getpass.getuser() in slurm_log[0]
+    assert '--jobs=1002,1003,1004,1005' in slurm_log[1]
+
+    # finished jobs are tracked until their status was reported
+    assert sorted(job_tracker.jobs) == ['1001', '1002', '1003', '1004', '1005']
+    for job in finished:
+        job_tracker.done(job['id'])
+
+    # tracked jobs are persisted
+    job_tracker.save()
+    job_tracker = SlurmJobTracker(path=path, slurm_path=slurm_path)
+    assert sorted(job_tracker.jobs) == ['1001', '1004', '1005']
+
+    # jobs are still tracked if Slurm commands fail
+    (tmp_path / 'squeue.fail').write_text('')
+    assert job_tracker.poll() == []
+    assert "Unable to contact slurm controller" in capsys.readouterr().err
+    assert sorted(job_tracker.jobs) == ['1001', '1004', '1005']
+    (tmp_path / 'squeue.fail').unlink()
+
+    # jobs for which no status can be found are no longer tracked after a while
+    fake_slurm(tmp_path, '', "1001|CANCELLED by 1234|0:15|00:00:10|\n1004|FAILED|1:0|00:20:00|\n")
+    job_tracker.jobs['1005']['submitted'] -= 30 * 24 * 3600
+    finished = sorted(job_tracker.poll(), key=lambda job: job['id'])
+    assert [(job['id'], job['state']) for job in finished] == [('1001', 'CANCELLED'), ('1004', 'FAILED')]
+    assert finished[0]['max_rss'] is None
+    assert "No status found for Slurm job 1005" in capsys.readouterr().err
+    assert sorted(job_tracker.jobs) == ['1001', '1004']
+
+
+def test_report_finished_jobs(monkeypatch, tmp_path, capsys):
+
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', True)
+    monkeypatch.setattr(boegelbot, 'get_hostname', lambda: 'fakehost')
+
+    sacct_out = "1002|COMPLETED|0:0|01:02:03|\n1002.batch|COMPLETED|0:0|01:02:03|2048000K\n"
+    slurm_path = fake_slurm(tmp_path, "1001 RUNNING\n", sacct_out)
+
+    pr_data = gen_pr_data(10)
+    pr_cache = PRDataCache()
+    fetched = []
+
+    def fetch(*args, **kwargs):
+        fetched.append(args)
+        return pr_data
+
+    monkeypatch.setattr(pr_cache, 'fetch', fetch)
+
+    job_tracker = SlurmJobTracker(slurm_path=slurm_path)
+    job_tracker.add(1001, gen_test_request(123))
+    job_tracker.add(1002, gen_test_request(123))
+    job_tracker.jobs['1002']['host'] = 'jsc-zen3'
+
+    # test reports posted in PR: before job was submitted, and for another host
+    now = time.time()
+    for idx, (ts, host) in enumerate([(now - 3600, 'jsc-zen3'), (now + 60, 'jsc-zen3'), (now + 120, 'generoso')]):
+        pr_data['issue_comments'].append({
+            'body': "Test report by @boegelbot\n**SUCCESS**\nBuild succeeded\n%s-node1 - Linux" % host,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts)),
+            'html_url': 'https://github.com/easybuilders/easybuild-easyconfigs/pull/123#issuecomment-%d' % idx,
+            'id': 10000 + idx,
+            'user': {'login': 'boegelbot'},
+        })
+
+    finished = report_finished_jobs(None, 'boegelbot', job_tracker, pr_cache=pr_cache)
+    assert [job['id'] for job in finished] == ['1002']
+    stdout = capsys.readouterr().out
+    assert "@boegel: Slurm job 1002 to test this PR on fakehost is finished" in stdout
+    assert "* maximum memory usage (MaxRSS): 2048000K" in stdout
+    assert "* test report: https://github.com/easybuilders/easybuild-easyconfigs/pull/123#issuecomment-1" in stdout
+    assert "Slurm job 1001" not in stdout
+    assert len(fetched) == 1
+
+    # result is recorded
+    result = job_tracker.get_result(gen_test_request(123))
+    assert result['job_id'] == '1002'
+    assert result['state'] == 'COMPLETED'
+    assert result['report_url'].endswith('#issuecomment-1')
+
+    # status is not reported again if it was already reported before
+    pr_data['issue_comments'].append({
+        'body': "@boegel: Slurm job 1002 to test this PR on fakehost is finished\n* state: COMPLETED",
+        'id': 12345,
+        'user': {'login': 'boegelbot'},
+    })
+    job_tracker.add(1002, gen_test_request(123))
+    report_finished_jobs(None, 'boegelbot', job_tracker, pr_cache=pr_cache)
+    assert "Message already found" in capsys.readouterr().out
+
+    # PR data is fetched again if no test report is found, results are not recorded for jobs that failed early
+    fake_slurm(tmp_path, '', "1003|FAILED|1:0|00:00:05|\n")
+    job_tracker.add(1003, gen_test_request(124))
+    fetched[:] = []
+    report_finished_jobs(None, 'boegelbot', job_tracker, pr_cache=pr_cache)
+    assert len(fetched) == 2
+    assert "* test report" not in capsys.readouterr().out
+    assert job_tracker.get_result(gen_test_request(124)) is None
+
+    # jobs are only no longer tracked once their status was reported (job 1001 is not finished yet)
+    assert sorted(job_tracker.jobs) == ['1001']
+    fake_slurm(tmp_path, '', "1005|COMPLETED|0:0|00:10:00|\n")
+    job_tracker.add(1005, gen_test_request(126))
+    monkeypatch.setattr(pr_cache, 'fetch', lambda *args, **kwargs: boegelbot.error("Failed to fetch PR data"))
+    with pytest.raises(SystemExit):
+        report_finished_jobs(None, 'boegelbot', job_tracker, pr_cache=pr_cache)
+    assert sorted(job_tracker.jobs) == ['1001', '1005']
+    monkeypatch.setattr(pr_cache, 'fetch', fetch)
+    assert [job['id'] for job in report_finished_jobs(None, 'boegelbot', job_tracker, pr_cache=pr_cache)] == ['1005']
+    assert sorted(job_tracker.jobs) == ['1001']
+
+    # tracked jobs are not saved in dry run mode, so finished jobs are still reported in the next (real) run
+    path = str(tmp_path / 'slurm_jobs.json')
+    job_tracker = SlurmJobTracker(path=path, slurm_path=slurm_path)
+    job_tracker.add(1004, gen_test_request(125))
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', False)
+    job_tracker.save()
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', True)
+    fake_slurm(tmp_path, '', "1004|COMPLETED|0:0|00:10:00|\n")
+    assert [job['id'] for job in report_finished_jobs(None, 'boegelbot', job_tracker, pr_cache=pr_cache)] == ['1004']
+    job_tracker.save()
+    assert sorted(SlurmJobTracker(path=path).jobs) == ['1004']
+
+
+def test_admission_scheduler(tmp_path):
+
+    path = str(tmp_path / 'slurm_jobs.json')
+    job_tracker = SlurmJobTracker(path=path)
+    scheduler = AdmissionScheduler(job_tracker, max_jobs=3)
+
+    job_tracker.add(1001, gen_test_request(1))
+
+    test_requests = [
+        # same PR + head SHA + settings as outstanding job
+        gen_test_request(1),
+        gen_test_request(2, requested_by='contributor', priority=1),
+        gen_test_request(3, changed_files=500),
+        gen_test_request(4),
+        # duplicate request in same batch
+        gen_test_request(4),
+        gen_test_request(5, requested_by='contributor', priority=1),
+        # same PR, but other settings
+        gen_test_request(1, eb_args='--debug'),
+        # same PR, but new commit
+        gen_test_request(1, head_sha='new_sha'),
+    ]
+    decisions = scheduler.admit(test_requests)
+    assert decisions == [
+        (ADMIT_DUPLICATE, '1001'),
+        (ADMIT_QUEUED, 3),
+        (ADMIT_QUEUED, 2),
+        (ADMIT_SUBMIT, None),
+        (ADMIT_DUPLICATE, DUPLICATE_PENDING),
+        (ADMIT_QUEUED, 4),
+        (ADMIT_SUBMIT, None),
+        (ADMIT_QUEUED, 1),
+    ]
+    assert scheduler.pending == 2
+
+    # duplicate of queued request
+    assert scheduler.admit([gen_test_request(5, requested_by='contributor', priority=1)]) == [(ADMIT_DUPLICATE, None)]
+
+    # nothing can be dispatched as long as admitted requests are pending
+    assert scheduler.dispatch() == []
+    job_tracker.add(1004, test_requests[3])
+    job_tracker.add(1006, test_requests[6])
+    scheduler.submitted(2)
+    assert scheduler.pending == 0
+    assert scheduler.dispatch() == []
+
+    # requests by maintainers go before requests by contributors
+    test_request = gen_test_request(6)
+    assert scheduler.admit([test_request]) == [(ADMIT_QUEUED, 2)]
+
+    # queued requests are persisted with tracked jobs
+    job_tracker.save()
+    job_tracker = SlurmJobTracker(path=path)
+    scheduler = AdmissionScheduler(job_tracker, max_jobs=3)
+    assert [(x['pr'], x['head_sha']) for x in job_tracker.queue] == [(1, 'new_sha'), (6, 'sha6'), (3, 'sha3'),
+                                                                     (2, 'sha2'), (5, 'sha5')]
+
+    # queued requests are dispatched in priority order when outstanding jobs are finished
+    del job_tracker.jobs['1001']
+    del job_tracker.jobs['1004']
+    dispatched = scheduler.dispatch()
+    assert [x['pr'] for x in dispatched] == [1, 6]
+    assert scheduler.dispatch() == []
+    job_tracker.add(1011, dispatched[0])
+    job_tracker.add(1016, dispatched[1])
+    scheduler.submitted(2)
+    assert scheduler.dispatch() == []
+
+    del job_tracker.jobs['1006']
+    assert [x['pr'] for x in scheduler.dispatch()] == [3]
+    assert [x['pr'] for x in job_tracker.queue] == [2, 5]
+
+    # no limit on number of outstanding jobs, only duplicate requests are merged
+    scheduler = AdmissionScheduler(SlurmJobTracker())
+    scheduler.job_tracker.add(1007, gen_test_request(7))
+    decisions = scheduler.admit([gen_test_request(pr) for pr in range(1, 10)])
+    assert decisions == [(ADMIT_SUBMIT, None)] * 6 + [(ADMIT_DUPLICATE, '1007')] + [(ADMIT_SUBMIT, None)] * 2
+
+
+def test_test_results(tmp_path):
+
+    path = str(tmp_path / 'slurm_jobs.json')
+    job_tracker = SlurmJobTracker(path=path)
+    scheduler = AdmissionScheduler(job_tracker)
+
+    job = dict(gen_test_request(1), exit_code='0:0', id='1001', state='COMPLETED')
+    job_tracker.record_result(job, report_url='https://example.com/report')
+    old_job = dict(gen_test_request(2), exit_code='0:0', id='1002', state='COMPLETED')
+    job_tracker.record_result(old_job)
+    job_tracker.results[job_tracker.result_key(old_job)]['finished'] -= 60 * 24 * 3600
+
+    test_requests = [
+        # same PR, same commit, same settings
+        gen_test_request(1),
+        # same PR, but new commit
+        gen_test_request(1, head_sha='new_sha'),
+        # same PR, but other settings
+        gen_test_request(1, eb_args='--debug'),
+        # result is too old
+        gen_test_request(2),
+        # testing again is forced
+        dict(gen_test_request(1), force=True),
+    ]
+    decisions = scheduler.admit(test_requests)
+    assert decisions[0][0] == ADMIT_TESTED
+    assert decisions[0][1]['job_id'] == '1001'
+    assert decisions[0][1]['report_url'] == 'https://example.com/report'
+    assert decisions[1:] == [(ADMIT_SUBMIT, None)] * 4
+
+    # forced request is also not merged with outstanding job
+    job_tracker.add(1003, gen_test_request(3))
+    forced = dict(gen_test_request(3), force=True)
+    assert scheduler.admit([gen_test_request(3), forced]) == [(ADMIT_DUPLICATE, '1003'), (ADMIT_SUBMIT, None)]
+
+    # results are persisted (only if they're not too old)
+    job_tracker.save()
+    job_tracker = SlurmJobTracker(path=path)
+    assert job_tracker.get_result(gen_test_request(1))['job_id'] == '1001'
+    assert len(job_tracker.results) == 1
+
+
+def test_process_notifications_admission(monkeypatch, tmp_path, capsys):
+
+    monkeypatch.setattr(boegelbot, 'DRY_RUN', True)
+    monkeypatch.setattr(boegelbot, 'get_hostname', lambda: 'fakehost')
+
+    pr_cache, notifications, pr_test_cmd = setup_test_requests(tmp_path, [1, 2, 3, 4])
+    # data for PR 1 is also used when queued request for PR 1 is dispatched
+    pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 1)]['timestamp'] = time.time() + 3600
+    job_tracker = SlurmJobTracker()
+    scheduler = AdmissionScheduler(job_tracker, max_jobs=2)
+    job_tracker.add(1000, gen_test_request(10))
+
+    args = (None, 'boegelbot', 'easybuilders', 'easybuild-easyconfigs', 'jsc-zen3', '', pr_test_cmd, 16, '')
+    kwargs = {'job_tracker': job_tracker, 'max_workers': 4, 'pr_cache': pr_cache, 'scheduler': scheduler}
+    process_notifications(notifications, *args, **kwargs)
+
+    # only a single job is submitted (for smallest PR), other requests are queued
+    stdout = capsys.readouterr().out
+    assert sorted(job_tracker.jobs) == ['1000', '1001']
+    assert [x['pr'] for x in job_tracker.queue] == [2, 3, 4]
+    assert "Submitted batch job 1001" in stdout
+    for pr, position in [(2, 1), (3, 2), (4, 3)]:
+        assert "so this request was queued (position %d)" % position in stdout
+        assert "notification for comment with ID %d processed" % (100 + pr) in stdout
+    assert "The maximum number of 2 test jobs on fakehost is reached" in stdout
+
+    # queued requests are submitted once outstanding jobs are finished
+    del job_tracker.jobs['1000']
+    del job_tracker.jobs['1001']
+
+    # dispatched requests are put back in the queue if no jobs could be submitted for them
+    failing_pr_cache = PRDataCache()
+    monkeypatch.setattr(failing_pr_cache, 'fetch', lambda *args: boegelbot.error("Failed to fetch PR data"))
+    with pytest.raises(SystemExit):
+        dispatch_queued_requests(None, 'boegelbot', scheduler, pr_cache=failing_pr_cache, max_workers=2)
+    assert [x['pr'] for x in job_tracker.queue] == [2, 3, 4]
+    assert scheduler.pending == 0
+
+    for pr in [2, 3]:
+        pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', pr)]['timestamp'] = time.time() + 3600
+    # PR 2 was updated since request to test it was queued, so job is tracked with current head SHA of PR
+    pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 2)]['pr_data']['head']['sha'] = 'updated_sha'
+    dispatched = dispatch_queued_requests(None, 'boegelbot', scheduler, pr_cache=pr_cache, max_workers=2)
+    assert [x['pr'] for x in dispatched] == [2, 3]
+    assert sorted(job_tracker.jobs) == ['1002', '1003']
+    assert job_tracker.jobs['1002']['head_sha'] == 'updated_sha'
+    assert [x['pr'] for x in job_tracker.queue] == [4]
+    stdout = capsys.readouterr().out
+    assert stdout.count("@boegel: Queued request for testing this PR was submitted on fakehost") == 2
+    assert "I'll report back once Slurm job 1003 is finished" in stdout
+
+    # new request for same PR + head SHA + settings is merged with outstanding job
+    pr_data = pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 3)]['pr_data']
+    comment_txt = '@boegelbot please test @jsc-zen3 EB_ARGS="--debug --trace"'
+    pr_data['issue_comments'].append({'body': comment_txt, 'id': 1003, 'user': {'login': 'boegel'}})
+    pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 3)]['comment_index'] = {}
+    process_notifications([notifications[2]], *args, **kwargs)
+    stdout = capsys.readouterr().out
+    assert "This PR is already being tested with the same settings in Slurm job 1003" in stdout
+    assert sorted(job_tracker.jobs) == ['1002', '1003']
+
+    # result of finished job is used for new request for same PR + head SHA + settings, unless 'force' is used
+    job = job_tracker.jobs.pop('1003')
+    job_tracker.record_result(dict(job, exit_code='0:0', id='1003', state='COMPLETED'), report_url='https://x.y/z')
+    pr_data['issue_comments'].append({'body': comment_txt, 'id': 1004, 'user': {'login': 'boegel'}})
+    pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 3)]['comment_index'] = {}
+    process_notifications([notifications[2]], *args, **kwargs)
+    stdout = capsys.readouterr().out
+    assert "This PR (commit sha3) was already tested with the same settings in Slurm job 1003" in stdout
+    assert "see https://x.y/z for the test report" in stdout
+    assert sorted(job_tracker.jobs) == ['1002']
+
+    pr_data['issue_comments'].append({'body': comment_txt + ' force', 'id': 1005, 'user': {'login': 'boegel'}})
+    pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 3)]['comment_index'] = {}
+    process_notifications([notifications[2]], *args, **kwargs)
+    assert "Submitted batch job 1003" in capsys.readouterr().out
+    assert sorted(job_tracker.jobs) == ['1002', '1003']
+    assert scheduler.pending == 0
+
+    # admitted requests are no longer pending if submitting jobs for them failed
+    del job_tracker.jobs['1003']
+    monkeypatch.setattr(boegelbot, 'submit_test_job', lambda cmd: boegelbot.error("Failed to submit job"))
+    pr_data['issue_comments'].append({'body': comment_txt + ' force', 'id': 1006, 'user': {'login': 'boegel'}})
+    pr_cache.entries[('easybuilders', 'easybuild-easyconfigs', 3)]['comment_index'] = {}
+    with pytest.raises(SystemExit):
+        process_notifications([notifications[2]], *args, **kwargs)
+    assert sorted(job_tracker.jobs) == ['1002']
+    assert scheduler.pending == 0
+
+
+def reference_parse(comment_txt, github_user, host, gpuhost):
+    """Reference implementation for parsing comments, as it used to be done in process_notifications."""
+    mention_regex = re.compile(r'^\s*@%s:?\s*' % github_user, re.M)
+    if not mention_regex.search(comment_txt):
+        return None
+
+    host = host or 'NO_HOST_PATTERN_PROVIDED'
+    gpuhost = gpuhost or 'NO_GPUHOST_PATTERN_PROVIDED'
+
+    msg = mention_regex.sub(' ', comment_txt)
+    req = BotRequest(msg, for_host=bool(re.compile(r'@.*%s' % host, re.M).search(msg)),
+                     for_gpuhost=bool(re.compile(r'@.*%s' % gpuhost, re.M).search(msg)))
+    if "PLEASE " in msg:
+        req.action = REQUEST_ACTION_SCREAM
+    elif re.compile(r'[Pp]lease test', re.M).search(msg):
+        req.action = REQUEST_ACTION_TEST
+        for item in shlex.split(msg):
+            for key in ['CORE_CNT', 'EB_ARGS', 'EB_BRANCH', 'SLURM_ARGS']:
+                if item.startswith(key + '='):
+                    _, value = item.split('=', 1)
+                    req.args[key.lower()] = value
+                    break
+        in_container_regex = re.compile("[Pp]lease test @.*%s in container (?P<container>.*)" % host, re.M)
+        res = in_container_regex.search(msg)
+        if res:
+            req.container = res.group('container').strip()
+
+    return req
+
+
+def gen_comment(rng):
+    """Generate random comment, which may or may not be a (valid) request for the bot."""
+    parts = []
+    for _ in range(rng.randint(1, 4)):
+        line = []
+        if rng.random() < 0.6:
+            line.append(rng.choice(['@boegelbot', '@boegelbot:', '  @boegelbot: ', '@boegel', 'hey @boegelbot']))
+        for _ in range(rng.randint(0, 6)):
+            kind = rng.random()
+            if kind < 0.3:
+                line.append(rng.choice(['please test', 'Please test', 'PLEASE test', 'pls test', 'please', 'test']))
+            elif kind < 0.5:
+                line.append(rng.choice(['@generoso', '@jsc-zen3', '@jsc-zen3-a100', '@foo']))
+            elif kind < 0.6:
+                line.append('in container ' + rng.choice(['ubuntu-22.04', 'rocky8:latest', '']))
+            elif kind < 0.85:
+                key = rng.choice(REQUEST_ARGS + ['EB_ARG', 'CORES', 'core_cnt'])
+                value = rng.choice(['8', '--debug', '--from-pr 123 --robot', 'release 5.0.x', '', "it's"])
+                quote = rng.choice(['"', "'"]) if ("'" not in value) else '"'
+                if rng.random() < 0.5 and ' ' not in value and "'" not in value:
+                    quote = ''
+                line.append('%s=%s%s%s' % (key, quote, value, quote))
+            else:
+                line.append(rng.choice(['thanks!', 'LGTM', '=', 'x=y', 'ok:', 'test: foo']))
+        parts.append(' '.join(line))
+    return '\n'.join(parts)
+
+
+def test_command_parser():
+
+    parser = CommandParser('boegelbot', 'jsc-zen3', 'jsc-zen3-a100')
+
+    assert parser.parse("please test @jsc-zen3") is None
+    assert not parser.is_mention("hey @boegelbot: please test @jsc-zen3")
+
+    req = parser.parse("@boegelbot please test @jsc-zen3")
+    assert req.action == REQUEST_ACTION_TEST
+    assert req.for_host and not req.for_gpuhost
+    assert req.args == {}
+    assert req.container is None
+
+    req = parser.parse('@boegelbot: please test @jsc-zen3-a100 EB_ARGS="--from-pr 123 --debug" CORE_CNT=16')
+    assert req.action == REQUEST_ACTION_TEST
+    assert req.for_host and req.for_gpuhost
+    assert req.args == {'core_cnt': '16', 'eb_args': '--from-pr 123 --debug'}
+
+    comment_txt = "@boegelbot please test @jsc-zen3 in container ubuntu-22.04\nEB_BRANCH=5.0.x SLURM_ARGS='-t 1:0:0'"
+    req = parser.parse(comment_txt)
+    assert req.container == 'ubuntu-22.04'
+    assert req.args == {'eb_branch': '5.0.x', 'slurm_args': '-t 1:0:0'}
+
+    assert not req.force
+    assert parser.parse("@boegelbot please test @jsc-zen3 --force").force
+    assert parser.parse("@boegelbot please test @jsc-zen3 again, FORCE").force
+    assert not parser.parse("@boegelbot please test @jsc-zen3 EB_ARGS=--force-download").force
+    # 'force' in custom arguments for 'eb' doesn't mean that testing again is forced
+    req = parser.parse('@boegelbot please test @jsc-zen3 EB_ARGS="--debug --force"')
+    assert req.args == {'eb_args': '--debug --force'}
+    assert not req.force
+    assert not parser.parse("@boegelbot please test @jsc-zen3 EB_ARGS='--force'").force
+    assert parser.parse('@boegelbot please test @jsc-zen3 EB_ARGS="--debug --force" force').force
+
+    assert parser.parse("@boegelbot PLEASE test @jsc-zen3").action == REQUEST_ACTION_SCREAM
+    req = parser.parse("@boegelbot what's up @generoso?")
+    assert req.action is None
+    assert not req.for_host
+
+    # unbalanced quotes don't result in a crash
+    req = parser.parse('@boegelbot please test @jsc-zen3 EB_ARGS="--debug')
+    assert req.args == {'eb_args': '"--debug'}
+
+    # also works if no host/gpuhost is specified
+    parser = CommandParser('boegelbot', '', None)
+    assert not parser.parse("@boegelbot please test @jsc-zen3").for_host
+
+    # property-based test: result is identical to original implementation for (random) corpus of comments,
+    # for any combination of host and gpuhost
+    rng = random.Random(20240101)
+    for host, gpuhost in [('jsc-zen3', 'jsc-zen3-a100'), ('generoso', ''), ('', 'jsc-zen3-a100')]:
+        parser = CommandParser('boegelbot', host, gpuhost)
+        for _ in range(2000):
+            comment_txt = gen_comment(rng)
+            req = parser.parse(comment_txt)
+            assert req == reference_parse(comment_txt, 'boegelbot', host, gpuhost), comment_txt
+            assert parser.is_mention(comment_txt) == (req is not None)
+            if req:
+                # only known arguments, only for requests to test a PR
+                assert all(key.upper() in REQUEST_ARGS for key in req.args)
+                assert req.action == REQUEST_ACTION_TEST or not req.args
+                # request for GPU host is also a request for host if GPU host label starts with host label
+                if host and gpuhost.startswith(host) and req.for_gpuhost:
+                    assert req.for_host
+
+    # microbenchmark: parser vs original implementation (which compiled the regular expressions for each comment)
+    corpus = [gen_comment(rng) for _ in range(2000)]
+    start = time.time()
+    for comment_txt in corpus:
+        reference_parse(comment_txt, 'boegelbot', 'jsc-zen3', 'jsc-zen3-a100')
+    ref_time = time.time() - start
+
+    parser = CommandParser('boegelbot', 'jsc-zen3', 'jsc-zen3-a100')
+    start = time.time()
+    for comment_txt in corpus:
+        parser.parse(comment_txt)
+    parser_time = time.time() - start
+    print("parsing %d comments: %.3fs originally, %.3fs with parser" % (len(corpus), ref_time, parser_time))
+
+
+def test_run_daemon():
+
+    def task(name):
+        runs.append(name)
+        if name == 'failing':
+            boegelbot.error("oops")
+        # daemon is stopped gracefully when SIGTERM is received: call signal handler installed by daemon,
+        # rather than sending an actual signal to the process that is running the tests
+        if runs.count('fast') == 10 and name == 'fast':
+            handler = signal.getsignal(signal.SIGTERM)
+            assert handler != orig_handler
+            handler(signal.SIGTERM, None)
+            runs.append('fast done')
+
+    runs = []
+    tasks = [
+        ('fast', 0.01, lambda: task('fast')),
+        ('failing', 0.01, lambda: task('failing')),
+        ('slow', 10, lambda: task('slow')),
+    ]
+
+    orig_handler = signal.getsignal(signal.SIGTERM)
+
+    run_daemon(tasks, jitter=0.5)
+
+    # all tasks were run at start, and failing task doesn't stop the daemon;
+    # task that was running when signal was received was completed, no tasks were run after that
+    assert runs[:3] == ['fast', 'failing', 'slow']
+    assert runs.count('fast') == 10
+    assert runs.count('failing') > 1
+    assert runs.count('slow') == 1
+    assert runs[-1] == 'fast done'
+
+    assert signal.getsignal(signal.SIGTERM) == orig_handler
+
+
+def test_refresh_checkouts(monkeypatch, tmp_path):
+
+    def git(path, *args):
+        cmd = ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com'] + list(args)
+        return subprocess.run(cmd, cwd=str(path), check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+    repos = ['easybuild-framework', 'easybuild-easyblocks']
+    prefix = tmp_path / 'checkouts'
+    prefix.mkdir()
+    for repo in repos:
+        upstream = tmp_path / 'upstream' / repo
+        upstream.mkdir(parents=True)
+        git(upstream, 'init', '-q', '-b', 'develop')
+        git(upstream, 'commit', '-q', '--allow-empty', '-m', 'initial commit')
+        git(prefix, 'clone', '-q', str(upstream))
+
+    # nothing is updated if upstream HEAD did not change
+    assert refresh_checkouts(str(prefix), 'develop', repos=repos) == []
+
+    upstream = tmp_path / 'upstream' / 'easybuild-easyblocks'
+    git(upstream, 'commit', '-q', '--allow-empty', '-m', 'new commit')
+    assert refresh_checkouts(str(prefix), 'develop', repos=repos) == ['easybuild-easyblocks']
+    assert git(prefix / 'easybuild-easyblocks', 'rev-parse', 'HEAD') == git(upstream, 'rev-parse', 'HEAD')
+    assert refresh_checkouts(str(prefix), 'develop', repos=repos) == []
+
+    # checkouts are not updated while they are locked (for example by easybuild_develop.sh)
+    monkeypatch.setattr(boegelbot, 'CHECKOUT_LOCK_TIMEOUT', 0)
+    git(upstream, 'commit', '-q', '--allow-empty', '-m', 'another commit')
+    with open(str(prefix / '.easybuild-easyblocks.lock'), 'w') as lock_fh:
+        fcntl.flock(lock_fh, fcntl.LOCK_EX)
+        with pytest.raises(SystemExit):
+            refresh_checkouts(str(prefix), 'develop', repos=repos)
+    assert git(prefix / 'easybuild-easyblocks', 'rev-parse', 'HEAD') != git(upstream, 'rev-parse', 'HEAD')
+    assert refresh_checkouts(str(prefix), 'develop', repos=repos) == ['easybuild-easyblocks']
+
+
+def test_import_time():
+
+    def import_time(modules):
+        """
+        Import specified modules in a new Python process;
+        return total import time (in ms), and names of all modules that were imported.
+        """
+        cmd = [sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(modules)]
+        topdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([topdir, os.getenv('PYTHONPATH', '')]))
+        res = subprocess.run(cmd, env=env, check=True, stderr=subprocess.PIPE, universal_newlines=True)
+        total, imported = 0, set()
+        for line in res.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, cumulative, name = line.split('|')
+                if cumulative.strip().isdigit():
+                    imported.add(name.strip())
+                    # only count cumulative time for top-level imports (not indented)
+                    if not name[1:].startswith(' '):
+                        total += int(cumulative) / 1000.
+        return total, imported
+
+    # expensive EasyBuild modules are not imported when importing boegelbot, only when they're actually needed
+    total, imported = import_time(['boegelbot'])
+    eb_modules = ['easybuild.base.generaloption', 'easybuild.tools.config', 'easybuild.tools.github',
+                  'easybuild.tools.run', 'easybuild.tools.systemtools']
+    for mod in eb_modules + ['travispy']:
+        assert mod not in imported
+
+    eb_total, _ = import_time(eb_modules)
+    print("import time: %.1fms for boegelbot, %.1fms for EasyBuild modules that used to be imported by boegelbot" %
+          (total, eb_total))
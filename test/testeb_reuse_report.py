@@ -0,0 +1,75 @@
+import eb_reuse_report
+from eb_reuse_report import installed_modules, reuse_report
+
+
+# example output of 'eb --from-pr 12345 --rebuild --robot --dry-run'
+DRY_RUN_OUT = '\n'.join([
+    "== Temporary log file in case of crash /tmp/eb-abcdef/easybuild-abcdef.log",
+    "Dry run: printing build status of easyconfigs and dependencies",
+    " * [x] /easyconfigs/g/GCCcore/GCCcore-12.3.0.eb (module: GCCcore/12.3.0)",
+    " * [x] /easyconfigs/z/zlib/zlib-1.2.13-GCCcore-12.3.0.eb (module: zlib/1.2.13-GCCcore-12.3.0)",
+    " * [x] /easyconfigs/b/bzip2/bzip2-1.0.8-GCCcore-12.3.0.eb (module: bzip2/1.0.8-GCCcore-12.3.0)",
+    " * [ ] /easyconfigs/x/XZ/XZ-5.4.2-GCCcore-12.3.0.eb (module: XZ/5.4.2-GCCcore-12.3.0)",
+    " * [R] /tmp/files_pr12345/e/example/example-1.0-GCCcore-12.3.0.eb (module: example/1.0-GCCcore-12.3.0)",
+    "== Temporary log file(s) /tmp/eb-abcdef/easybuild-abcdef.log* have been removed.",
+])
+
+
+def install(prefix, module, log_lines=None):
+    """Create fake installation for specified module in specified prefix, with EasyBuild log (if lines are given)."""
+    module_file = prefix / 'modules' / 'all' / (module + '.lua')
+    module_file.parent.mkdir(parents=True, exist_ok=True)
+    module_file.write_text('')
+    if log_lines:
+        log_dir = prefix / 'software' / module / 'easybuild'
+        log_dir.mkdir(parents=True)
+        (log_dir / 'easybuild-example-20240101.123456.log').write_text('\n'.join(log_lines) + '\n')
+
+
+def test_installed_modules():
+    """Test determining modules that are already installed from output of 'eb --dry-run'."""
+    assert installed_modules(DRY_RUN_OUT) == ['GCCcore/12.3.0', 'zlib/1.2.13-GCCcore-12.3.0',
+                                              'bzip2/1.0.8-GCCcore-12.3.0']
+    assert installed_modules('') == []
+
+
+def test_reuse_report(tmp_path, capsys):
+    """Test report on dependencies taken from shared installation prefix."""
+    shared, prefix = tmp_path / 'shared', tmp_path / 'prefix'
+
+    # GCCcore took 2h to build, on a single node
+    install(shared, 'GCCcore/12.3.0', ["== 2024-01-01 10:00:00,123 build_log.py:267 INFO This is EasyBuild",
+                                       "some output without timestamp",
+                                       "== 2024-01-01 11:00:00,000 easyblock.py:4227 INFO Build succeeded",
+                                       "== 2024-01-01 12:00:00,456 easyblock.py:4300 INFO COMPLETED"])
+    # no log available for bzip2
+    install(shared, 'bzip2/1.0.8-GCCcore-12.3.0')
+    # zlib is also installed in own prefix, which takes precedence
+    install(shared, 'zlib/1.2.13-GCCcore-12.3.0', ["== 2024-01-01 10:00:00,000 INFO start",
+                                                   "== 2024-01-01 10:30:00,000 INFO end"])
+    install(prefix, 'zlib/1.2.13-GCCcore-12.3.0')
+
+    res = reuse_report(str(shared), DRY_RUN_OUT, prefix=str(prefix), nodes=2, elapsed=1800)
+    assert res.split('\n') == [
+        "Dependencies taken from shared installation prefix %s: 2" % shared,
+        "* GCCcore/12.3.0 (4.00 node-hours)",
+        "* bzip2/1.0.8-GCCcore-12.3.0 (build time not known)",
+        "Estimated node-hours saved: 4.00",
+        "Node-hours used for test: 1.00",
+    ]
+
+    # without own prefix, zlib is also counted as taken from shared prefix
+    res = reuse_report(str(shared), DRY_RUN_OUT)
+    assert "Dependencies taken from shared installation prefix %s: 3" % shared in res
+    assert "* zlib/1.2.13-GCCcore-12.3.0 (0.50 node-hours)" in res
+    assert res.endswith("Estimated node-hours saved: 2.50")
+
+    # nothing to report if shared installation prefix is empty
+    res = reuse_report(str(tmp_path / 'empty'), DRY_RUN_OUT)
+    assert res.split('\n')[-1] == "Estimated node-hours saved: 0.00"
+
+    # report is printed when script is run
+    dry_run_out = tmp_path / 'dry_run.out'
+    dry_run_out.write_text(DRY_RUN_OUT)
+    eb_reuse_report.main([str(shared), str(dry_run_out), '--prefix', str(prefix), '--nodes', '2'])
+    assert capsys.readouterr().out.strip().endswith("Estimated node-hours saved: 4.00")
@@ -1 +1 @@
-python3 ./boegelbot.py --mode test_pr --github-user boegelbot --repository easybuild-easyblocks --owner boegel --host generoso --core-cnt 4 --pr-test-cmd "EB_PR=%(pr)s EB_ARGS=%(eb_args)s EB_CONTAINER=%(container)s EB_REPO=%(repository)s /opt/software/slurm/bin/sbatch --job-name test_PR_%(pr)s --ntasks=%(core_cnt)s ~/boegelbot/eb_from_pr_upload_generoso.sh"
+python3 ./boegelbot.py --mode test_pr --github-user boegelbot --repository easybuild-easyblocks --notifications-state $HOME/.boegelbot_notifications_easyblocks.json --owner boegel --host generoso --core-cnt 4 --pr-test-cmd "EB_PR=%(pr)s EB_ARGS=%(eb_args)s EB_CONTAINER=%(container)s EB_REPO=%(repository)s /opt/software/slurm/bin/sbatch --job-name test_PR_%(pr)s --ntasks=%(core_cnt)s ~/boegelbot/eb_from_pr_upload_generoso.sh"
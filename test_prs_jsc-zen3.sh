@@ -1 +1 @@
-python3 ./boegelbot.py --mode test_pr --github-user boegelbot --owner SebastianAchilles --host jsc-zen3 --gpuhost jsc-zen3-a100 --core-cnt 8 --gpu-job-opt="--partition=jsczen3g --gres=gpu:1" --pr-test-cmd "if [[ %(eb_branch)s != 'develop' ]]; then EB_BRANCH=%(eb_branch)s ./easybuild_develop.sh 2> /dev/null 1>&2; EB_PREFIX=$HOME/easybuild/%(eb_branch)s source init_env_easybuild_develop.sh; fi; EB_PR=%(pr)s EB_ARGS=%(eb_args)s EB_CONTAINER=%(container)s EB_REPO=%(repository)s EB_BRANCH=%(eb_branch)s /opt/software/slurm/bin/sbatch --job-name test_PR_%(pr)s --ntasks=%(core_cnt)s %(slurm_args)s ~/boegelbot/eb_from_pr_upload_jsc-zen3.sh"
+python3 ./boegelbot.py --mode test_pr --github-user boegelbot --notifications-state $HOME/.boegelbot_notifications_easyconfigs.json --owner SebastianAchilles --host jsc-zen3 --gpuhost jsc-zen3-a100 --core-cnt 8 --gpu-job-opt="--partition=jsczen3g --gres=gpu:1" --pr-test-cmd "if [[ %(eb_branch)s != 'develop' ]]; then EB_BRANCH=%(eb_branch)s ./easybuild_develop.sh 2> /dev/null 1>&2; EB_PREFIX=$HOME/easybuild/%(eb_branch)s source init_env_easybuild_develop.sh; fi; EB_PR=%(pr)s EB_ARGS=%(eb_args)s EB_CONTAINER=%(container)s EB_REPO=%(repository)s EB_BRANCH=%(eb_branch)s /opt/software/slurm/bin/sbatch --job-name test_PR_%(pr)s --ntasks=%(core_cnt)s %(slurm_args)s ~/boegelbot/eb_from_pr_upload_jsc-zen3.sh"